@@ -5,77 +5,220 @@ VERSION COMPLÈTE AVEC TOUTES LES FONCTIONS
 Intégration: SOAP, IRVE, GraphQL Chargetrip, OpenRouteService, geo.gouv.fr
 """
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 import requests
-from zeep import Client
 import logging
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
-from math import radians, sin, cos, sqrt, atan2
+from bisect import bisect_left, bisect_right
+from math import radians, sin, cos, sqrt, atan2, floor, isfinite
+
+import numpy as np
+
+from charging_planner import START_SOC, plan_charging_stops
+from city_store import CityStore, normalize_city_key
+from fallback_data import CITIES_COORDINATES, FALLBACK_VEHICLES
+from graphql_client import ChargeTripClient
+from job_queue import JobFailed, JobQueue, MemoryJobStore, QueueFull, SqliteJobStore
+from polyline import (
+    MAX_ZOOM, decode_polyline, encode_polyline, fit_zoom, simplify_douglas_peucker, zoom_tolerance_km
+)
+from rate_scheduler import QuotaExceeded, RateScheduler, UpstreamQuota
+from response_encoding import init_response_encoding
+from route_corridor import RouteCorridor
+from single_flight import SingleFlight, file_lock
+from station_index import StationIndex, CONNECTOR_TYPES
+from structured_logging import configure_logging, sampled
+from trip_table import TripTable, catalog_version
+from ttl_cache import NegativeCache, TTLCache, MISS
 
 # Configuration
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
+# JSON orjson + compression gzip/brotli des réponses au-delà de COMPRESS_MIN_SIZE octets
+init_response_encoding(app, min_size=int(os.getenv('COMPRESS_MIN_SIZE', 1024)))
 
-logging.basicConfig(level=logging.INFO)
+# Journaux JSON écrits par un thread dédié ; succès par appel échantillonnés (LOG_SAMPLE_RATE)
+log_setup = configure_logging('api')
 logger = logging.getLogger(__name__)
 
 # URLs des services
 SOAP_SERVICE_URL = os.getenv('SOAP_URL', 'http://localhost:8000/?wsdl')
-IRVE_API_URL = 'https://opendata.reseaux-energies.fr/api/records/1.0/search/'
-CHARGETRIP_API_URL = 'https://api.chargetrip.io/graphql'
+# Protocole des appels internes au service de calcul : 'json' (HttpRpc/JSON), 'soap'
+# ou 'local' (mêmes formules calculées dans le processus, traitements par lots)
+SOAP_PROTOCOL = os.getenv('SOAP_PROTOCOL', 'json')
+SOAP_JSON_URL = os.getenv('SOAP_JSON_URL', SOAP_SERVICE_URL.split('?')[0].rstrip('/') + '/json')
+IRVE_API_URL = os.getenv('IRVE_API_URL', 'https://opendata.reseaux-energies.fr/api/records/1.0/search/')
+CHARGETRIP_API_URL = os.getenv('CHARGETRIP_API_URL', 'https://api.chargetrip.io/graphql')
+OPENROUTE_API_URL = os.getenv('OPENROUTE_API_URL', 'https://api.openrouteservice.org/v2/directions/driving-car')
+GEO_API_URL = os.getenv('GEO_API_URL', 'https://geo.api.gouv.fr/communes')
+OPENROUTE_MATRIX_URL = os.getenv('OPENROUTE_MATRIX_URL', OPENROUTE_API_URL.replace('/directions/', '/matrix/'))
 
 # Clés API
 CHARGETRIP_API_KEY = os.getenv('CHARGETRIP_API_KEY', '692a26889b4638ceff6b0f89')
 CHARGETRIP_CLIENT_ID = os.getenv('CHARGETRIP_CLIENT_ID', '692a26889b4638ceff6b0f87')
+# Requêtes GraphQL persistées (APQ) : empreinte du document au lieu de son texte
+CHARGETRIP_PERSISTED_QUERIES = os.getenv('CHARGETRIP_PERSISTED_QUERIES', '1') == '1'
+# Planificateur optimal : un point d'échantillonnage IRVE tous les N km
+CANDIDATE_SPACING_KM = int(os.getenv('CANDIDATE_SPACING_KM', 60))
+CANDIDATE_ROWS = int(os.getenv('CANDIDATE_ROWS', 20))
+# Bornes demandées à IRVE par page de recherche (filtrées ensuite par puissance / prise) ;
+# avec filtre, pages suivantes jusqu'à une borne compatible ou STATION_QUERY_MAX_RECORDS bornes lues
+STATION_QUERY_ROWS = int(os.getenv('STATION_QUERY_ROWS', 20))
+STATION_QUERY_MAX_RECORDS = int(os.getenv('STATION_QUERY_MAX_RECORDS', 200))
+# Bornes gardées dans l'index en mémoire (les plus anciennes oubliées au-delà)
+STATION_INDEX_MAX = int(os.getenv('STATION_INDEX_MAX', 100000))
+# Cache des bornes les plus proches par cellule géographique (degrés) ;
+# TTL plus court quand IRVE n'a rien trouvé (borne générique)
+NEAREST_CACHE_CELL_DEG = float(os.getenv('NEAREST_CACHE_CELL_DEG', 0.02))
+NEAREST_CACHE_SIZE = int(os.getenv('NEAREST_CACHE_SIZE', 4096))
+NEAREST_CACHE_TTL = int(os.getenv('NEAREST_CACHE_TTL', 3600))
+NEAREST_CACHE_NEGATIVE_TTL = int(os.getenv('NEAREST_CACHE_NEGATIVE_TTL', 300))
+# Itinéraires ORS en cache ; TTL court pour l'estimation à vol d'oiseau (ORS en échec)
+ROUTE_CACHE_SIZE = int(os.getenv('ROUTE_CACHE_SIZE', 1024))
+ROUTE_CACHE_TTL = int(os.getenv('ROUTE_CACHE_TTL', 86400))
+ROUTE_CACHE_FALLBACK_TTL = int(os.getenv('ROUTE_CACHE_FALLBACK_TTL', 300))
+# Résultats négatifs en cache : ville inconnue, aucune borne dans le rayon
+# (NEAREST_CACHE_NEGATIVE_TTL), itinéraire refusé par ORS (points non routables)
+NEGATIVE_CACHE_SIZE = int(os.getenv('NEGATIVE_CACHE_SIZE', 8192))
+NEGATIVE_CITY_TTL = int(os.getenv('NEGATIVE_CITY_TTL', 600))
+NEGATIVE_ROUTE_TTL = int(os.getenv('NEGATIVE_ROUTE_TTL', 86400))
+# Tolérance de simplification du tracé renvoyé, en pixels au niveau de zoom demandé
+ROUTE_TOLERANCE_PX = float(os.getenv('ROUTE_TOLERANCE_PX', 1.0))
+# Table précalculée des trajets grandes villes x véhicules :
+# 'off', 'startup' (chargée ou construite au démarrage) ou 'schedule' (+ reconstruction périodique)
+TRIP_TABLE_MODE = os.getenv('TRIP_TABLE_MODE', 'off')
+TRIP_TABLE_PATH = os.getenv('TRIP_TABLE_PATH', os.path.join(tempfile.gettempdir(), 'ev_trip_table.npz'))
+TRIP_TABLE_REFRESH_S = int(os.getenv('TRIP_TABLE_REFRESH_S', 3600))
+TRIP_TABLE_MAX_AGE_S = int(os.getenv('TRIP_TABLE_MAX_AGE_S', 7 * 86400))
+TRIP_TABLE_WORKERS = int(os.getenv('TRIP_TABLE_WORKERS', 8))
+# Corridor autour de l'itinéraire : demi-largeur (km) et bornes demandées en une requête IRVE
+CORRIDOR_BUFFER_KM = float(os.getenv('CORRIDOR_BUFFER_KM', 5))
+CORRIDOR_MAX_BUFFER_KM = 50
+CORRIDOR_ROWS = int(os.getenv('CORRIDOR_ROWS', 2000))
+# Bornes lues au plus dans le polygone (pages de CORRIDOR_ROWS) ; au-delà, résultat signalé tronqué
+CORRIDOR_MAX_RECORDS = int(os.getenv('CORRIDOR_MAX_RECORDS', 10000))
+# Départ / destination donnés en coordonnées : rattachés à la commune la plus
+# proche à moins de CITY_SNAP_MAX_KM ; /api/nearest-city renvoie au plus NEAREST_CITY_MAX_K communes
+CITY_SNAP_MAX_KM = float(os.getenv('CITY_SNAP_MAX_KM', 30))
+NEAREST_CITY_MAX_K = int(os.getenv('NEAREST_CITY_MAX_K', 50))
+# Filtre par population (min_population) : seuils gardés en cache (série 1-2-5) et valeur maximale ;
+# POPULATION_FILTER_CACHE_SIZE derniers seuils hors série gardés en cache en plus
+POPULATION_THRESHOLDS = tuple(m * 10 ** e for e in range(2, 7) for m in (1, 2, 5))
+MAX_MIN_POPULATION = 10_000_000
+POPULATION_FILTER_CACHE_SIZE = int(os.getenv('POPULATION_FILTER_CACHE_SIZE', 16))
+# Trajet à étapes : nombre maximal de villes (départ et destination compris) en un appel ORS
+MAX_WAYPOINTS = int(os.getenv('MAX_WAYPOINTS', 25))
+# Villes atteignables (/api/reachable) : distance routière estimée entre REACHABLE_DETOUR_MIN et
+# REACHABLE_DETOUR_MAX fois la distance à vol d'oiseau ; entre les deux, au plus REACHABLE_REFINE_MAX
+# villes vérifiées par distance routière (cache, table, puis un appel à la matrice ORS)
+REACHABLE_DETOUR_MIN = float(os.getenv('REACHABLE_DETOUR_MIN', 1.1))
+REACHABLE_DETOUR_MAX = float(os.getenv('REACHABLE_DETOUR_MAX', 1.6))
+REACHABLE_REFINE_MAX = int(os.getenv('REACHABLE_REFINE_MAX', 200))
+REACHABLE_MAX_RESULTS = int(os.getenv('REACHABLE_MAX_RESULTS', 5000))
+ROAD_DISTANCE_CACHE_SIZE = int(os.getenv('ROAD_DISTANCE_CACHE_SIZE', 65536))
+# Tâches asynchrones (/api/jobs) : JOB_WORKERS threads de calcul par worker, au plus
+# JOB_MAX_PENDING tâches en attente, résultats conservés JOB_RESULT_TTL secondes ;
+# JOB_STORE 'sqlite' (fichier JOB_DB_PATH partagé par les workers) ou 'memory'
+JOB_STORE = os.getenv('JOB_STORE', 'sqlite')
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'ev_jobs.sqlite3'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', 100))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))
+JOB_BATCH_MAX = int(os.getenv('JOB_BATCH_MAX', 500))
+JOB_WAIT_MAX_S = float(os.getenv('JOB_WAIT_MAX_S', 30))
+# Module chargé dans le maître gunicorn avant fork (gunicorn.conf.py) : le maître
+# précharge les données (warm_up), les threads de fond démarrent dans les workers
+APP_PRELOAD = os.getenv('APP_PRELOAD') == '1'
+# Appels amont identiques simultanés coalescés (un seul appel, résultat partagé) ;
+# SINGLE_FLIGHT_DIR partage en plus les résultats récents entre workers d'une même machine
+SINGLE_FLIGHT_DIR = os.getenv('SINGLE_FLIGHT_DIR') or None
+SINGLE_FLIGHT_SHARE_S = float(os.getenv('SINGLE_FLIGHT_SHARE_S', 5))
+# Quotas des clés API (appels par minute / par jour, 0 : illimité), partagés
+# entre RATE_LIMIT_WORKERS processus (exporté par gunicorn.conf.py d'après son nombre de
+# workers, 1 hors gunicorn) ; RATE_RESERVE : part réservée au trafic interactif
+RATE_LIMIT_WORKERS = max(1, int(os.getenv('RATE_LIMIT_WORKERS', 1)))
+ORS_RATE_PER_MINUTE = int(os.getenv('ORS_RATE_PER_MINUTE', 40))
+ORS_RATE_PER_DAY = int(os.getenv('ORS_RATE_PER_DAY', 2000))
+CHARGETRIP_RATE_PER_MINUTE = int(os.getenv('CHARGETRIP_RATE_PER_MINUTE', 60))
+CHARGETRIP_RATE_PER_DAY = int(os.getenv('CHARGETRIP_RATE_PER_DAY', 0))
+RATE_RESERVE = float(os.getenv('RATE_RESERVE', 0.2))
+
 OPENROUTE_API_KEY = os.getenv('OPENROUTE_API_KEY', 'eyJvcmciOiI1YjNjZTM1OTc4NTExMTAwMDFjZjYyNDgiLCJpZCI6ImIzMTgxMjc3OGFiMjQ5MzE4MDQwOGJiYTQ3M2FkMTg2IiwiaCI6Im11cm11cjY0In0')
 
-# ==================== DONNÉES FALLBACK ====================
-
-FALLBACK_VEHICLES = [
-    {'id': 1, 'name': 'Tesla Model 3 Long Range', 'brand': 'Tesla', 'model': 'Model 3', 'autonomy': 580, 'battery': 75, 'chargeTime': 0.5, 'seats': 5},
-    {'id': 2, 'name': 'Renault Zoe R135', 'brand': 'Renault', 'model': 'Zoe', 'autonomy': 395, 'battery': 52, 'chargeTime': 0.75, 'seats': 5},
-    {'id': 3, 'name': 'Nissan Leaf e+ 62kWh', 'brand': 'Nissan', 'model': 'Leaf', 'autonomy': 385, 'battery': 62, 'chargeTime': 0.67, 'seats': 5},
-    {'id': 4, 'name': 'Peugeot e-208 GT', 'brand': 'Peugeot', 'model': 'e-208', 'autonomy': 340, 'battery': 50, 'chargeTime': 0.8, 'seats': 5},
-    {'id': 5, 'name': 'Volkswagen ID.3 Pro', 'brand': 'Volkswagen', 'model': 'ID.3', 'autonomy': 420, 'battery': 58, 'chargeTime': 0.7, 'seats': 5},
-    {'id': 6, 'name': 'Hyundai Kona Electric 64kWh', 'brand': 'Hyundai', 'model': 'Kona Electric', 'autonomy': 484, 'battery': 64, 'chargeTime': 0.65, 'seats': 5},
-    {'id': 7, 'name': 'BMW i3 120Ah', 'brand': 'BMW', 'model': 'i3', 'autonomy': 310, 'battery': 42, 'chargeTime': 0.85, 'seats': 4},
-    {'id': 8, 'name': 'Audi e-tron 55 quattro', 'brand': 'Audi', 'model': 'e-tron', 'autonomy': 436, 'battery': 95, 'chargeTime': 0.6, 'seats': 5},
-    {'id': 9, 'name': 'Mercedes EQC 400', 'brand': 'Mercedes', 'model': 'EQC', 'autonomy': 417, 'battery': 80, 'chargeTime': 0.7, 'seats': 5},
-    {'id': 10, 'name': 'Kia e-Niro 64kWh', 'brand': 'Kia', 'model': 'e-Niro', 'autonomy': 455, 'battery': 64, 'chargeTime': 0.65, 'seats': 5},
-]
-
-CITIES_COORDINATES = {
-    'paris': {'lat': 48.8566, 'lon': 2.3522, 'name': 'Paris', 'population': 2165423},
-    'lyon': {'lat': 45.7640, 'lon': 4.8357, 'name': 'Lyon', 'population': 516092},
-    'marseille': {'lat': 43.2965, 'lon': 5.3698, 'name': 'Marseille', 'population': 869815},
-    'bordeaux': {'lat': 44.8378, 'lon': -0.5792, 'name': 'Bordeaux', 'population': 254436},
-    'nice': {'lat': 43.7102, 'lon': 7.2620, 'name': 'Nice', 'population': 340017},
-    'toulouse': {'lat': 43.6047, 'lon': 1.4442, 'name': 'Toulouse', 'population': 479553},
-    'nantes': {'lat': 47.2184, 'lon': -1.5536, 'name': 'Nantes', 'population': 309346},
-    'strasbourg': {'lat': 48.5734, 'lon': 7.7521, 'name': 'Strasbourg', 'population': 280966},
-    'montpellier': {'lat': 43.6108, 'lon': 3.8767, 'name': 'Montpellier', 'population': 285121},
-    'lille': {'lat': 50.6292, 'lon': 3.0573, 'name': 'Lille', 'population': 232787},
-    'rennes': {'lat': 48.1173, 'lon': -1.6778, 'name': 'Rennes', 'population': 216815},
-    'reims': {'lat': 49.2583, 'lon': 4.0317, 'name': 'Reims', 'population': 182592},
-    'grenoble': {'lat': 45.1885, 'lon': 5.7245, 'name': 'Grenoble', 'population': 158454},
-    'dijon': {'lat': 47.3220, 'lon': 5.0415, 'name': 'Dijon', 'population': 155090},
-    'angers': {'lat': 47.4784, 'lon': -0.5632, 'name': 'Angers', 'population': 151229}
-}
+# ==================== APPELS AMONT ====================
+
+upstream_flight = SingleFlight(shared_dir=SINGLE_FLIGHT_DIR, share_s=SINGLE_FLIGHT_SHARE_S)
+
+rate_scheduler = RateScheduler([
+    UpstreamQuota(
+        'ors',
+        per_minute=ORS_RATE_PER_MINUTE // RATE_LIMIT_WORKERS,
+        per_day=ORS_RATE_PER_DAY // RATE_LIMIT_WORKERS,
+        reserve=RATE_RESERVE
+    ),
+    UpstreamQuota(
+        'chargetrip',
+        per_minute=CHARGETRIP_RATE_PER_MINUTE // RATE_LIMIT_WORKERS,
+        per_day=CHARGETRIP_RATE_PER_DAY // RATE_LIMIT_WORKERS,
+        reserve=RATE_RESERVE
+    )
+])
+
+
+def upstream_json(upstream, method, url, params=None, json_body=None, headers=None, timeout=10,
+                  priority='interactive'):
+    """
+    Appel HTTP vers une API amont, coalescé avec les appels identiques en cours
+    
+    Seul l'appel effectivement émis consomme un jeton du quota de l'API ; il
+    attend son tour selon sa priorité ('interactive', 'batch' ou 'warmup').
+    La priorité fait partie de la clé de coalescence : un appel interactif ne
+    rejoint pas un appel de fond en attente de quota (attente tolérée de
+    quelques secondes contre plusieurs minutes).
+    
+    Raises:
+        QuotaExceeded: si le quota reste épuisé au-delà de l'attente tolérée
+    
+    Returns:
+        (code HTTP, contenu JSON ou None si le code n'est pas 200) ; le contenu
+        est partagé entre les appelants coalescés et ne doit pas être modifié
+    """
+    key = (
+        upstream,
+        method,
+        url,
+        tuple(sorted((params or {}).items())),
+        repr(json_body),
+        priority
+    )
+    
+    def call():
+        rate_scheduler.acquire(upstream, priority)
+        response = requests.request(method, url, params=params, json=json_body, headers=headers, timeout=timeout)
+        if response.status_code == 429:
+            rate_scheduler.exhaust(upstream)
+        return response.status_code, response.json() if response.status_code == 200 else None
+    
+    return upstream_flight.do(key, call)
 
 
 # ==================== RÉCUPÉRATION VILLES ====================
 
 @lru_cache(maxsize=1)
-def fetch_cities_from_api(min_population=100000):
+def fetch_city_store():
     """
-    Récupère toutes les grandes villes de France depuis l'API geo.gouv.fr.
-    min_population : seuil minimum d'habitants (par défaut : >= 100 000)
-    Retour : dictionnaire {key: {lat, lon, name, population}}
+    Récupère toutes les communes de France depuis l'API geo.gouv.fr.
+    Retour : CityStore (catalogue en colonnes, interface dictionnaire
+    {key: {lat, lon, name, population, code}}) ; villes de secours si l'API échoue
     """
 
-    url = "https://geo.api.gouv.fr/communes"
+    url = GEO_API_URL
     params = {
         "fields": "nom,code,population,centre",
         "format": "json"
@@ -84,138 +227,169 @@ def fetch_cities_from_api(min_population=100000):
     try:
         logger.info("🔄 Téléchargement de toutes les communes françaises...")
 
-        response = requests.get(url, params=params, timeout=20)
-        response.raise_for_status()
+        status, all_cities = upstream_json('geo', 'GET', url, params=params, timeout=20)
+        if status != 200:
+            raise requests.HTTPError(f"HTTP {status}")
 
-        all_cities = response.json()
-        cities = {}
+        cities = CityStore.from_communes(all_cities)
 
-        logger.info("🔄 Filtrage des grandes villes...")
+        if len(cities) > 0:
+            logger.info(f"✅ {len(cities)} communes chargées ({cities.memory_bytes() / 1e6:.1f} Mo)")
+            return cities
 
-        for c in all_cities:
-            pop = c.get("population", 0)
+        logger.warning("⚠️ Aucune commune récupérée → fallback utilisé")
+        return CityStore.from_dict(CITIES_COORDINATES)
 
-            # 🎯 FILTRE AUTOMATIQUE
-            if pop < min_population:
-                continue
+    except Exception as e:
+        logger.error(f"❌ Erreur API geo.gouv.fr : {e}")
+        return CityStore.from_dict(CITIES_COORDINATES)
 
-            name = c.get("nom")
-            centre = c.get("centre", {})
-            coords = centre.get("coordinates", [])
 
-            if len(coords) != 2:
-                continue
+def population_threshold(min_population):
+    """Seuil de la série POPULATION_THRESHOLDS immédiatement inférieur ou égal (0 : aucun)"""
+    return max((t for t in POPULATION_THRESHOLDS if t <= min_population), default=0)
 
-            lon, lat = coords[0], coords[1]
 
-            # clé unique normalisée
-            key = (
-                name.lower()
-                    .replace("-", "")
-                    .replace(" ", "")
-                    .replace("'", "")
-            )
+@lru_cache(maxsize=len(POPULATION_THRESHOLDS))
+def cities_at_threshold(threshold):
+    """Catalogue filtré pour un seuil de la série (un exemplaire par seuil)"""
+    cities = fetch_city_store().filter(threshold)
+    logger.info(f"✅ {len(cities)} villes (pop >= {threshold})")
+    return cities
 
-            cities[key] = {
-                "name": name,
-                "population": pop,
-                "lat": lat,
-                "lon": lon,
-                "code": c.get("code", "")
-            }
 
-        if len(cities) > 0:
-            logger.info(f"✅ {len(cities)} grandes villes récupérées (pop >= {min_population})")
-            return cities
+@lru_cache(maxsize=POPULATION_FILTER_CACHE_SIZE)
+def cities_at_population(min_population):
+    """
+    Catalogue filtré pour un seuil hors série, depuis le seuil de la série
+    immédiatement inférieur (catalogue complet sous le premier seuil)
+    """
+    threshold = population_threshold(min_population)
+    cities = cities_at_threshold(threshold) if threshold else fetch_city_store()
+    return cities.filter(min_population)
 
-        logger.warning("⚠️ Aucune ville récupérée → fallback utilisé")
-        return CITIES_COORDINATES
 
-    except Exception as e:
-        logger.error(f"❌ Erreur API geo.gouv.fr : {e}")
-        return CITIES_COORDINATES
+def fetch_cities_from_api(min_population=100000):
+    """
+    Grandes villes de France (catalogue des communes filtré).
+    min_population : seuil minimum d'habitants (par défaut : >= 100 000)
+    Retour : CityStore {key: {lat, lon, name, population, code}}, vide si aucune
+    commune n'atteint le seuil (villes de secours seulement si l'API geo échoue,
+    voir fetch_city_store)
+    
+    Les seuils de la série POPULATION_THRESHOLDS sont gardés en cache ; un
+    autre seuil est filtré depuis le seuil de la série immédiatement inférieur
+    et gardé en cache parmi les POPULATION_FILTER_CACHE_SIZE derniers.
+    
+    Raises:
+        ValueError: min_population hors de [0, MAX_MIN_POPULATION]
+    """
+    if not 0 <= min_population <= MAX_MIN_POPULATION:
+        raise ValueError(f'min_population : entre 0 et {MAX_MIN_POPULATION} attendu')
+    
+    threshold = population_threshold(min_population)
+    if min_population != threshold:
+        return cities_at_population(min_population)
+    return cities_at_threshold(threshold) if threshold else fetch_city_store()
 
 
+# ==================== RÉCUPÉRATION VÉHICULES ====================
 
+def parse_chargetrip_vehicle(idx, vehicle_data):
+    """Convertit un véhicule GraphQL Chargetrip au format de l'API"""
+    naming = vehicle_data.get('naming', {})
+    battery = vehicle_data.get('battery', {})
+    range_data = vehicle_data.get('range', {}).get('chargetrip_range', {})
+    
+    best_range = range_data.get('best', 0)
+    worst_range = range_data.get('worst', 0)
+    avg_range = int((best_range + worst_range) / 2) if best_range and worst_range else 350
+    
+    battery_kwh = battery.get('usable_kwh', 50)
+    charge_time = round(battery_kwh / 50, 2)
+    
+    return {
+        'id': idx,
+        'name': f"{naming.get('make', '')} {naming.get('model', '')}".strip(),
+        'brand': naming.get('make', 'Unknown'),
+        'model': naming.get('model', ''),
+        'autonomy': avg_range,
+        'battery': battery_kwh,
+        'chargeTime': charge_time,
+        'seats': vehicle_data.get('body', {}).get('seats', 5)
+    }
 
-# ==================== RÉCUPÉRATION VÉHICULES ====================
 
-@lru_cache(maxsize=1)
-def fetch_vehicles_from_chargetrip():
-    """Récupère les véhicules depuis Chargetrip avec fallback"""
+def parse_chargetrip_vehicles(vehicle_list):
+    """Catalogue de l'API à partir de la liste GraphQL (véhicules incomplets écartés)"""
+    vehicles = []
+    
+    for idx, vehicle_data in enumerate(vehicle_list, 1):
+        vehicle = parse_chargetrip_vehicle(idx, vehicle_data)
+        
+        if vehicle['autonomy'] > 100 and vehicle['battery'] > 0:
+            vehicles.append(vehicle)
+    
+    return vehicles
+
+
+def chargetrip_transport(url, json=None, headers=None, timeout=10, priority='interactive'):
+    """Requête HTTP Chargetrip sous quota, à la priorité de l'appelant (voir rate_scheduler)"""
+    rate_scheduler.acquire('chargetrip', priority)
+    response = requests.post(url, json=json, headers=headers, timeout=timeout)
+    if response.status_code == 429:
+        rate_scheduler.exhaust('chargetrip')
+    return response
+
+
+# Client GraphQL : jeu de champs 'catalog', requêtes persistées, synchronisation conditionnelle
+chargetrip_client = ChargeTripClient(
+    CHARGETRIP_API_KEY, CHARGETRIP_CLIENT_ID, url=CHARGETRIP_API_URL,
+    persisted_queries=CHARGETRIP_PERSISTED_QUERIES, transport=chargetrip_transport
+)
+
+
+# Catalogue courant (clé 'vehicles'), vidé pour relire Chargetrip
+vehicles_cache = {}
+
+
+def fetch_vehicles_from_chargetrip(priority='interactive'):
+    """
+    Récupère les véhicules depuis Chargetrip avec fallback (mis en cache)
+    
+    Catalogue inchangé depuis le dernier chargement (même contenu) : la liste
+    précédente est réutilisée telle quelle, sans parsing (même version de catalogue).
+    
+    priority : priorité de l'appel Chargetrip pour le quota ('warmup' pour le
+    préchargement et la table précalculée)
+    """
+    vehicles = vehicles_cache.get('vehicles')
+    if vehicles is None:
+        vehicles = vehicles_cache['vehicles'] = load_vehicles_from_chargetrip(priority)
+    return vehicles
+
+
+def load_vehicles_from_chargetrip(priority='interactive'):
+    """Catalogue Chargetrip, ou FALLBACK_VEHICLES sans clé ou en cas d'échec"""
     
     if not CHARGETRIP_API_KEY or CHARGETRIP_API_KEY == '':
         logger.warning("⚠️  Pas de clé Chargetrip - FALLBACK")
         return FALLBACK_VEHICLES
     
-    query = """
-    query vehicleList {
-      vehicleList(page: 0, size: 50) {
-        id
-        naming {
-          make
-          model
-          version
-        }
-        battery {
-          usable_kwh
-        }
-        body {
-          seats
-        }
-        range {
-          chargetrip_range {
-            best
-            worst
-          }
-        }
-      }
-    }
-    """
-    
-    headers = {
-        'x-client-id': CHARGETRIP_CLIENT_ID,
-        'x-app-id': CHARGETRIP_API_KEY,
-        'Content-Type': 'application/json'
-    }
+    def sync():
+        return chargetrip_client.sync_vehicles(
+            size=50, fields='catalog', parse=parse_chargetrip_vehicles, priority=priority
+        )
     
     try:
-        response = requests.post(CHARGETRIP_API_URL, json={'query': query}, headers=headers, timeout=10)
+        vehicles, changed = upstream_flight.do(('chargetrip', 'sync'), sync)
         
-        if response.status_code == 200:
-            data = response.json()
-            
-            if 'data' in data and 'vehicleList' in data['data']:
-                vehicles = []
-                
-                for idx, vehicle_data in enumerate(data['data']['vehicleList'], 1):
-                    naming = vehicle_data.get('naming', {})
-                    battery = vehicle_data.get('battery', {})
-                    range_data = vehicle_data.get('range', {}).get('chargetrip_range', {})
-                    
-                    best_range = range_data.get('best', 0)
-                    worst_range = range_data.get('worst', 0)
-                    avg_range = int((best_range + worst_range) / 2) if best_range and worst_range else 350
-                    
-                    battery_kwh = battery.get('usable_kwh', 50)
-                    charge_time = round(battery_kwh / 50, 2)
-                    
-                    vehicle = {
-                        'id': idx,
-                        'name': f"{naming.get('make', '')} {naming.get('model', '')}".strip(),
-                        'brand': naming.get('make', 'Unknown'),
-                        'model': naming.get('model', ''),
-                        'autonomy': avg_range,
-                        'battery': battery_kwh,
-                        'chargeTime': charge_time,
-                        'seats': vehicle_data.get('body', {}).get('seats', 5)
-                    }
-                    
-                    if vehicle['autonomy'] > 100 and vehicle['battery'] > 0:
-                        vehicles.append(vehicle)
-                
+        if vehicles:
+            if changed:
                 logger.info(f"✅ {len(vehicles)} véhicules depuis Chargetrip")
-                return vehicles if vehicles else FALLBACK_VEHICLES
+            else:
+                logger.info(f"✅ Catalogue Chargetrip inchangé ({len(vehicles)} véhicules)")
+            return vehicles
         
         logger.warning("⚠️  Réponse invalide - FALLBACK")
         return FALLBACK_VEHICLES
@@ -227,6 +401,20 @@ def fetch_vehicles_from_chargetrip():
 
 # ==================== CALCUL DISTANCE ====================
 
+# Itinéraires par (départ, arrivée), avec leurs variantes simplifiées
+route_cache = TTLCache(maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL)
+
+# Distances routières (km) entre deux villes : itinéraires ORS et matrice ORS (None : non routable)
+road_distance_cache = TTLCache(maxsize=ROAD_DISTANCE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL)
+
+# Échecs connus : clé de ville normalisée, cellule géographique ou coordonnées arrondies
+negative_cache = NegativeCache({
+    'city': NEGATIVE_CITY_TTL,
+    'station': NEAREST_CACHE_NEGATIVE_TTL,
+    'route': NEGATIVE_ROUTE_TTL
+}, maxsize=NEGATIVE_CACHE_SIZE)
+
+
 def calculate_distance_haversine(coords1, coords2):
     """Calcul distance à vol d'oiseau"""
     R = 6371
@@ -250,16 +438,148 @@ def calculate_distance_haversine(coords1, coords2):
     }
 
 
-def calculate_distance_and_route(city1, city2):
-    """Calcule distance avec OpenRouteService ou fallback"""
-    cities_dict = fetch_cities_from_api()
+def calculate_distance_and_route(city1, city2, priority='interactive'):
+    """Calcule distance avec OpenRouteService ou fallback (trajet direct entre deux villes)"""
+    return calculate_waypoints_route([city1, city2], priority=priority)
+
+
+def calculate_waypoints_route(cities, priority='interactive'):
+    """
+    Itinéraire passant par les villes données, dans l'ordre, en un seul appel ORS
+    
+    L'itinéraire est mis en cache avec sa polyligne décodée ('points'), ses
+    variantes simplifiées par niveau de zoom ('simplified', voir simplified_route)
+    et ses tronçons entre étapes ('legs', voir route_legs).
+    priority : priorité de l'appel ORS pour le quota (voir rate_scheduler)
+    """
+    cities_dict = fetch_city_store()
     
-    coords1 = cities_dict.get(city1.lower())
-    coords2 = cities_dict.get(city2.lower())
+    key = tuple(city.lower() for city in cities)
+    coords = [cities_dict.get(city) for city in key]
     
-    if not coords1 or not coords2:
+    if not all(coords):
         return None, None
     
+    route_data = route_cache.get(key)
+    if route_data is not MISS:
+        return route_data, None
+    
+    route_data = (
+        (table_route(*key) if len(key) == 2 else None)
+        or request_route(cities, coords, priority=priority)
+    )
+    route_data['points'] = route_points(route_data, *coords)
+    route_data['legs'] = route_legs(route_data, coords)
+    route_data['simplified'] = {}
+    
+    # Estimation à vol d'oiseau (ORS indisponible) : conservée peu de temps
+    ttl = ROUTE_CACHE_TTL if route_data['geometry'] else ROUTE_CACHE_FALLBACK_TTL
+    route_cache.set(key, route_data, ttl=ttl)
+    if route_data['geometry'] and len(key) == 2:
+        road_distance_cache.set(key, route_data['distance'])
+    
+    return route_data, None
+
+
+def route_points(route_data, *coords):
+    """Polyligne (lat, lon) de l'itinéraire ; segments directs entre étapes si ORS n'a pas fourni de tracé"""
+    if route_data.get('points'):
+        return route_data['points']
+    if route_data.get('geometry'):
+        return decode_polyline(route_data['geometry'])
+    return [(c['lat'], c['lon']) for c in coords]
+
+
+def route_legs(route_data, coords):
+    """
+    Tronçons entre étapes successives : distance (km), durée (h) et position de
+    départ le long de l'itinéraire (start_km)
+    
+    Distances et durées des segments ORS ; à défaut (table précalculée,
+    estimation), totaux répartis au prorata des distances à vol d'oiseau.
+    """
+    segments = route_data.get('segments') or []
+    if len(segments) != len(coords) - 1:
+        direct = [calculate_distance_haversine(a, b)['distance'] for a, b in zip(coords, coords[1:])]
+        total = sum(direct) or 1
+        segments = [
+            {'distance': route_data['distance'] * d / total, 'duration': route_data['duration'] * d / total}
+            for d in direct
+        ]
+    
+    legs, start_km = [], 0.0
+    for segment in segments:
+        legs.append({
+            'distance': round(segment['distance'], 1),
+            'duration': round(segment['duration'], 2),
+            'start_km': round(start_km, 1)
+        })
+        start_km += segment['distance']
+    return legs
+
+
+def simplified_route(route_data, zoom):
+    """
+    Polyligne encodée de l'itinéraire simplifiée (Douglas-Peucker) pour un niveau
+    de zoom : la tolérance vaut ROUTE_TOLERANCE_PX pixels à ce zoom. Chaque
+    variante est calculée une fois et conservée avec l'itinéraire en cache.
+    """
+    variants = route_data.setdefault('simplified', {})
+    encoded = variants.get(zoom)
+    
+    if encoded is None:
+        points = route_data['points']
+        lat = (points[0][0] + points[-1][0]) / 2
+        tolerance = zoom_tolerance_km(zoom, lat, ROUTE_TOLERANCE_PX)
+        encoded = variants[zoom] = encode_polyline(simplify_douglas_peucker(points, tolerance))
+    
+    return encoded
+
+
+def route_negative_key(*coords):
+    """Clé d'un itinéraire impossible : étapes arrondies à ~100 m"""
+    return tuple(value for c in coords for value in (round(c['lat'], 3), round(c['lon'], 3)))
+
+
+def waypoints_distance_haversine(coords):
+    """Estimation à vol d'oiseau étape par étape, avec les segments de chaque tronçon"""
+    segments = [calculate_distance_haversine(a, b) for a, b in zip(coords, coords[1:])]
+    return {
+        'distance': round(sum(s['distance'] for s in segments), 1),
+        'duration': round(sum(s['duration'] for s in segments), 2),
+        'geometry': None,
+        'coordinates': [],
+        'segments': [{'distance': s['distance'], 'duration': s['duration']} for s in segments]
+    }
+
+
+# Estimations à vol d'oiseau servies à la place d'un itinéraire ORS, par cause :
+# refused (400/404, point non routable), quota (quota épuisé), error (autre échec)
+route_fallbacks = {'refused': 0, 'quota': 0, 'error': 0}
+route_fallbacks_lock = threading.Lock()
+
+
+def route_fallback(coords, reason):
+    """Estimation à vol d'oiseau, comptée par cause dans route_fallbacks"""
+    with route_fallbacks_lock:
+        route_fallbacks[reason] += 1
+    return waypoints_distance_haversine(coords)
+
+
+def request_route(cities, coords, priority='interactive'):
+    """
+    Itinéraire OpenRouteService passant par toutes les étapes (un seul appel),
+    ou estimation à vol d'oiseau en cas d'échec ou de quota épuisé
+    
+    'segments' donne distance (km) et durée (h) de chaque tronçon entre deux
+    étapes. Un itinéraire refusé par ORS (400/404 : point non routable, distance
+    excessive) est mémorisé : les demandes suivantes passent directement à
+    l'estimation sans appel ORS.
+    """
+    negative_key = route_negative_key(*coords)
+    if negative_cache.known('route', negative_key):
+        return route_fallback(coords, 'refused')
+    
     try:
         headers = {
             'Authorization': OPENROUTE_API_KEY,
@@ -267,162 +587,1351 @@ def calculate_distance_and_route(city1, city2):
         }
         
         body = {
-            'coordinates': [
-                [coords1['lon'], coords1['lat']],
-                [coords2['lon'], coords2['lat']]
-            ]
+            'coordinates': [[c['lon'], c['lat']] for c in coords]
         }
         
-        response = requests.post('https://api.openrouteservice.org/v2/directions/driving-car', json=body, headers=headers, timeout=10)
+        status, data = upstream_json(
+            'ors', 'POST', OPENROUTE_API_URL, json_body=body, headers=headers, priority=priority
+        )
         
-        if response.status_code == 200:
-            data = response.json()
-            
+        if status == 200:
             if 'routes' in data and len(data['routes']) > 0:
                 route = data['routes'][0]
                 distance = route['summary']['distance'] / 1000
                 duration = route['summary']['duration'] / 3600
                 
-                logger.info(f"✅ Distance {city1}-{city2}: {distance:.0f} km")
+                route_name = '-'.join(cities)
+                logger.info(
+                    "✅ Distance %s: %.0f km", route_name, distance,
+                    extra=sampled(event='route', route=route_name, distance_km=round(distance, 1))
+                )
                 
                 return {
                     'distance': round(distance, 1),
                     'duration': round(duration, 2),
                     'geometry': route.get('geometry'),
-                    'coordinates': []
-                }, None
+                    'coordinates': [],
+                    'segments': [
+                        {'distance': segment['distance'] / 1000, 'duration': segment['duration'] / 3600}
+                        for segment in route.get('segments', [])
+                    ]
+                }
+        
+        refused = status in (400, 404)
+        if refused:
+            negative_cache.add('route', negative_key)
         
         logger.warning("⚠️  OpenRoute: fallback Haversine")
-        return calculate_distance_haversine(coords1, coords2), None
+        return route_fallback(coords, 'refused' if refused else 'error')
+        
+    except QuotaExceeded as e:
+        logger.warning(f"⚠️  OpenRoute: {e} - fallback")
+        return route_fallback(coords, 'quota')
         
     except Exception as e:
         logger.error(f"❌ OpenRoute: {e} - fallback")
-        return calculate_distance_haversine(coords1, coords2), None
+        return route_fallback(coords, 'error')
+
+
+# ==================== SERVICE DE CALCUL ====================
+
+# Session partagée : connexions keep-alive vers le service de calcul
+travel_service_session = requests.Session()
+
+
+@lru_cache(maxsize=1)
+def get_soap_client():
+    """Client zeep réutilisé (le WSDL n'est téléchargé qu'une fois)"""
+    # Import différé : zeep (~100 ms d'import) ne sert qu'avec SOAP_PROTOCOL=soap
+    from zeep import Client
+    return Client(SOAP_SERVICE_URL)
+
+
+def travel_service_reachable():
+    """True si le service de calcul répond (WSDL servi)"""
+    try:
+        return travel_service_session.get(SOAP_SERVICE_URL, timeout=1).status_code == 200
+    except requests.RequestException:
+        return False
+
+
+def call_travel_service(method, **params):
+    """Appelle une méthode du TravelTimeService via l'endpoint JSON interne ou SOAP"""
+    if SOAP_PROTOCOL == 'soap':
+        return getattr(get_soap_client().service, method)(**params)
+    
+    response = travel_service_session.get(f'{SOAP_JSON_URL}/{method}', params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+# Part de l'autonomie utilisable entre deux recharges, comme le service de calcul
+SAFETY_MARGIN = 0.85
+
+
+def local_stops_and_time(distance, vehicle):
+    """Nombre d'arrêts et temps total, mêmes formules que le service de calcul"""
+    effective_range = vehicle['autonomy'] * SAFETY_MARGIN
+    num_stops = max(0, int((distance - effective_range) / effective_range) + 1) if distance > effective_range else 0
+    
+    driving_time = distance / 90
+    total_time = driving_time + (num_stops * vehicle['chargeTime'])
+    
+    return num_stops, total_time
+
+
+def calculate_stops_and_time(distance, vehicle):
+    """Nombre d'arrêts et temps total via le service de calcul, ou calcul local si indisponible"""
+    if SOAP_PROTOCOL == 'local':
+        return local_stops_and_time(distance, vehicle)
+    
+    try:
+        num_stops = call_travel_service(
+            'calculate_number_of_stops',
+            distance=float(distance),
+            autonomy=float(vehicle['autonomy'])
+        )
+        
+        total_time = call_travel_service(
+            'calculate_travel_time',
+            distance=float(distance),
+            autonomy=float(vehicle['autonomy']),
+            charge_time=float(vehicle['chargeTime'])
+        )
+    except Exception as e:
+        logger.warning(f"SOAP indisponible: {e}")
+        return local_stops_and_time(distance, vehicle)
+    
+    return num_stops, total_time
 
 
 # ==================== BORNES IRVE ====================
 
-def find_charging_stations_on_route(coords1, coords2, num_stops):
-    """Trouve les bornes sur l'itinéraire"""
+# Bornes déjà rencontrées, indexées par puissance, type de prise et position
+station_index = StationIndex(max_stations=STATION_INDEX_MAX)
+
+# Borne la plus proche (ou borne générique) par (cellule, rayon, filtres)
+nearest_station_cache = TTLCache(maxsize=NEAREST_CACHE_SIZE, ttl=NEAREST_CACHE_TTL)
+
+
+def iter_charging_stations_on_route(coords1, coords2, num_stops, min_power=None, connector=None, corridor_stops=None,
+                                    points=None, distance=None):
+    """
+    Bornes de l'itinéraire, produites au fur et à mesure de leur résolution
+    
+    Les arrêts déjà choisis dans le corridor sont produits immédiatement ; les
+    autres sont recherchés en parallèle autour de leur point et produits dans
+    l'ordre d'arrivée (stop_number indique leur rang sur le trajet).
+    
+    Args:
+        corridor_stops: Arrêts déjà choisis dans le corridor (select_corridor_stops) ;
+            seuls les arrêts manquants (None) sont recherchés autour du point
+        points, distance: Tracé et distance routière de l'itinéraire ; s'ils sont
+            donnés (trajet à étapes), les points de recherche sont répartis le long
+            du tracé plutôt que sur le segment départ-arrivée
+    """
     if num_stops == 0:
-        return []
+        return
     
-    stations = []
+    ratios = [i / (num_stops + 1) for i in range(num_stops + 1)]
+    along_route = RouteCorridor(points).points_at(ratios) if points else None
     
-    for i in range(1, num_stops + 1):
-        ratio = i / (num_stops + 1)
-        lat = coords1['lat'] + (coords2['lat'] - coords1['lat']) * ratio
-        lon = coords1['lon'] + (coords2['lon'] - coords1['lon']) * ratio
+    def lookup(i):
+        ratio = ratios[i]
+        if along_route:
+            lat, lon = along_route[i]
+            distance_from_start = distance * ratio
+        else:
+            lat = coords1['lat'] + (coords2['lat'] - coords1['lat']) * ratio
+            lon = coords1['lon'] + (coords2['lon'] - coords1['lon']) * ratio
+            distance_from_start = calculate_distance_haversine(coords1, {'lat': lat, 'lon': lon})['distance']
         
-        station = find_nearest_charging_station(lat, lon)
+        station = find_nearest_charging_station(lat, lon, min_power=min_power, connector=connector)
         if station:
             station['stop_number'] = i
-            station['distance_from_start'] = round(
-                calculate_distance_haversine(coords1, {'lat': lat, 'lon': lon})['distance'], 
-                1
-            )
-            stations.append(station)
+            station['distance_from_start'] = round(distance_from_start, 1)
+        return station
+    
+    missing = []
+    for i in range(1, num_stops + 1):
+        if corridor_stops and corridor_stops[i - 1]:
+            yield corridor_stops[i - 1]
+        else:
+            missing.append(i)
+    
+    if not missing:
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+        for future in as_completed([executor.submit(lookup, i) for i in missing]):
+            station = future.result()
+            if station:
+                yield station
+
+
+def find_charging_stations_on_route(coords1, coords2, num_stops, min_power=None, connector=None, corridor_stops=None):
+    """Trouve les bornes sur l'itinéraire, dans l'ordre des arrêts"""
+    stations = iter_charging_stations_on_route(coords1, coords2, num_stops, min_power, connector, corridor_stops)
+    return sorted(stations, key=lambda s: s['stop_number'])
+
+
+def build_station(record, lat, lon):
+    """Construit une station à partir d'un enregistrement IRVE"""
+    fields = record.get('fields', {})
+    
+    return {
+        'id': record.get('recordid', ''),
+        'name': fields.get('n_station', 'Station de recharge'),
+        'address': fields.get('ad_station', ''),
+        'city': fields.get('n_amenageur', ''),
+        'power': fields.get('puiss_max', 'N/A'),
+        'connector_type': fields.get('type_prise', 'Type 2'),
+        'lat': fields.get('coordonneesxy', [None, None])[0] or lat,
+        'lon': fields.get('coordonneesxy', [None, None])[1] or lon,
+        'available': True
+    }
+
+
+def build_fallback_station(lat, lon, min_power=None, connector=None):
+    """
+    Station générique utilisée quand IRVE ne renvoie aucune borne (compatible)
+    
+    Avec un filtre de puissance ou de prise, puissance et prise restent
+    inconnues : rien ne garantit une borne 50 kW CCS à cet endroit.
+    """
+    filtered = bool(min_power or connector)
+    return {
+        'id': f'fallback_{lat}_{lon}',
+        'name': 'Station de recharge',
+        'address': 'Aire d\'autoroute',
+        'power': 'N/A' if filtered else '50 kW',
+        'connector_type': 'N/A' if filtered else 'Type 2 CCS',
+        'lat': lat,
+        'lon': lon,
+        'available': True
+    }
+
+
+def fetch_irve_records(lat, lon, radius_km=20, rows=5, start=0):
+    """
+    Enregistrements IRVE triés par distance autour d'un point (liste vide si aucun),
+    à partir du rang start
+    
+    Raises:
+        requests.HTTPError: réponse IRVE autre que 200 (une erreur n'est pas
+            une absence de borne : rien n'est mis en cache)
+    """
+    params = {
+        'dataset': 'bornes-irve',
+        'geofilter.distance': f'{lat},{lon},{radius_km * 1000}',
+        'rows': rows,
+        'start': start,
+        'sort': 'dist'
+    }
+    
+    status, payload = upstream_json('irve', 'GET', IRVE_API_URL, params=params)
+    
+    if status != 200:
+        raise requests.HTTPError(f"IRVE HTTP {status}")
+    
+    return payload.get('records', [])
+
+
+def index_irve_records(records, lat, lon):
+    """Ajoute à l'index les bornes IRVE géolocalisées ; renvoie les stations construites"""
+    stations = []
+    
+    for record in records:
+        station = build_station(record, lat, lon)
+        # Sans coordonnées, la borne serait indexée au point de recherche
+        if record.get('fields', {}).get('coordonneesxy'):
+            station_index.add(station)
+        stations.append(station)
     
     return stations
 
 
-def find_nearest_charging_station(lat, lon, radius_km=20):
-    """Trouve la borne la plus proche"""
+def nearest_cache_key(lat, lon, radius_km, min_power, connector):
+    """Clé de cache : cellule géographique quantifiée, rayon et filtres"""
+    return (
+        floor(lat / NEAREST_CACHE_CELL_DEG),
+        floor(lon / NEAREST_CACHE_CELL_DEG),
+        radius_km,
+        min_power,
+        connector
+    )
+
+
+def find_nearest_charging_station(lat, lon, radius_km=20, min_power=None, connector=None):
+    """
+    Trouve la borne compatible la plus proche
+    
+    Le résultat est mis en cache par cellule géographique : un point voisin
+    d'un point déjà recherché est servi sans appel IRVE.
+    
+    Avec un filtre, les bornes sont lues par pages (triées par distance)
+    jusqu'à une borne compatible ou jusqu'à épuisement du rayon : la borne
+    générique n'est mise en cache négatif que si aucune borne compatible
+    n'existe dans le rayon.
+    
+    Args:
+        min_power: Puissance minimale en kW (None : pas de filtre)
+        connector: Type de prise normalisé (clé de CONNECTOR_TYPES)
+    """
+    key = nearest_cache_key(lat, lon, radius_km, min_power, connector)
+    cached = nearest_station_cache.get(key)
+    if cached is not MISS:
+        return dict(cached)
+    
+    # Aucune borne compatible connue dans cette cellule : borne générique sans appel IRVE
+    if negative_cache.known('station', key):
+        return build_fallback_station(lat, lon, min_power, connector)
+    
     try:
-        params = {
-            'dataset': 'bornes-irve',
-            'geofilter.distance': f'{lat},{lon},{radius_km * 1000}',
-            'rows': 5,
-            'sort': 'dist'
-        }
-        
-        response = requests.get(IRVE_API_URL, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
+        start = 0
+        while True:
+            records = fetch_irve_records(lat, lon, radius_km, rows=STATION_QUERY_ROWS, start=start)
+            index_irve_records(records, lat, lon)
             
-            if 'records' in data and len(data['records']) > 0:
-                record = data['records'][0]
-                fields = record.get('fields', {})
-                
-                return {
-                    'id': record.get('recordid', ''),
-                    'name': fields.get('n_station', 'Station de recharge'),
-                    'address': fields.get('ad_station', ''),
-                    'city': fields.get('n_amenageur', ''),
-                    'power': fields.get('puiss_max', 'N/A'),
-                    'connector_type': fields.get('type_prise', 'Type 2'),
-                    'lat': fields.get('coordonneesxy', [None, None])[0] or lat,
-                    'lon': fields.get('coordonneesxy', [None, None])[1] or lon,
-                    'available': True
-                }
+            station = station_index.nearest(lat, lon, radius_km, min_power, connector)
+            if station:
+                nearest_station_cache.set(key, dict(station))
+                return station
+            
+            start += len(records)
+            # Page incomplète : plus aucune borne dans le rayon
+            if len(records) < STATION_QUERY_ROWS:
+                negative_cache.add('station', key)
+                break
+            if start >= STATION_QUERY_MAX_RECORDS:
+                logger.warning(f"⚠️  Aucune borne compatible parmi les {start} plus proches de ({lat:.3f}, {lon:.3f})")
+                break
         
-        return {
-            'id': f'fallback_{lat}_{lon}',
-            'name': 'Station de recharge',
-            'address': 'Aire d\'autoroute',
-            'power': '50 kW',
-            'connector_type': 'Type 2 CCS',
-            'lat': lat,
-            'lon': lon,
-            'available': True
-        }
+        return build_fallback_station(lat, lon, min_power, connector)
         
     except Exception as e:
         logger.error(f"Erreur IRVE: {e}")
         return None
 
 
-# ==================== ROUTES API ====================
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-
-@app.route('/api/info')
-def api_info():
-    return jsonify({
-        'service': 'EV Trip Planner API',
-        'version': '2.0',
-        'status': 'online',
-        'endpoints': {
-            'vehicles': '/api/vehicles',
-            'cities': '/api/cities',
-            'plan_trip': '/api/plan-trip'
+def fetch_irve_polygon_records(polygon, rows=CORRIDOR_ROWS, max_records=CORRIDOR_MAX_RECORDS):
+    """
+    Enregistrements IRVE situés dans un polygone (liste de (lat, lon)), par pages de rows
+    
+    Raises:
+        requests.HTTPError: réponse IRVE en erreur
+    
+    Returns:
+        (enregistrements, truncated) ; truncated si le polygone contient plus de
+        max_records bornes (les suivantes ne sont pas lues)
+    """
+    geofilter = ','.join(f'({lat:.5f},{lon:.5f})' for lat, lon in polygon)
+    records = []
+    
+    while True:
+        params = {
+            'dataset': 'bornes-irve',
+            'geofilter.polygon': geofilter,
+            'rows': min(rows, max_records - len(records)),
+            'start': len(records)
         }
-    })
-
-
-@app.route('/api/vehicles', methods=['GET'])
-def get_vehicles():
-    try:
-        vehicles = fetch_vehicles_from_chargetrip()
+        status, payload = upstream_json('irve', 'GET', IRVE_API_URL, params=params, timeout=15)
         
-        brand = request.args.get('brand')
-        min_autonomy = request.args.get('min_autonomy', type=int)
-        
-        if brand:
-            vehicles = [v for v in vehicles if v['brand'].lower() == brand.lower()]
-        if min_autonomy:
-            vehicles = [v for v in vehicles if v['autonomy'] >= min_autonomy]
+        if status != 200:
+            raise requests.HTTPError(f"IRVE HTTP {status}")
         
-        return jsonify({
-            'success': True,
-            'count': len(vehicles),
-            'source': 'Chargetrip GraphQL API',
-            'vehicles': vehicles
-        })
+        page = payload.get('records', [])
+        records.extend(page)
+        total = payload.get('nhits', len(records))
         
-    except Exception as e:
-        logger.error(f"Erreur get_vehicles: {e}")
-        return jsonify({'error': str(e)}), 500
+        if not page or len(records) >= total:
+            return records, False
+        if len(records) >= max_records:
+            logger.warning(f"⚠️  Corridor tronqué : {len(records)}/{total} bornes lues")
+            return records, True
+
+
+def find_stations_in_corridor(points, distance, buffer_km=CORRIDOR_BUFFER_KM, min_power=None, connector=None):
+    """
+    Bornes compatibles à moins de buffer_km de l'itinéraire, triées par position le long du trajet
+    
+    Returns:
+        Liste de stations avec distance_from_start et distance_from_route (km),
+        ou None si IRVE est indisponible
+    """
+    return search_corridor(points, distance, buffer_km, min_power, connector)[0]
+
+
+def search_corridor(points, distance, buffer_km=CORRIDOR_BUFFER_KM, min_power=None, connector=None):
+    """
+    Requête IRVE sur le polygone tampon du tracé (paginée), puis distance exacte
+    au tracé (grille de segments, calcul vectorisé)
+    
+    Returns:
+        (stations ou None si IRVE est indisponible, truncated)
+    """
+    try:
+        corridor = RouteCorridor(points, buffer_km)
+        records, truncated = fetch_irve_polygon_records(corridor.polygon())
+        records = [r for r in records if r.get('fields', {}).get('coordonneesxy')]
+    except Exception as e:
+        logger.error(f"Erreur IRVE (corridor): {e}")
+        return None, False
+    
+    stations = index_irve_records(records, None, None)
+    if not stations:
+        return [], truncated
+    
+    distances, along = corridor.locate([s['lat'] for s in stations], [s['lon'] for s in stations])
+    # Positions ramenées à la distance routière annoncée par ORS
+    ratio = distance / corridor.length_km if corridor.length_km else 0
+    
+    corridor_stations = []
+    for station, off_route, position in zip(stations, distances, along):
+        if off_route > buffer_km or not StationIndex.matches(station, min_power, connector):
+            continue
+        station = dict(station)
+        station['distance_from_start'] = round(float(position) * ratio, 1)
+        station['distance_from_route'] = round(float(off_route), 2)
+        corridor_stations.append(station)
+    
+    corridor_stations.sort(key=lambda s: s['distance_from_start'])
+    logger.info(
+        "📍 Corridor %s km: %d/%d bornes", buffer_km, len(corridor_stations), len(records),
+        extra=sampled(event='corridor', buffer_km=buffer_km, stations=len(corridor_stations), records=len(records))
+    )
+    return corridor_stations, truncated
+
+
+def select_corridor_stops(corridor_stations, distance, num_stops):
+    """
+    Arrêts répartis régulièrement : pour chaque position cible, borne du corridor
+    la plus proche le long du trajet (None si aucune à moins d'un demi-intervalle)
+    """
+    spacing = distance / (num_stops + 1)
+    positions = [s['distance_from_start'] for s in corridor_stations]
+    stops = []
+    
+    for i in range(1, num_stops + 1):
+        target = spacing * i
+        k = bisect_left(positions, target)
+        nearby = [j for j in (k - 1, k) if 0 <= j < len(positions)]
+        best = min(nearby, key=lambda j: abs(positions[j] - target), default=None)
+        
+        if best is None or abs(positions[best] - target) > spacing / 2:
+            stops.append(None)
+        else:
+            stops.append(dict(corridor_stations[best], stop_number=i))
+    
+    return stops
+
+
+def project_on_segment(coords1, coords2, point):
+    """Position relative (0-1) de la projection d'un point sur le segment départ-arrivée"""
+    scale = cos(radians((coords1['lat'] + coords2['lat']) / 2))
+    dx = (coords2['lon'] - coords1['lon']) * scale
+    dy = coords2['lat'] - coords1['lat']
+    px = (point['lon'] - coords1['lon']) * scale
+    py = point['lat'] - coords1['lat']
+    length = dx * dx + dy * dy
+    
+    if length == 0:
+        return 0.0
+    
+    return min(1.0, max(0.0, (px * dx + py * dy) / length))
+
+
+def find_candidate_stations(coords1, coords2, distance, min_power=None, connector=None, route=None):
+    """
+    Bornes candidates le long de l'itinéraire pour le planificateur optimal
+    
+    route : tracé de l'itinéraire (trajet à étapes) ; points d'échantillonnage
+    et positions des bornes pris le long du tracé plutôt que sur le segment départ-arrivée
+    """
+    samples = max(1, int(distance / CANDIDATE_SPACING_KM))
+    ratios = [i / (samples + 1) for i in range(1, samples + 1)]
+    
+    if route:
+        # Tampon large : les bornes trouvées autour des points peuvent être loin du tracé
+        corridor = RouteCorridor(route, CORRIDOR_MAX_BUFFER_KM)
+        points = corridor.points_at(ratios)
+    else:
+        corridor = None
+        points = [
+            (
+                coords1['lat'] + (coords2['lat'] - coords1['lat']) * ratio,
+                coords1['lon'] + (coords2['lon'] - coords1['lon']) * ratio
+            )
+            for ratio in ratios
+        ]
+    
+    def fetch(point):
+        try:
+            return point, fetch_irve_records(point[0], point[1], rows=CANDIDATE_ROWS)
+        except Exception as e:
+            logger.error(f"Erreur IRVE: {e}")
+            return point, []
+    
+    candidates = {}
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for (lat, lon), records in executor.map(fetch, points):
+            for station in index_irve_records(records, lat, lon):
+                if not StationIndex.matches(station, min_power, connector):
+                    continue
+                station = dict(station)
+                if corridor is None:
+                    station['distance_from_start'] = round(distance * project_on_segment(coords1, coords2, station), 1)
+                candidates[station['id']] = station
+    
+    candidates = list(candidates.values())
+    if corridor is not None and candidates:
+        # Positions le long du tracé, ramenées à la distance routière
+        _, along = corridor.locate([s['lat'] for s in candidates], [s['lon'] for s in candidates])
+        ratio = distance / corridor.length_km if corridor.length_km else 0
+        for station, position in zip(candidates, along):
+            station['distance_from_start'] = round(float(position) * ratio, 1)
+    
+    return candidates
+
+
+# ==================== TABLE PRÉCALCULÉE ====================
+
+# Table chargée (None : mode désactivé ou table pas encore disponible)
+trip_table = None
+trip_table_lock = threading.Lock()
+
+
+def table_route(departure, destination):
+    """Itinéraire lu dans la table précalculée, ou None"""
+    return trip_table.route(departure, destination) if trip_table is not None else None
+
+
+def table_pair_stations(departure, destination, points, distance, stop_counts):
+    """Bornes retenues pour une paire de villes, pour chaque nombre d'arrêts possible"""
+    cities_dict = fetch_cities_from_api()
+    coords1, coords2 = cities_dict[departure], cities_dict[destination]
+    corridor_stations = find_stations_in_corridor(points, distance)
+    
+    plans = {}
+    for num_stops in stop_counts:
+        corridor_stops = None
+        if num_stops and corridor_stations:
+            corridor_stops = select_corridor_stops(corridor_stations, distance, num_stops)
+        plans[num_stops] = find_charging_stations_on_route(coords1, coords2, num_stops, corridor_stops=corridor_stops)
+    
+    return plans
+
+
+def build_trip_table(path=TRIP_TABLE_PATH):
+    """Construit la table pour le catalogue courant, l'enregistre et l'active"""
+    global trip_table
+    
+    cities_dict = fetch_cities_from_api()
+    vehicles = fetch_vehicles_from_chargetrip(priority='warmup')
+    
+    def route_fn(departure, destination):
+        # Toujours l'itinéraire ORS courant, jamais celui de l'ancienne table
+        # Priorité 'batch' : ne prend jamais la réserve de quota ORS du trafic interactif
+        route = request_route(
+            [departure, destination], [cities_dict[departure], cities_dict[destination]], priority='batch'
+        )
+        # Sans tracé, c'est l'estimation à vol d'oiseau (échec ORS, quota épuisé) :
+        # paire absente de la table, calculée en direct à la demande
+        return route if route.get('geometry') else None
+    
+    logger.info(f"🔄 Construction de la table : {len(cities_dict)} villes x {len(vehicles)} véhicules")
+    table = TripTable.build(cities_dict, vehicles, route_fn, table_pair_stations, workers=TRIP_TABLE_WORKERS)
+    table.save(path)
+    
+    with trip_table_lock:
+        trip_table = table
+    return table
+
+
+def activate_current_table(table, version):
+    """Active table si elle correspond au catalogue et n'est pas trop ancienne"""
+    global trip_table
+    
+    if table is None or table.version != version or time.time() - table.built_at >= TRIP_TABLE_MAX_AGE_S:
+        return None
+    
+    with trip_table_lock:
+        trip_table = table
+    return table
+
+
+def refresh_trip_table(path=TRIP_TABLE_PATH, build=True):
+    """
+    Active la table enregistrée si elle correspond au catalogue courant et n'est
+    pas trop ancienne ; sinon la reconstruit (si build)
+    
+    Entre workers, un seul construit la table : les autres attendent le verrou
+    puis relisent le fichier enregistré.
+    """
+    version = catalog_version(fetch_cities_from_api(), fetch_vehicles_from_chargetrip(priority='warmup'))
+    table = trip_table if trip_table is not None else TripTable.load(path)
+    
+    if activate_current_table(table, version):
+        return table
+    
+    if table is not None:
+        logger.info(f"🔄 Table obsolète (version {table.version}, catalogue {version})")
+    if not build:
+        return None
+    
+    with file_lock(f'{path}.lock'):
+        table = activate_current_table(TripTable.load(path), version)
+        return table if table is not None else build_trip_table(path)
+
+
+def run_trip_table_scheduler():
+    """Thread de fond : table au démarrage, puis (mode schedule) vérification périodique"""
+    while True:
+        try:
+            refresh_trip_table()
+        except Exception as e:
+            logger.error(f"❌ Table précalculée: {e}")
+        
+        if TRIP_TABLE_MODE != 'schedule':
+            return
+        
+        time.sleep(TRIP_TABLE_REFRESH_S)
+        # Relit les catalogues : un changement de version déclenche la reconstruction
+        fetch_city_store.cache_clear()
+        cities_at_threshold.cache_clear()
+        cities_at_population.cache_clear()
+        vehicles_cache.clear()
+
+
+def start_trip_table():
+    """Démarre le chargement / la construction de la table sans bloquer le démarrage"""
+    thread = threading.Thread(target=run_trip_table_scheduler, name='trip-table', daemon=True)
+    thread.start()
+    return thread
+
+
+# ==================== PLANIFICATION ====================
+
+def parse_station_filters(params):
+    """Filtres de bornes (min_power en kW, connector) ; ValueError si invalides"""
+    connector = params.get('connector') or None
+    
+    try:
+        min_power = float(params['min_power']) if params.get('min_power') else None
+    except (TypeError, ValueError):
+        raise ValueError('Puissance minimale invalide')
+    
+    # nan / inf / négatif : aucune classe de puissance ne correspond
+    if min_power is not None and not (isfinite(min_power) and min_power >= 0):
+        raise ValueError('Puissance minimale invalide')
+    
+    if connector and connector not in CONNECTOR_TYPES:
+        raise ValueError(f"Type de prise inconnu (attendu : {', '.join(CONNECTOR_TYPES)})")
+    
+    return min_power, connector
+
+
+def parse_coordinates(value):
+    """
+    Point (lat, lon) d'un départ ou d'une destination : {'lat', 'lon'}, [lat, lon]
+    ou 'lat,lon' ; None pour un nom de ville ; ValueError si invalide
+    """
+    if isinstance(value, dict):
+        value = (value.get('lat'), value.get('lon'))
+    elif isinstance(value, str):
+        parts = value.split(',')
+        # Nom de ville (éventuellement avec virgule) : pas deux nombres
+        if len(parts) != 2 or not all(part.strip().lstrip('+-').replace('.', '', 1).isdigit() for part in parts):
+            return None
+        value = parts
+    elif not isinstance(value, (list, tuple)) or len(value) != 2:
+        return None
+    
+    try:
+        lat, lon = float(value[0]), float(value[1])
+    except (TypeError, ValueError):
+        raise ValueError('Coordonnées invalides')
+    
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('Coordonnées invalides')
+    return lat, lon
+
+
+def nearest_cities(lat, lon, k=1, max_km=None):
+    """Communes les plus proches d'un point (index spatial du catalogue, sans appel réseau)"""
+    cities_dict = fetch_city_store()
+    return [
+        dict(cities_dict.record(row), key=cities_dict.key(row), distance_km=round(distance, 2))
+        for distance, row in cities_dict.nearest(lat, lon, k, max_km)
+    ]
+
+
+def resolve_trip_city(value):
+    """
+    Clé de ville d'un départ ou d'une destination
+    
+    Un nom de ville est normalisé ; des coordonnées sont rattachées à la commune
+    la plus proche (à moins de CITY_SNAP_MAX_KM).
+    
+    Returns:
+        (clé, point d'origine {lat, lon, distance_km} ou None) ; ValueError si
+        les coordonnées sont invalides ou loin de toute commune
+    """
+    coordinates = parse_coordinates(value)
+    if coordinates is None:
+        return normalize_city_key(value if isinstance(value, str) else ''), None
+    
+    matches = nearest_cities(*coordinates, k=1, max_km=CITY_SNAP_MAX_KM)
+    if not matches:
+        raise ValueError(f'Aucune commune à moins de {CITY_SNAP_MAX_KM:g} km')
+    
+    lat, lon = coordinates
+    return matches[0]['key'], {'lat': lat, 'lon': lon, 'distance_km': matches[0]['distance_km']}
+
+
+def find_vehicle(vehicle_id):
+    """Véhicule du catalogue, ou None ; l'identifiant arrive en entier (JSON) ou en texte (query string)"""
+    return next((v for v in fetch_vehicles_from_chargetrip() if str(v['id']) == str(vehicle_id)), None)
+
+
+def trip_waypoints(data):
+    """
+    Étapes d'un trajet, dans l'ordre : 'waypoints' (liste JSON, ou texte
+    'lyon|dijon|paris' en query string), sinon départ et destination
+    """
+    waypoints = data.get('waypoints')
+    if waypoints in (None, '', []):
+        return [data.get('departure'), data.get('destination')]
+    
+    if isinstance(waypoints, str):
+        waypoints = waypoints.split('|')
+    if not isinstance(waypoints, list) or not 2 <= len(waypoints) <= MAX_WAYPOINTS:
+        raise ValueError(f'waypoints : entre 2 et {MAX_WAYPOINTS} étapes attendues')
+    return waypoints
+
+
+def parse_flag(value):
+    """Booléen depuis JSON (true) ou une query string ('true', '1', 'on')"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def prepare_trip(data, priority='interactive'):
+    """
+    Valide une demande de trajet et calcule l'itinéraire
+    
+    Le trajet va de 'departure' à 'destination', ou passe par les étapes
+    'waypoints' dans l'ordre (un seul itinéraire ORS, découpé en tronçons).
+    priority : priorité de l'appel ORS ('batch' pour les traitements par lots)
+    
+    Returns:
+        (trip, None) : contexte du trajet (véhicule, villes, itinéraire, filtres)
+        ou (None, (message, code HTTP)) si la demande ne peut pas aboutir
+    """
+    vehicle_id = data.get('vehicle_id')
+    optimize = parse_flag(data.get('optimize', False))
+    
+    # Nom de ville ou coordonnées GPS (rattachées à la commune la plus proche)
+    try:
+        waypoints = [resolve_trip_city(value) for value in trip_waypoints(data)]
+    except ValueError as e:
+        return None, (str(e), 400)
+    
+    cities = [city for city, _ in waypoints]
+    
+    if not vehicle_id or not all(cities):
+        return None, ('Paramètres manquants', 400)
+    
+    try:
+        min_power, connector = parse_station_filters(data)
+    except ValueError as e:
+        return None, (str(e), 400)
+    
+    try:
+        zoom = int(data['zoom']) if data.get('zoom') not in (None, '') else None
+    except (TypeError, ValueError):
+        return None, ('Niveau de zoom invalide', 400)
+    
+    vehicle = find_vehicle(vehicle_id)
+    
+    if not vehicle:
+        return None, ('Véhicule non trouvé', 404)
+    
+    if any(negative_cache.known('city', key) for key in cities):
+        return None, ('Ville non trouvée', 400)
+    
+    cities_dict = fetch_city_store()
+    
+    unknown = [key for key in cities if key not in cities_dict]
+    if unknown:
+        for key in unknown:
+            negative_cache.add('city', key)
+        return None, ('Ville non trouvée', 400)
+    
+    coords = [cities_dict[key] for key in cities]
+    
+    route_data, error = calculate_waypoints_route(cities, priority=priority)
+    
+    if not route_data:
+        return None, ('Impossible de calculer l\'itinéraire', 400)
+    
+    points = route_points(route_data, *coords)
+    # Sans zoom demandé : celui qui affiche tout l'itinéraire
+    zoom = fit_zoom(points) if zoom is None else max(0, min(MAX_ZOOM, zoom))
+    
+    return {
+        'vehicle': vehicle,
+        'departure': cities[0],
+        'destination': cities[-1],
+        'coords1': coords[0],
+        'coords2': coords[-1],
+        'waypoints': cities,
+        'waypoint_coords': coords,
+        'snapped': [point for _, point in waypoints],
+        'route_data': route_data,
+        'distance': route_data['distance'],
+        'points': points,
+        'zoom': zoom,
+        'optimize': optimize,
+        'min_power': min_power,
+        'connector': connector
+    }, None
+
+
+def compute_trip_stops(trip):
+    """
+    Nombre d'arrêts et temps du trajet : planificateur optimal si demandé et
+    faisable, sinon service de calcul et arrêts répartis dans le corridor
+    
+    Un trajet à étapes est planifié d'un seul tenant sur tout l'itinéraire :
+    la charge restante à une étape est reportée sur le tronçon suivant.
+    
+    Returns:
+        dict {num_stops, time, plan, corridor_stops, stations} ; stations n'est
+        renseigné que pour un trajet lu dans la table précalculée
+    """
+    vehicle, distance = trip['vehicle'], trip['distance']
+    min_power, connector = trip['min_power'], trip['connector']
+    multi_leg = len(trip['waypoints']) > 2
+    
+    # Trajet standard sans filtre : servi par la table précalculée si elle le contient
+    if trip_table is not None and not (multi_leg or trip['optimize'] or min_power or connector):
+        entry = trip_table.lookup(trip['departure'], trip['destination'], vehicle['id'])
+        if entry:
+            return {
+                'num_stops': entry['num_stops'],
+                'time': {
+                    'driving': round(distance / 90, 2),
+                    'charging': round(entry['num_stops'] * vehicle['chargeTime'], 2),
+                    'total': round(entry['total_time'], 2)
+                },
+                'plan': None,
+                'corridor_stops': None,
+                'stations': entry['stations']
+            }
+    
+    plan = None
+    if trip['optimize']:
+        candidates = find_stations_in_corridor(trip['points'], distance, min_power=min_power, connector=connector)
+        if not candidates:
+            candidates = find_candidate_stations(
+                trip['coords1'], trip['coords2'], distance, min_power, connector,
+                route=trip['points'] if multi_leg else None
+            )
+        plan = plan_charging_stops(vehicle, distance, candidates)
+    
+    if plan:
+        return {
+            'num_stops': len(plan['stops']),
+            'time': {
+                'driving': plan['driving_time'],
+                'charging': plan['charging_time'],
+                'total': plan['total_time']
+            },
+            'plan': plan,
+            'corridor_stops': None,
+            'stations': None
+        }
+    
+    num_stops, total_time = calculate_stops_and_time(distance, vehicle)
+    corridor_stops = None
+    if num_stops:
+        corridor_stations = find_stations_in_corridor(trip['points'], distance, min_power=min_power, connector=connector)
+        if corridor_stations:
+            corridor_stops = select_corridor_stops(corridor_stations, distance, num_stops)
+    
+    return {
+        'num_stops': num_stops,
+        'time': {
+            'driving': round(distance / 90, 2),
+            'charging': round(num_stops * vehicle['chargeTime'], 2),
+            'total': round(total_time, 2)
+        },
+        'plan': None,
+        'corridor_stops': corridor_stops,
+        'stations': None
+    }
+
+
+def iter_trip_stations(trip, stops):
+    """
+    Bornes du trajet, produites dès qu'elles sont résolues ; pour un trajet à
+    étapes, 'leg' donne le rang du tronçon de chaque borne
+    """
+    if len(trip['waypoints']) == 2:
+        yield from iter_route_stations(trip, stops)
+        return
+    
+    starts = [leg['start_km'] for leg in trip['route_data']['legs']]
+    for station in iter_route_stations(trip, stops):
+        leg = max(0, bisect_right(starts, station.get('distance_from_start', 0)) - 1)
+        yield dict(station, leg=leg)
+
+
+def iter_route_stations(trip, stops):
+    """
+    Bornes de tout l'itinéraire : arrêts du plan optimal, de la table, ou
+    recherchés en un seul lot parallèle (étapes comprises)
+    """
+    if stops['plan']:
+        yield from stops['plan']['stops']
+        return
+    
+    if stops['stations'] is not None:
+        yield from stops['stations']
+        return
+    
+    multi_leg = len(trip['waypoints']) > 2
+    yield from iter_charging_stations_on_route(
+        trip['coords1'], trip['coords2'], stops['num_stops'],
+        trip['min_power'], trip['connector'], stops['corridor_stops'],
+        points=trip['points'] if multi_leg else None, distance=trip['distance']
+    )
+
+
+def stop_positions(trip, stops):
+    """Position (km) de chaque arrêt et état de charge en repartant"""
+    if stops['plan']:
+        return [(s['distance_from_start'], s['departure_soc']) for s in stops['plan']['stops']]
+    # Service de calcul : arrêts répartis régulièrement, recharge complète
+    spacing = trip['distance'] / (stops['num_stops'] + 1)
+    return [(spacing * i, 1.0) for i in range(1, stops['num_stops'] + 1)]
+
+
+def build_leg_summaries(trip, stops):
+    """
+    Tronçons entre étapes : distance, durée, arrêts et état de charge estimé à
+    l'arrivée (la charge restante est reportée sur le tronçon suivant)
+    """
+    autonomy = float(trip['vehicle']['autonomy'])
+    positions = stop_positions(trip, stops)
+    legs = trip['route_data']['legs']
+    soc, position, k = START_SOC, 0.0, 0
+    summaries = []
+    
+    for n, leg in enumerate(legs):
+        end_km = leg['start_km'] + leg['distance']
+        leg_stops = 0
+        # Arrêts du tronçon (le dernier tronçon prend les arrêts restants)
+        while k < len(positions) and (positions[k][0] <= end_km or n == len(legs) - 1):
+            km, departure_soc = positions[k]
+            position, soc = km, departure_soc
+            leg_stops += 1
+            k += 1
+        soc -= (end_km - position) / autonomy
+        position = end_km
+        
+        summaries.append({
+            'from': trip['waypoints'][n].title(),
+            'to': trip['waypoints'][n + 1].title(),
+            'distance': leg['distance'],
+            'duration': leg['duration'],
+            'numberOfStops': leg_stops,
+            'arrivalSoc': round(max(soc, 0.0), 2)
+        })
+    
+    return summaries
+
+
+def build_trip_summary(trip):
+    """
+    Départ, arrivée et itinéraire : connus dès la réponse d'OpenRouteService
+    
+    'route' est une polyligne encodée (précision 5) simplifiée pour 'routeZoom' ;
+    'waypoints' : toutes les étapes, départ et destination compris ;
+    'snappedFrom' : point GPS demandé, rattaché à la commune 'city'
+    """
+    waypoints = []
+    for city, coords, point in zip(trip['waypoints'], trip['waypoint_coords'], trip['snapped']):
+        waypoint = {'city': city.title(), 'coordinates': coords}
+        if point:
+            waypoint['snappedFrom'] = point
+        waypoints.append(waypoint)
+    
+    return {
+        'vehicle': trip['vehicle'],
+        'departure': waypoints[0],
+        'destination': waypoints[-1],
+        'waypoints': waypoints,
+        'distance': trip['distance'],
+        'route': simplified_route(trip['route_data'], trip['zoom']),
+        'routeZoom': trip['zoom']
+    }
+
+
+def build_stops_summary(trip, stops):
+    """Nombre d'arrêts, temps, planificateur retenu et détail par tronçon"""
+    return {
+        'numberOfStops': stops['num_stops'],
+        'time': stops['time'],
+        'planner': 'optimal' if stops['plan'] else 'standard',
+        'filters': {'min_power': trip['min_power'], 'connector': trip['connector']},
+        'legs': build_leg_summaries(trip, stops)
+    }
+
+
+def build_trip_result(trip, stops, charging_stations):
+    """Réponse complète de /api/plan-trip"""
+    return {
+        'success': True,
+        'trip': dict(
+            build_trip_summary(trip),
+            chargingStations=charging_stations,
+            **build_stops_summary(trip, stops)
+        ),
+        'sources': {
+            'vehicle': 'Chargetrip GraphQL API',
+            'route': 'OpenRouteService API',
+            'charging_stations': 'IRVE OpenData API',
+            'calculations': (
+                'Planificateur A*' if stops['plan']
+                else 'Table précalculée' if stops['stations'] is not None
+                else 'Service SOAP'
+            ),
+            'cities': 'API geo.gouv.fr'
+        }
+    }
+
+
+# ==================== VILLES ATTEIGNABLES ====================
+
+def known_road_distance(origin, destination):
+    """Distance routière déjà connue (cache, table précalculée), None si non routable, MISS si inconnue"""
+    distance = road_distance_cache.get((origin, destination))
+    if distance is MISS:
+        route = table_route(origin, destination)
+        if route and route.get('geometry'):
+            distance = route['distance']
+            road_distance_cache.set((origin, destination), distance)
+    return distance
+
+
+def fetch_road_distances(origin, coords, destinations, priority='interactive'):
+    """
+    Distances routières d'une ville vers plusieurs autres en un appel à la matrice ORS
+    
+    Args:
+        destinations: Liste de (clé, coordonnées)
+    
+    Returns:
+        {clé: km, ou None si non routable} ; {} si ORS est indisponible ou le quota épuisé
+    """
+    if not destinations:
+        return {}
+    
+    try:
+        headers = {
+            'Authorization': OPENROUTE_API_KEY,
+            'Content-Type': 'application/json'
+        }
+        
+        body = {
+            'locations': [[coords['lon'], coords['lat']]] + [[c['lon'], c['lat']] for _, c in destinations],
+            'sources': [0],
+            'destinations': list(range(1, len(destinations) + 1)),
+            'metrics': ['distance'],
+            'units': 'km'
+        }
+        
+        status, data = upstream_json(
+            'ors', 'POST', OPENROUTE_MATRIX_URL, json_body=body, headers=headers, priority=priority
+        )
+        
+        if status != 200 or not data.get('distances'):
+            logger.warning(f"⚠️  Matrice ORS: HTTP {status}")
+            return {}
+        
+        distances = {}
+        for (key, _), distance in zip(destinations, data['distances'][0]):
+            distances[key] = round(distance, 1) if distance is not None else None
+            road_distance_cache.set((origin, key), distances[key])
+        
+        logger.info(
+            "✅ Matrice ORS %s: %d distances", origin, len(distances),
+            extra=sampled(event='matrix', origin=origin, distances=len(distances))
+        )
+        return distances
+        
+    except Exception as e:
+        logger.error(f"❌ Matrice ORS: {e}")
+        return {}
+
+
+def stops_for_distance(distance, effective_range):
+    """Arrêts nécessaires pour une distance routière (formule du service de calcul)"""
+    return max(0, int((distance - effective_range) / effective_range) + 1) if distance > effective_range else 0
+
+
+def compute_reachable(origin, vehicle, max_stops=0, min_population=0, limit=REACHABLE_MAX_RESULTS):
+    """
+    Villes atteignables depuis origin avec au plus max_stops recharges
+    
+    Une passe vectorisée (haversine) sur tout le catalogue élimine les villes
+    hors de portée même avec un détour minimal et accepte celles à portée même
+    avec un détour maximal. Entre les deux, les villes les plus proches sont
+    vérifiées par leur distance routière : cache, table précalculée, puis un
+    seul appel à la matrice ORS pour les autres ; à défaut, estimation (x 1,3).
+    
+    Returns:
+        dict {reach_km, effective_range, refined, truncated, cities} ; cities
+        triées par distance routière croissante
+    """
+    cities_dict = fetch_cities_from_api(min_population)
+    start = fetch_city_store()[origin]
+    effective_range = vehicle['autonomy'] * SAFETY_MARGIN
+    reach_km = effective_range * (max_stops + 1)
+    
+    crow = cities_dict.distances_km(start['lat'], start['lon'])
+    # Estimation du calcul à vol d'oiseau (calculate_distance_haversine)
+    road = crow * 1.3
+    sure = crow * REACHABLE_DETOUR_MAX <= reach_km
+    candidates = np.flatnonzero(crow * REACHABLE_DETOUR_MIN <= reach_km)
+    candidates = candidates[np.argsort(road[candidates], kind='stable')]
+    boundary = [int(row) for row in candidates[~sure[candidates]][:REACHABLE_REFINE_MAX]]
+    
+    distances, unknown = {}, []
+    for row in boundary:
+        key = cities_dict.key(row)
+        distance = known_road_distance(origin, key)
+        if distance is MISS:
+            unknown.append((key, cities_dict[key]))
+        else:
+            distances[key] = distance
+    distances.update(fetch_road_distances(origin, start, unknown))
+    
+    # Filtre sur la distance routière avant de tronquer : une ville proche
+    # mais hors de portée ne prend pas la place d'une ville atteignable
+    reachable = []
+    for row in candidates:
+        row = int(row)
+        key = cities_dict.key(row)
+        if key == origin:
+            continue
+        if key in distances:
+            distance, source = distances[key], 'ors'
+            if distance is None:
+                continue
+        else:
+            distance, source = round(float(road[row]), 1), 'estimation'
+        if distance <= reach_km:
+            reachable.append((distance, row, key, source))
+    
+    reachable.sort(key=lambda item: item[0])
+    truncated = len(reachable) > limit
+    
+    cities = []
+    for distance, row, key, source in reachable[:limit]:
+        city = cities_dict.record(row)
+        cities.append({
+            'name': city['name'],
+            'key': key,
+            'coordinates': {'lat': city['lat'], 'lon': city['lon']},
+            'population': city['population'],
+            'distance_km': round(float(crow[row]), 1),
+            'road_distance_km': distance,
+            'road_distance_source': source,
+            'stops': stops_for_distance(distance, effective_range)
+        })
+    
+    return {
+        'reach_km': round(reach_km, 1),
+        'effective_range': round(effective_range, 1),
+        'refined': len(distances),
+        'truncated': truncated,
+        'cities': cities
+    }
+
+
+# ==================== TÂCHES ASYNCHRONES ====================
+
+def plan_trip_result(data, priority='interactive'):
+    """
+    Planification complète d'un trajet (réponse de /api/plan-trip)
+    
+    Returns:
+        (résultat, None) ou (None, (message, code HTTP))
+    """
+    trip, error = prepare_trip(data, priority=priority)
+    
+    if error:
+        return None, error
+    
+    stops = compute_trip_stops(trip)
+    charging_stations = sorted(iter_trip_stations(trip, stops), key=lambda s: s['stop_number'])
+    result = build_trip_result(trip, stops, charging_stations)
+    
+    logger.info(
+        "✅ Trajet: %s -> %s, %skm, %d arrêts", trip['departure'], trip['destination'], trip['distance'], stops['num_stops'],
+        extra=sampled(
+            event='trip', departure=trip['departure'], destination=trip['destination'],
+            distance_km=trip['distance'], stops=stops['num_stops'], priority=priority
+        )
+    )
+    
+    return result, None
+
+
+def run_plan_trip_job(payload, progress):
+    """Tâche 'plan-trip' : un trajet, mêmes paramètres et même résultat que /api/plan-trip"""
+    result, error = plan_trip_result(payload)
+    
+    if error:
+        raise JobFailed(*error)
+    return result
+
+
+def run_plan_trips_job(payload, progress):
+    """
+    Tâche 'plan-trips' : lot de trajets {'trips': [...]}, appels amont en priorité 'batch'
+    
+    Un trajet en échec n'interrompt pas le lot : son résultat est {'error', 'status'}.
+    """
+    trips = payload['trips']
+    results, failed = [], 0
+    
+    for done, data in enumerate(trips, 1):
+        try:
+            result, error = plan_trip_result(data, priority='batch')
+        except Exception as e:
+            result, error = None, (str(e), 500)
+        
+        if error:
+            failed += 1
+            result = {'error': error[0], 'status': error[1]}
+        results.append(result)
+        progress(done, len(trips))
+    
+    return {'count': len(trips), 'failed': failed, 'results': results}
+
+
+def validate_job_payload(job_type, payload):
+    """Paramètres d'une tâche vérifiés à la soumission (ValueError si invalides)"""
+    if not isinstance(payload, dict):
+        raise ValueError('payload : objet JSON attendu')
+    
+    if job_type == 'plan-trips':
+        trips = payload.get('trips')
+        if not isinstance(trips, list) or not 1 <= len(trips) <= JOB_BATCH_MAX:
+            raise ValueError(f'trips : liste de 1 à {JOB_BATCH_MAX} trajets attendue')
+        if not all(isinstance(trip, dict) for trip in trips):
+            raise ValueError('trips : chaque trajet est un objet JSON')
+
+
+job_queue = JobQueue(
+    SqliteJobStore(JOB_DB_PATH) if JOB_STORE == 'sqlite' else MemoryJobStore(),
+    workers=JOB_WORKERS,
+    max_pending=JOB_MAX_PENDING,
+    result_ttl=JOB_RESULT_TTL
+)
+job_queue.register('plan-trip', run_plan_trip_job)
+job_queue.register('plan-trips', run_plan_trips_job)
+
+
+# ==================== ROUTES API ====================
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+
+@app.route('/api/info')
+def api_info():
+    return jsonify({
+        'service': 'EV Trip Planner API',
+        'version': '2.0',
+        'status': 'online',
+        'endpoints': {
+            'vehicles': '/api/vehicles',
+            'cities': '/api/cities',
+            'nearest_city': '/api/nearest-city',
+            'reachable': '/api/reachable',
+            'plan_trip': '/api/plan-trip',
+            'plan_trip_stream': '/api/plan-trip/stream',
+            'jobs': '/api/jobs',
+            'corridor_stations': '/api/corridor-stations',
+            'metrics': '/api/metrics',
+            'ready': '/api/ready'
+        }
+    })
+
+
+@app.route('/api/ready', methods=['GET'])
+def get_ready():
+    """Sonde de disponibilité : 200 quand les catalogues sont chargés et le service de calcul joignable"""
+    # Sans préchargement (serveur de développement, gunicorn sans preload) : à la première sonde
+    if not warmed_up.is_set():
+        warm_up()
+    
+    checks = {
+        'catalogs': warmed_up.is_set(),
+        'travel_service': travel_service_reachable()
+    }
+    ready = all(checks.values())
+    
+    return jsonify({
+        'ready': ready,
+        'checks': checks,
+        'trip_table': trip_table is not None,
+        'preloaded': APP_PRELOAD
+    }), 200 if ready else 503
+
+
+@app.route('/api/vehicles', methods=['GET'])
+def get_vehicles():
+    try:
+        vehicles = fetch_vehicles_from_chargetrip()
+        
+        brand = request.args.get('brand')
+        min_autonomy = request.args.get('min_autonomy', type=int)
+        
+        if brand:
+            vehicles = [v for v in vehicles if v['brand'].lower() == brand.lower()]
+        if min_autonomy:
+            vehicles = [v for v in vehicles if v['autonomy'] >= min_autonomy]
+        
+        return jsonify({
+            'success': True,
+            'count': len(vehicles),
+            'source': 'Chargetrip GraphQL API',
+            'vehicles': vehicles
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur get_vehicles: {e}")
+        return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/cities', methods=['GET'])
 def get_cities():
+    """Communes d'au moins min_population habitants (grandes villes par défaut, 0 : toutes)"""
     try:
-        cities_dict = fetch_cities_from_api()
+        min_population = request.args.get('min_population', 100000, type=int)
+        try:
+            cities_dict = fetch_cities_from_api(min_population)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         cities = [
             {
@@ -448,25 +1957,270 @@ def get_cities():
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/plan-trip', methods=['POST'])
-def plan_trip():
+@app.route('/api/nearest-city', methods=['GET'])
+def get_nearest_city():
+    """Communes les plus proches d'un point (lat, lon), k au plus NEAREST_CITY_MAX_K"""
     try:
-        data = request.get_json()
+        try:
+            lat, lon = parse_coordinates((request.args.get('lat'), request.args.get('lon')))
+            k = int(request.args.get('k', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Paramètres lat, lon ou k invalides'}), 400
+        
+        if not 1 <= k <= NEAREST_CITY_MAX_K:
+            return jsonify({'error': f'k doit être compris entre 1 et {NEAREST_CITY_MAX_K}'}), 400
+        
+        cities = [
+            {
+                'name': city['name'],
+                'key': city['key'],
+                'code': city['code'],
+                'coordinates': {'lat': city['lat'], 'lon': city['lon']},
+                'population': city['population'],
+                'distance_km': city['distance_km']
+            }
+            for city in nearest_cities(lat, lon, k)
+        ]
+        
+        return jsonify({
+            'success': True,
+            'query': {'lat': lat, 'lon': lon, 'k': k},
+            'count': len(cities),
+            'source': 'API geo.gouv.fr',
+            'cities': cities
+        })
         
-        vehicle_id = data.get('vehicle_id')
-        departure = data.get('departure', '').lower()
-        destination = data.get('destination', '').lower()
+    except Exception as e:
+        logger.error(f"Erreur get_nearest_city: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/reachable', methods=['GET'])
+def get_reachable():
+    """
+    Villes atteignables depuis 'from' (clé de ville ou 'lat,lon') avec au plus
+    max_stops recharges ; min_population (grandes villes par défaut, 0 : toutes
+    les communes), limit : nombre maximal de villes renvoyées
+    """
+    try:
+        try:
+            origin, origin_point = resolve_trip_city(request.args.get('from'))
+            max_stops = request.args.get('max_stops', 0, type=int)
+            min_population = request.args.get('min_population', 100000, type=int)
+            limit = request.args.get('limit', REACHABLE_MAX_RESULTS, type=int)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if not all([vehicle_id, departure, destination]):
+        if not origin or not request.args.get('vehicle_id'):
             return jsonify({'error': 'Paramètres manquants'}), 400
         
-        vehicles = fetch_vehicles_from_chargetrip()
-        vehicle = next((v for v in vehicles if v['id'] == vehicle_id), None)
+        if not 0 <= max_stops <= 10 or not 1 <= limit <= REACHABLE_MAX_RESULTS:
+            return jsonify({'error': f'max_stops entre 0 et 10, limit entre 1 et {REACHABLE_MAX_RESULTS}'}), 400
         
+        if not 0 <= min_population <= MAX_MIN_POPULATION:
+            return jsonify({'error': f'min_population : entre 0 et {MAX_MIN_POPULATION} attendu'}), 400
+        
+        vehicle = find_vehicle(request.args['vehicle_id'])
         if not vehicle:
             return jsonify({'error': 'Véhicule non trouvé'}), 404
         
-        cities_dict = fetch_cities_from_api()
+        if negative_cache.known('city', origin):
+            return jsonify({'error': 'Ville non trouvée'}), 400
+        if origin not in fetch_city_store():
+            negative_cache.add('city', origin)
+            return jsonify({'error': 'Ville non trouvée'}), 400
+        
+        reachable = compute_reachable(origin, vehicle, max_stops, min_population, limit)
+        
+        departure = {'city': origin.title(), 'coordinates': fetch_city_store()[origin]}
+        if origin_point:
+            departure['snappedFrom'] = origin_point
+        
+        return jsonify({
+            'success': True,
+            'from': departure,
+            'vehicle': vehicle,
+            'max_stops': max_stops,
+            'effective_range': reachable['effective_range'],
+            'reach_km': reachable['reach_km'],
+            'count': len(reachable['cities']),
+            'refined': reachable['refined'],
+            'truncated': reachable['truncated'],
+            'sources': {'cities': 'API geo.gouv.fr', 'road_distances': 'OpenRouteService Matrix API'},
+            'cities': reachable['cities']
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur get_reachable: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/plan-trip', methods=['POST'])
+def plan_trip():
+    try:
+        result, error = plan_trip_result(request.get_json())
+        
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Erreur plan_trip: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def sse_event(event, data):
+    """Message Server-Sent Events (une ligne data JSON)"""
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+
+@app.route('/api/plan-trip/stream', methods=['GET', 'POST'])
+def plan_trip_stream():
+    """
+    Planification progressive en Server-Sent Events
+    
+    Événements : route (itinéraire, dès la réponse ORS), stops (nombre d'arrêts
+    et temps), station (une par borne résolue), done (réponse complète de
+    /api/plan-trip) ou error. GET (EventSource) lit la query string, POST le JSON.
+    """
+    data = request.args.to_dict() if request.method == 'GET' else (request.get_json(silent=True) or {})
+    
+    def generate():
+        try:
+            trip, error = prepare_trip(data)
+            
+            if error:
+                yield sse_event('error', {'error': error[0], 'status': error[1]})
+                return
+            
+            yield sse_event('route', build_trip_summary(trip))
+            
+            stops = compute_trip_stops(trip)
+            yield sse_event('stops', build_stops_summary(trip, stops))
+            
+            charging_stations = []
+            for station in iter_trip_stations(trip, stops):
+                charging_stations.append(station)
+                yield sse_event('station', station)
+            
+            charging_stations.sort(key=lambda s: s['stop_number'])
+            yield sse_event('done', build_trip_result(trip, stops, charging_stations))
+            
+            logger.info(
+                "✅ Trajet (flux): %s -> %s, %d arrêts", trip['departure'], trip['destination'], stops['num_stops'],
+                extra=sampled(
+                    event='trip_stream', departure=trip['departure'], destination=trip['destination'],
+                    distance_km=trip['distance'], stops=stops['num_stops']
+                )
+            )
+            
+        except Exception as e:
+            logger.error(f"Erreur plan_trip_stream: {e}")
+            yield sse_event('error', {'error': str(e), 'status': 500})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        # Pas de cache ni de mise en tampon par un proxy (nginx) : chaque événement part aussitôt
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Soumet une tâche asynchrone : {'type': 'plan-trip' | 'plan-trips', 'payload': {...}}
+    
+    Réponse 202 immédiate avec l'identifiant de la tâche ; le résultat se lit sur
+    GET /api/jobs/<id>. 503 (Retry-After) si JOB_MAX_PENDING tâches sont déjà en attente.
+    """
+    data = request.get_json(silent=True) or {}
+    job_type = data.get('type')
+    payload = data.get('payload')
+    
+    if job_type not in job_queue.handlers:
+        return jsonify({'error': f"type : {', '.join(sorted(job_queue.handlers))} attendu"}), 400
+    
+    try:
+        validate_job_payload(job_type, payload)
+        job = job_queue.submit(job_type, payload)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except QueueFull as e:
+        return jsonify({'error': f"File de tâches pleine : {e}"}), 503, {'Retry-After': '30'}
+    
+    url = f"/api/jobs/{job['id']}"
+    return jsonify(dict(job, url=url)), 202, {'Location': url}
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    État d'une tâche (queued, running, done, failed), avancement et résultat
+    
+    wait : attente de la fin de la tâche en secondes (au plus JOB_WAIT_MAX_S),
+    plutôt que des interrogations répétées
+    """
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        wait = None
+    # nan passerait min/max et rendrait l'attente infinie (worker bloqué)
+    if wait is None or not isfinite(wait):
+        return jsonify({'error': 'wait : nombre de secondes attendu'}), 400
+    wait = min(max(wait, 0), JOB_WAIT_MAX_S)
+    
+    job = job_queue.get(job_id, wait=wait)
+    
+    if job is None:
+        return jsonify({'error': 'Tâche inconnue ou expirée'}), 404
+    
+    return jsonify(job)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Compteurs des caches, des appels amont (coalescence, quotas restants) et de l'index de bornes"""
+    return jsonify({
+        'caches': {
+            'nearest_station': nearest_station_cache.stats(),
+            'route': route_cache.stats(),
+            'road_distance': road_distance_cache.stats(),
+            'negative': negative_cache.stats()
+        },
+        'single_flight': upstream_flight.stats(),
+        'chargetrip': chargetrip_client.stats(),
+        'jobs': job_queue.stats(),
+        'logging': log_setup.stats(),
+        'quotas': rate_scheduler.stats(),
+        'route_fallbacks': dict(route_fallbacks),
+        'trip_table': trip_table.info() if trip_table is not None else {'mode': TRIP_TABLE_MODE, 'loaded': False},
+        'cities': fetch_city_store().info() if fetch_city_store.cache_info().currsize else None,
+        'station_index': {'stations': len(station_index), 'evicted': station_index.evicted}
+    })
+
+
+@app.route('/api/corridor-stations', methods=['GET'])
+def get_corridor_stations():
+    """Bornes à moins de buffer_km de l'itinéraire départ-destination, dans l'ordre du trajet"""
+    try:
+        departure = request.args.get('departure', '').lower()
+        destination = request.args.get('destination', '').lower()
+        
+        if not all([departure, destination]):
+            return jsonify({'error': 'Paramètres manquants'}), 400
+        
+        try:
+            min_power, connector = parse_station_filters(request.args)
+            buffer_km = float(request.args.get('buffer_km', CORRIDOR_BUFFER_KM))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not 0 < buffer_km <= CORRIDOR_MAX_BUFFER_KM:
+            return jsonify({'error': f'buffer_km doit être compris entre 0 et {CORRIDOR_MAX_BUFFER_KM}'}), 400
+        
+        cities_dict = fetch_city_store()
         
         if departure not in cities_dict or destination not in cities_dict:
             return jsonify({'error': 'Ville non trouvée'}), 400
@@ -479,67 +2233,77 @@ def plan_trip():
         if not route_data:
             return jsonify({'error': 'Impossible de calculer l\'itinéraire'}), 400
         
-        distance = route_data['distance']
-        
-        try:
-            soap_client = Client(SOAP_SERVICE_URL)
-            num_stops = soap_client.service.calculate_number_of_stops(
-                distance=float(distance),
-                autonomy=float(vehicle['autonomy'])
-            )
-            
-            total_time = soap_client.service.calculate_travel_time(
-                distance=float(distance),
-                autonomy=float(vehicle['autonomy']),
-                charge_time=float(vehicle['chargeTime'])
-            )
-        except Exception as e:
-            logger.warning(f"SOAP indisponible: {e}")
-            SAFETY_MARGIN = 0.85
-            effective_range = vehicle['autonomy'] * SAFETY_MARGIN
-            num_stops = max(0, int((distance - effective_range) / effective_range) + 1) if distance > effective_range else 0
-            
-            driving_time = distance / 90
-            total_time = driving_time + (num_stops * vehicle['chargeTime'])
+        stations, truncated = search_corridor(
+            route_points(route_data, coords1, coords2), route_data['distance'], buffer_km, min_power, connector
+        )
         
-        charging_stations = find_charging_stations_on_route(coords1, coords2, num_stops)
+        if stations is None:
+            return jsonify({'error': 'Service IRVE indisponible'}), 502
         
-        result = {
+        return jsonify({
             'success': True,
-            'trip': {
-                'vehicle': vehicle,
-                'departure': {'city': departure.title(), 'coordinates': coords1},
-                'destination': {'city': destination.title(), 'coordinates': coords2},
-                'distance': distance,
-                'numberOfStops': num_stops,
-                'chargingStations': charging_stations,
-                'route': route_data.get('coordinates', []),
-                'time': {
-                    'driving': round(distance / 90, 2),
-                    'charging': round(num_stops * vehicle['chargeTime'], 2),
-                    'total': round(total_time, 2)
-                }
-            },
-            'sources': {
-                'vehicle': 'Chargetrip GraphQL API',
-                'route': 'OpenRouteService API',
-                'charging_stations': 'IRVE OpenData API',
-                'calculations': 'Service SOAP',
-                'cities': 'API geo.gouv.fr'
-            }
-        }
-        
-        logger.info(f"✅ Trajet: {departure} -> {destination}, {distance}km, {num_stops} arrêts")
-        
-        return jsonify(result)
+            'departure': departure.title(),
+            'destination': destination.title(),
+            'distance': route_data['distance'],
+            'buffer_km': buffer_km,
+            'filters': {'min_power': min_power, 'connector': connector},
+            'count': len(stations),
+            # Plus de CORRIDOR_MAX_RECORDS bornes dans le polygone : liste incomplète
+            'truncated': truncated,
+            'source': 'IRVE OpenData API',
+            'stations': stations
+        })
         
     except Exception as e:
-        logger.error(f"Erreur plan_trip: {e}")
+        logger.error(f"Erreur get_corridor_stations: {e}")
         return jsonify({'error': str(e)}), 500
 
 
 # ==================== DÉMARRAGE ====================
 
+warmed_up = threading.Event()
+
+
+def warm_up():
+    """
+    Précharge les catalogues et la table précalculée enregistrée (sans la construire)
+    
+    En preload, appelé dans le maître gunicorn avant fork : les workers héritent
+    des données en copie sur écriture au lieu de les recharger chacun.
+    """
+    started = time.time()
+    cities_dict = fetch_cities_from_api()
+    vehicles = fetch_vehicles_from_chargetrip(priority='warmup')
+    
+    if TRIP_TABLE_MODE in ('startup', 'schedule'):
+        refresh_trip_table(build=False)
+    
+    warmed_up.set()
+    logger.info(
+        f"✅ Préchargement : {len(cities_dict)} villes, {len(vehicles)} véhicules, "
+        f"table {'chargée' if trip_table is not None else 'absente'} en {time.time() - started:.2f} s"
+    )
+
+
+def start_background_tasks():
+    """Threads de fond du processus qui sert les requêtes (les threads ne survivent pas au fork)"""
+    if TRIP_TABLE_MODE in ('startup', 'schedule'):
+        start_trip_table()
+
+
+def start_job_workers():
+    """
+    Threads de calcul des tâches asynchrones, lancés seulement par les points
+    d'entrée qui servent l'API (gunicorn post_fork, __main__) : les scripts qui
+    importent app (bancs, test de charge, construction de table) ne prennent pas
+    les tâches du fichier partagé. Sinon, démarrage à la première soumission.
+    """
+    job_queue.start()
+
+
+if not APP_PRELOAD:
+    start_background_tasks()
+
 if __name__ == '__main__':
     PORT = int(os.environ.get('PORT', 5000))
     HOST = os.environ.get('HOST', '0.0.0.0')
@@ -556,4 +2320,5 @@ if __name__ == '__main__':
     print(f"   - Service SOAP (calculs)")
     print("=" * 70)
     
+    start_job_workers()
     app.run(host=HOST, port=PORT, debug=False)
\ No newline at end of file
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# bench_city_store.py
+"""
+Mémoire et temps de recherche du catalogue des communes : dictionnaire de
+dictionnaires (format historique) vs CityStore en colonnes, sur un jeu de
+communes simulées de la taille du référentiel national (~35 000).
+
+La mémoire est mesurée avec tracemalloc (allocations Python et NumPy), soit
+le coût par worker gunicorn sans préchargement. Le rattachement d'un point GPS
+à la commune la plus proche (grille de CityStore.nearest) est comparé à un
+calcul de distance sur toutes les communes.
+
+Exemple :
+    python bench_city_store.py
+    python bench_city_store.py --communes 35000 --repeat 7
+"""
+
+import argparse
+import random
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from city_store import CityStore, _distances_km, normalize_city_key
+from stub_upstreams import build_communes
+
+
+def build_dict(communes):
+    """Catalogue au format historique {clé: {name, population, lat, lon, code}}"""
+    cities = {}
+    for c in communes:
+        lon, lat = c['centre']['coordinates']
+        cities[normalize_city_key(c['nom'])] = {
+            'name': c['nom'],
+            'population': c['population'],
+            'lat': lat,
+            'lon': lon,
+            'code': c['code']
+        }
+    return cities
+
+
+def measure_bytes(factory):
+    """Octets alloués et conservés par factory() ; renvoie (objet, octets)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def measure_us(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalogue des communes : dictionnaire vs colonnes")
+    parser.add_argument('--communes', type=int, default=35000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    communes = build_communes(args.communes)
+    # Homonymes, comme dans le référentiel (Saint-Martin, Sainte-Colombe...)
+    rng = random.Random(7)
+    for c in rng.sample(communes[15:], len(communes) // 10):
+        c['nom'] = f"Saint-{rng.choice(('Martin', 'Pierre', 'Jean', 'Germain', 'Laurent'))}"
+
+    catalogs = {
+        'dict': measure_bytes(lambda: build_dict(communes)),
+        'CityStore': measure_bytes(lambda: CityStore.from_communes(communes))
+    }
+    keys = [normalize_city_key(c['nom']) for c in communes[:1000]]
+
+    print("=" * 70)
+    print(f"🏙️  CATALOGUE DES COMMUNES ({len(communes)} communes)")
+    print("=" * 70)
+    print(f"{'format':<12}{'entrées':>10}{'mémoire Mo':>14}{'octets/commune':>17}{'recherche µs':>15}")
+    for name, (catalog, size) in catalogs.items():
+        lookup_us = measure_us(lambda: [catalog.get(key) for key in keys], args.repeat) / len(keys)
+        print(f"{name:<12}{len(catalog):>10}{size / 1e6:>14.2f}{size / len(catalog):>17.0f}{lookup_us:>15.2f}")
+
+    store = catalogs['CityStore'][0]
+    print(f"CityStore.memory_bytes() : {store.memory_bytes() / 1e6:.2f} Mo "
+          f"({store.info()['distinct_names']} noms distincts)")
+
+    points = [(rng.uniform(43.0, 50.5), rng.uniform(-4.0, 7.5)) for _ in range(200)]
+    for k in (1, 10):
+        grid_us = measure_us(lambda: [store.nearest(lat, lon, k) for lat, lon in points], args.repeat)
+        scan_us = measure_us(
+            lambda: [np.argsort(_distances_km(lat, lon, store.lat, store.lon))[:k] for lat, lon in points],
+            args.repeat
+        )
+        print(f"Communes les plus proches (k={k:<2}) : grille {grid_us / len(points):.1f} µs, "
+              f"toutes les communes {scan_us / len(points):.1f} µs")
+    print("=" * 70)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# bench_graphql.py
+"""
+Coût de la synchronisation du catalogue Chargetrip, sur le faux service
+GraphQL (stub_upstreams.py) :
+- octets envoyés et reçus par jeu de champs (fiche complète vs 'catalog'),
+  avec et sans requête persistée (APQ)
+- durée d'une synchronisation : première (décodage + parsing), suivante
+  inchangée (empreinte identique), et avec ETag (304, rien n'est transféré)
+
+Exemple :
+    python bench_graphql.py
+    python bench_graphql.py --vehicles 500 --repeat 20
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from graphql_client import ChargeTripClient, query_hash, vehicle_list_query
+from stub_upstreams import StubUpstreams
+
+
+def request_bytes(fields, persisted):
+    """Octets du corps de requête vehicleList (document ou empreinte seule)"""
+    query = vehicle_list_query(fields)
+    payload = {'variables': {'size': 50, 'page': 0}}
+    if persisted:
+        payload['extensions'] = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}}
+    else:
+        payload['query'] = query
+    return len(json.dumps(payload))
+
+
+def measure_sync(url, fields, repeat):
+    """
+    Première synchronisation puis synchronisation inchangée, repeat fois
+
+    Returns:
+        (octets reçus 1re, octets reçus suivante, ms 1re, ms suivante)
+    """
+    received, durations = [0, 0], [0.0, 0.0]
+    for _ in range(repeat):
+        client = ChargeTripClient('bench', url=url)
+        for n in range(2):
+            before = client.counters['bytes']
+            started = time.perf_counter()
+            _, changed = client.sync_vehicles(size=10 ** 6, fields=fields)
+            durations[n] += time.perf_counter() - started
+            received[n] += client.counters['bytes'] - before
+        assert not changed
+    return received[0] / repeat, received[1] / repeat, durations[0] / repeat * 1e3, durations[1] / repeat * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synchronisation du catalogue Chargetrip")
+    parser.add_argument('--vehicles', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print(f"🚗 SYNCHRONISATION CHARGETRIP ({args.vehicles} véhicules)")
+    print("=" * 70)
+    print(f"{'champs':<10}{'requête texte':>15}{'requête APQ':>13}")
+    for fields in ('full', 'catalog'):
+        print(f"{fields:<10}{request_bytes(fields, False):>15}{request_bytes(fields, True):>13}")
+
+    print("-" * 70)
+    print(f"{'serveur':<11}{'champs':<9}{'reçu 1re Ko':>13}{'suivante Ko':>13}{'1re ms':>10}{'suivante ms':>13}")
+    for etag in (False, True):
+        with StubUpstreams(vehicles=args.vehicles, chargetrip_etag=etag) as stubs:
+            label = 'ETag' if etag else 'sans ETag'
+            for fields in ('full', 'catalog'):
+                first_bytes, again_bytes, first_ms, again_ms = measure_sync(stubs.url('chargetrip'), fields, args.repeat)
+                print(f"{label:<11}{fields:<9}{first_bytes / 1e3:>13.1f}{again_bytes / 1e3:>13.1f}"
+                      f"{first_ms:>10.2f}{again_ms:>13.2f}")
+
+    print("=" * 70)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# bench_hot_paths.py
+"""
+Microbenchmarks des fonctions pures exécutées à chaque requête
+(haversine, normalisation des clés de ville, parsing des véhicules,
+construction des stations IRVE, corridor d'itinéraire, formules du
+TravelTimeService).
+
+Exemple :
+    python bench_hot_paths.py                  # mesure et compare à bench_baseline.json
+    python bench_hot_paths.py --save           # enregistre une nouvelle référence
+    python bench_hot_paths.py --only haversine --max-regression 0.2
+
+Les références dépendent de la machine : régénérer avec --save avant de
+comparer sur un autre poste.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+
+import app
+from graphql_client import ChargeTripClient
+from polyline import decode_polyline
+from route_corridor import RouteCorridor
+from soap_service import TravelTimeService
+from stub_upstreams import (
+    build_communes, build_irve_polygon_records, build_irve_records, build_ors_route, build_vehicle_list
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BASE_DIR, 'bench_baseline.json')
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Enregistre une fabrique renvoyant la fonction à chronométrer"""
+    def decorator(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return decorator
+
+
+# ==================== BENCHMARKS ====================
+
+@benchmark('haversine')
+def _bench_haversine():
+    paris = app.CITIES_COORDINATES['paris']
+    lyon = app.CITIES_COORDINATES['lyon']
+    return lambda: app.calculate_distance_haversine(paris, lyon)
+
+
+@benchmark('city_key_normalization')
+def _bench_city_keys():
+    names = [c['nom'] for c in build_communes(1000)]
+    normalize = app.normalize_city_key
+
+    def run():
+        for name in names:
+            normalize(name)
+    return run
+
+
+@benchmark('parse_chargetrip_vehicle')
+def _bench_app_vehicle_parsing():
+    vehicles = build_vehicle_list(50)
+    parse = app.parse_chargetrip_vehicle
+
+    def run():
+        for idx, vehicle_data in enumerate(vehicles, 1):
+            parse(idx, vehicle_data)
+    return run
+
+
+@benchmark('graphql_parse_vehicle')
+def _bench_graphql_vehicle_parsing():
+    vehicles = build_vehicle_list(50)
+    client = ChargeTripClient(api_key='bench')
+
+    def run():
+        for vehicle_data in vehicles:
+            client._parse_vehicle(vehicle_data)
+    return run
+
+
+@benchmark('build_station')
+def _bench_build_station():
+    record = build_irve_records(45.76, 4.83, 20000, 1)[0]
+    return lambda: app.build_station(record, 45.76, 4.83)
+
+
+@benchmark('corridor_locate')
+def _bench_corridor_locate():
+    paris = app.CITIES_COORDINATES['paris']
+    marseille = app.CITIES_COORDINATES['marseille']
+    route = build_ors_route([[paris['lon'], paris['lat']], [marseille['lon'], marseille['lat']]])
+    points = decode_polyline(route['routes'][0]['geometry'])
+    corridor = RouteCorridor(points, buffer_km=5)
+    records, _ = build_irve_polygon_records(corridor.polygon(), 2000, km2_per_station=5)
+    lats = [r['fields']['coordonneesxy'][0] for r in records]
+    lons = [r['fields']['coordonneesxy'][1] for r in records]
+    return lambda: corridor.locate(lats, lons)
+
+
+@benchmark('soap_travel_time')
+def _bench_travel_time():
+    return lambda: TravelTimeService.calculate_travel_time(None, 775.0, 395.0, 0.75)
+
+
+@benchmark('soap_number_of_stops')
+def _bench_number_of_stops():
+    return lambda: TravelTimeService.calculate_number_of_stops(None, 775.0, 395.0)
+
+
+@benchmark('soap_charge_time')
+def _bench_charge_time():
+    return lambda: TravelTimeService.calculate_charge_time(None, 775.0, 395, 0.75)
+
+
+# ==================== MESURE / RAPPORT ====================
+
+def measure(func, repeat=5):
+    """Temps minimal par appel en nanosecondes (timeit, nombre d'itérations auto)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run_benchmarks(names=None, repeat=5):
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results[name] = round(measure(factory(), repeat), 1)
+    return results
+
+
+def print_comparison(results, baseline):
+    print("=" * 72)
+    print("⏱️  MICROBENCHMARKS - CHEMINS CRITIQUES")
+    print("=" * 72)
+    print(f"{'benchmark':<28}{'ns/appel':>14}{'référence':>14}{'ratio':>10}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        ratio = f"{value / base:.2f}x" if base else '-'
+        print(f"{name:<28}{value:>14,.1f}{(f'{base:,.1f}' if base else '-'):>14}{ratio:>10}")
+    print("=" * 72)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks des fonctions critiques")
+    parser.add_argument('--only', action='append', help="Nom d'un benchmark à exécuter (répétable)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', action='store_true', help="Enregistre les résultats comme référence")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help="Échec si un benchmark est plus lent que la référence au-delà de ce ratio (0.2 = 20 %%)")
+    args = parser.parse_args(argv)
+
+    # Les formules SOAP journalisent chaque calcul : on mesure le calcul, pas l'I/O des logs
+    logging.disable(logging.INFO)
+    results = run_benchmarks(args.only, args.repeat)
+    logging.disable(logging.NOTSET)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    print_comparison(results, baseline)
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': dict(baseline, **results)
+            }, f, indent=2)
+        print(f"💾 Référence enregistrée dans {args.baseline}")
+        return 0
+
+    if args.max_regression is not None:
+        slower = [
+            name for name, value in results.items()
+            if name in baseline and value > baseline[name] * (1 + args.max_regression)
+        ]
+        if slower:
+            print(f"❌ Régressions : {', '.join(slower)}")
+            return 1
+        print(f"✅ Aucune régression au-delà de {args.max_regression:.0%}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# bench_json.py
+"""
+Mesure la sérialisation JSON et la taille transférée des réponses de l'API :
+encodeur Flask standard (json) vs fournisseur orjson, puis octets et CPU de
+la compression gzip / brotli.
+
+Charges utiles représentatives :
+- plan_trip : réponse /api/plan-trip avec arrêts et tracé complet
+- cities : /api/cities sur ~2000 communes (noms accentués)
+- vehicles : /api/vehicles
+
+Exemple :
+    python bench_json.py
+    python bench_json.py --repeat 7
+"""
+
+import argparse
+import logging
+import sys
+import timeit
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import app
+from polyline import decode_polyline
+from response_encoding import OrjsonProvider, brotli, compress_body
+from stub_upstreams import build_communes, build_irve_records, build_ors_route
+
+ACCENTED_PREFIXES = ('Saint-Étienne', 'Évry', 'Châlons', 'Sainte-Geneviève', 'Besançon', 'Nîmes', 'Béziers')
+
+
+def build_payloads():
+    """Réponses types construites à partir des données simulées"""
+    paris = app.CITIES_COORDINATES['paris']
+    marseille = app.CITIES_COORDINATES['marseille']
+    route = build_ors_route([[paris['lon'], paris['lat']], [marseille['lon'], marseille['lat']]])
+    points = decode_polyline(route['routes'][0]['geometry'])
+    stations = [
+        dict(app.build_station(record, paris['lat'], paris['lon']), stop_number=i, distance_from_start=250.0 * i)
+        for i, record in enumerate(build_irve_records(45.76, 4.83, 20000, 3), 1)
+    ]
+
+    plan_trip = {
+        'success': True,
+        'trip': {
+            'vehicle': app.FALLBACK_VEHICLES[0],
+            'departure': {'city': 'Paris', 'coordinates': paris},
+            'destination': {'city': 'Marseille', 'coordinates': marseille},
+            'distance': 775.3,
+            'numberOfStops': len(stations),
+            'chargingStations': stations,
+            'route': [[lat, lon] for lat, lon in points],
+            'time': {'driving': 8.61, 'charging': 2.25, 'total': 10.86}
+        }
+    }
+
+    communes = build_communes(2000)
+    cities = {
+        'success': True,
+        'count': len(communes),
+        'cities': [
+            {
+                'name': f"{ACCENTED_PREFIXES[idx % len(ACCENTED_PREFIXES)]} {c['nom']}",
+                'key': c['code'],
+                'coordinates': {'lat': c['centre']['coordinates'][1], 'lon': c['centre']['coordinates'][0]},
+                'population': c['population']
+            }
+            for idx, c in enumerate(communes)
+        ]
+    }
+
+    vehicles = {'success': True, 'count': len(app.FALLBACK_VEHICLES), 'vehicles': app.FALLBACK_VEHICLES}
+
+    return {'plan_trip': plan_trip, 'cities': cities, 'vehicles': vehicles}
+
+
+def measure_us(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sérialisation JSON et compression des réponses")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    flask_app = Flask(__name__)
+    providers = {'json': DefaultJSONProvider(flask_app), 'orjson': OrjsonProvider(flask_app)}
+    encodings = ['gzip'] + (['br'] if brotli else [])
+
+    print("=" * 86)
+    print("📦 SÉRIALISATION JSON ET COMPRESSION")
+    print("=" * 86)
+    print(f"{'charge utile':<14}{'encodeur':<10}{'µs/réponse':>12}{'octets':>11}"
+          + ''.join(f"{name + ' octets':>14}{name + ' µs':>11}" for name in encodings))
+
+    with flask_app.app_context():
+        for payload_name, payload in build_payloads().items():
+            for provider_name, provider in providers.items():
+                serialize_us = measure_us(lambda: provider.response(payload).get_data(), args.repeat)
+                body = provider.response(payload).get_data()
+
+                row = f"{payload_name:<14}{provider_name:<10}{serialize_us:>12.1f}{len(body):>11,}"
+                for encoding in encodings:
+                    compressed = compress_body(body, encoding)
+                    compress_us = measure_us(lambda: compress_body(body, encoding), args.repeat)
+                    row += f"{len(compressed):>14,}{compress_us:>11.1f}"
+                print(row)
+
+    print("=" * 86)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# bench_logging.py
+"""
+Coût de la journalisation pour les threads qui servent les requêtes
+
+Le journal de succès d'un trajet (message + champs structurés) est émis par
+plusieurs threads simultanés vers un fichier, selon la configuration :
+- texte synchrone : basicConfig historique (mise en forme et écriture dans
+  le thread appelant, sous le verrou du handler)
+- JSON synchrone : même chose avec une ligne JSON
+- JSON en file : structured_logging (QueueHandler + thread d'écriture)
+- JSON en file échantillonné : idem, un succès sur --sample conservé
+- désactivé : niveau WARNING (borne basse)
+
+Temps par appel vu du thread appelant, coût par requête (LINES_PER_REQUEST
+journaux de succès par planification) et temps de vidage de la file.
+
+Exemple :
+    python bench_logging.py
+    python bench_logging.py --calls 50000 --threads 8 --sample 0.1
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from structured_logging import TEXT_FORMAT, LoggingSetup, json_formatter, sampled
+
+# Journaux de succès émis par une planification /api/plan-trip (itinéraire, trajet)
+LINES_PER_REQUEST = 2
+
+logger = logging.getLogger('bench')
+
+
+def log_trip(n):
+    logger.info(
+        "✅ Trajet: %s -> %s, %skm, %d arrêts", 'paris', 'marseille', 775.2, n % 3,
+        extra=sampled(event='trip', departure='paris', destination='marseille', distance_km=775.2, stops=n % 3)
+    )
+
+
+def log_trip_fstring(n):
+    """Appel historique : message mis en forme avant l'appel, sans champs structurés"""
+    logger.info(f"✅ Trajet: {'paris'} -> {'marseille'}, {775.2}km, {n % 3} arrêts")
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    return root
+
+
+def sync_setup(stream, formatter, level=logging.INFO):
+    root = reset_root()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return None
+
+
+def run_threads(emit, calls, threads):
+    """Durée (s) de calls appels répartis sur threads threads"""
+    per_thread = calls // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for n in range(per_thread):
+            emit(n)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started, per_thread * threads
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coût de la journalisation par appel et par requête")
+    parser.add_argument('--calls', type=int, default=40000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--sample', type=float, default=0.1, help="Taux conservé en mode échantillonné")
+    args = parser.parse_args(argv)
+
+    configs = [
+        ('texte synchrone', log_trip_fstring,
+         lambda f: sync_setup(f, logging.Formatter(TEXT_FORMAT))),
+        ('JSON synchrone', log_trip,
+         lambda f: sync_setup(f, json_formatter({'service': 'bench', 'pid': os.getpid()}))),
+        ('JSON en file', log_trip,
+         lambda f: LoggingSetup('bench', queue_size=args.calls, stream=f)),
+        (f'JSON file {args.sample:.0%}', log_trip,
+         lambda f: LoggingSetup('bench', sample_rate=args.sample, queue_size=args.calls, stream=f)),
+        ('désactivé', log_trip,
+         lambda f: sync_setup(f, logging.Formatter(TEXT_FORMAT), level=logging.WARNING))
+    ]
+
+    print("=" * 70)
+    print(f"📝 JOURNALISATION ({args.calls} appels, {args.threads} threads)")
+    print("=" * 70)
+    print(f"{'configuration':<20}{'µs/appel':>10}{'µs/requête':>12}{'vidage ms':>11}{'lignes':>9}")
+
+    for label, emit, setup in configs:
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as f:
+            queued = setup(f)
+            elapsed, calls = run_threads(emit, args.calls, args.threads)
+
+            # File : temps restant pour que le thread d'écriture ait tout écrit
+            drain_started = time.perf_counter()
+            if queued is not None:
+                queued.stop()
+            drain_ms = (time.perf_counter() - drain_started) * 1e3
+
+            f.flush()
+            f.seek(0)
+            lines = sum(1 for _ in f)
+
+        per_call_us = elapsed / calls * 1e6
+        print(f"{label:<20}{per_call_us:>10.2f}{per_call_us * LINES_PER_REQUEST:>12.2f}"
+              f"{drain_ms:>11.1f}{lines:>9}")
+
+    reset_root()
+    print("=" * 70)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
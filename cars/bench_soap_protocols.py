@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# bench_soap_protocols.py
+"""
+Compare le coût par appel du TravelTimeService selon le protocole :
+SOAP 1.1 (validation lxml + enveloppe XML) et HttpRpc/JSON (/json).
+
+- CPU serveur : appels WSGI en processus, temps CPU par appel (time.process_time)
+- Latence : appels HTTP séquentiels sur un serveur local avec session keep-alive
+
+Exemple :
+    python bench_soap_protocols.py --calls 2000
+"""
+
+import argparse
+import io
+import logging
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+import requests
+
+from bench_soap_server import ENVELOPE, start_server
+from load_test import _free_port, percentile
+
+QUERY = 'distance=775&autonomy=395&charge_time=0.75'
+
+
+def _soap_environ():
+    body = ENVELOPE.encode('utf-8')
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/',
+        'CONTENT_TYPE': 'text/xml; charset=utf-8',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_SOAPACTION': 'calculate_travel_time',
+        'wsgi.input': io.BytesIO(body)
+    }
+    setup_testing_defaults(environ)
+    return environ
+
+
+def _json_environ():
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/json/calculate_travel_time',
+        'QUERY_STRING': QUERY,
+        'wsgi.input': io.BytesIO(b'')
+    }
+    setup_testing_defaults(environ)
+    return environ
+
+
+def measure_cpu(wsgi_application, make_environ, calls):
+    """Temps CPU et temps réel moyens par appel WSGI, en microsecondes"""
+    def start_response(status, headers, exc_info=None):
+        if not status.startswith('200'):
+            raise RuntimeError(status)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(calls):
+        b''.join(wsgi_application(make_environ(), start_response))
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return cpu / calls * 1e6, wall / calls * 1e6
+
+
+def measure_latency(send, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coût par appel SOAP vs JSON du TravelTimeService")
+    parser.add_argument('--calls', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    # Le service journalise chaque calcul : on mesure les protocoles, pas l'I/O des logs
+    logging.disable(logging.INFO)
+    from soap_service import wsgi_application
+
+    results = {}
+    for name, make_environ in (('soap', _soap_environ), ('json', _json_environ)):
+        measure_cpu(wsgi_application, make_environ, 50)  # échauffement
+        results[name] = dict(zip(('cpu_us', 'wall_us'), measure_cpu(wsgi_application, make_environ, args.calls)))
+
+    port = _free_port()
+    process = start_server('threaded', port, workers=1, threads=4)
+    try:
+        session = requests.Session()
+        base = f'http://127.0.0.1:{port}'
+        soap_headers = {'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': 'calculate_travel_time'}
+        senders = {
+            'soap': lambda: session.post(f'{base}/', data=ENVELOPE, headers=soap_headers).raise_for_status(),
+            'json': lambda: session.get(f'{base}/json/calculate_travel_time?{QUERY}').json()
+        }
+        for name, send in senders.items():
+            measure_latency(send, 50)
+            results[name]['p50_ms'], results[name]['p95_ms'] = measure_latency(send, args.calls)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    print("=" * 66)
+    print(f"🔵 PROTOCOLES TravelTimeService - {args.calls} appels")
+    print("=" * 66)
+    print(f"{'protocole':<12}{'CPU µs/appel':>16}{'réel µs/appel':>16}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<12}{stats['cpu_us']:>16.1f}{stats['wall_us']:>16.1f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}")
+    print("=" * 66)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# bench_soap_server.py
+"""
+Compare les serveurs du service SOAP (simple wsgiref, threaded, gunicorn)
+sous charge concurrente : débit et latences p50/p95/p99 d'appels
+calculate_travel_time envoyés en parallèle avec des connexions persistantes.
+
+Exemple :
+    python bench_soap_server.py --concurrency 16 --duration 10
+    python bench_soap_server.py --servers simple gunicorn --workers 4 --threads 8
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from load_test import BASE_DIR, _free_port, _wait_until_ready, percentile
+
+ENVELOPE = (
+    '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+    'xmlns:tns="fr.usmb.info802.evtrip.soap"><soapenv:Body><tns:calculate_travel_time>'
+    '<tns:distance>775</tns:distance><tns:autonomy>395</tns:autonomy>'
+    '<tns:charge_time>0.75</tns:charge_time>'
+    '</tns:calculate_travel_time></soapenv:Body></soapenv:Envelope>'
+)
+
+
+def start_server(name, port, workers, threads):
+    env = dict(
+        os.environ, SOAP_SERVER=name, SOAP_HOST='127.0.0.1', SOAP_PORT=str(port),
+        SOAP_WORKERS=str(workers), SOAP_THREADS=str(threads)
+    )
+    process = subprocess.Popen(
+        [sys.executable, 'soap_service.py'], cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _wait_until_ready(f'http://127.0.0.1:{port}/?wsdl')
+    return process
+
+
+def drive(url, concurrency, duration):
+    """Envoie des requêtes SOAP depuis N threads pendant `duration` secondes"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    headers = {'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': 'calculate_travel_time'}
+
+    def worker():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = session.post(url, data=ENVELOPE, headers=headers, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des serveurs WSGI du service SOAP")
+    parser.add_argument('--servers', nargs='+', default=['simple', 'threaded', 'gunicorn'])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.servers:
+        port = _free_port()
+        process = start_server(name, port, args.workers, args.threads)
+        try:
+            results[name] = drive(f'http://127.0.0.1:{port}/', args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print("=" * 72)
+    print(f"🔵 SERVEURS SOAP - {args.concurrency} clients, {args.duration} s")
+    print("=" * 72)
+    print(f"{'serveur':<12}{'req':>8}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<12}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    print("=" * 72)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
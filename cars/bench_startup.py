@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# bench_startup.py
+"""
+Mesure le démarrage de l'API Flask
+
+- imports : profil python -X importtime de app.py (modules importés
+  directement, triés par temps cumulé) et durée totale de l'import
+- gunicorn : délai entre le lancement de gunicorn (gunicorn.conf.py) et la
+  première réponse 200 de /api/ready, avec et sans preload, sur les faux
+  services externes (stub_upstreams.py)
+
+Exemple :
+    python bench_startup.py
+    python bench_startup.py --top 25 --skip-gunicorn
+"""
+
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+from load_test import BASE_DIR, _free_port, start_soap_service
+from stub_upstreams import StubUpstreams
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+# ==================== IMPORTS ====================
+
+def profile_imports(module='app'):
+    """
+    Profil d'import d'un module dans un interpréteur neuf
+
+    Returns:
+        (durée totale en ms, [(module, cumulé ms, propre ms)] des imports directs)
+    """
+    env = dict(os.environ, TRIP_TABLE_MODE='off')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+    total_ms, direct = 0.0, []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        if depth == 0 and name == module:
+            total_ms = int(cumulative_us) / 1000
+        elif depth == 1:
+            direct.append((name, int(cumulative_us) / 1000, int(self_us) / 1000))
+
+    return total_ms, sorted(direct, key=lambda item: -item[1])
+
+
+# ==================== GUNICORN ====================
+
+def time_to_ready(port, env, timeout=60):
+    """Secondes entre le lancement de gunicorn et le premier 200 de /api/ready"""
+    started = time.monotonic()
+    process = subprocess.Popen(
+        ['gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.monotonic() - started < timeout:
+            try:
+                if requests.get(f'http://127.0.0.1:{port}/api/ready', timeout=5).status_code == 200:
+                    return time.monotonic() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.02)
+        return None
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profil d'import et délai de disponibilité de l'API")
+    parser.add_argument('--top', type=int, default=15, help="Imports directs affichés")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--skip-gunicorn', action='store_true')
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("🚀 DÉMARRAGE DE L'API")
+    print("=" * 70)
+
+    total_ms, direct = profile_imports()
+    print(f"Import de app.py : {total_ms:.0f} ms")
+    print(f"{'module':<32}{'cumulé ms':>12}{'propre ms':>12}")
+    for name, cumulative_ms, self_ms in direct[:args.top]:
+        print(f"{name:<32}{cumulative_ms:>12.1f}{self_ms:>12.1f}")
+
+    if args.skip_gunicorn:
+        print("=" * 70)
+        return 0
+
+    print("-" * 70)
+    soap_port = _free_port()
+    with StubUpstreams() as stubs:
+        soap = start_soap_service(soap_port)
+        try:
+            for preload in ('1', '0'):
+                port = _free_port()
+                env = dict(
+                    os.environ, **stubs.env(),
+                    PORT=str(port),
+                    WEB_CONCURRENCY=str(args.workers),
+                    GUNICORN_PRELOAD=preload,
+                    SOAP_URL=f'http://127.0.0.1:{soap_port}/?wsdl'
+                )
+                env.pop('APP_PRELOAD', None)
+                elapsed = time_to_ready(port, env)
+                label = 'preload + fork' if preload == '1' else 'sans preload'
+                result = f"{elapsed:.2f} s" if elapsed is not None else "non disponible"
+                print(f"gunicorn {label:<16} ({args.workers} workers) : /api/ready en {result}")
+        finally:
+            soap.terminate()
+            soap.wait()
+
+    print("=" * 70)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
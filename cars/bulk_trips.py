@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# bulk_trips.py
+"""
+Planification de trajets en masse, hors ligne (sans serveur Flask)
+
+Réutilise la logique de app.py (itinéraire, arrêts, bornes) dans un pool de
+processus. Entrée et sortie sont traitées par lots : la mémoire reste
+constante quel que soit le nombre de trajets. Après chaque lot, un point de
+reprise (<sortie>.checkpoint.json) permet de relancer un traitement
+interrompu avec --resume.
+
+Entrée : CSV (avec en-tête) ou JSONL, un trajet par ligne :
+    id (optionnel), vehicle_id, departure, destination, optimize, min_power, connector
+departure / destination : clé de ville ou coordonnées 'lat,lon' (commune la plus proche)
+Sortie : CSV, ou Parquet (répertoire de fichiers part-NNNNN.parquet, pyarrow requis)
+
+Par défaut, les arrêts sont calculés dans le processus (SOAP_PROTOCOL=local),
+les appels ORS partent en priorité 'batch' et le quota des clés API est
+réparti entre les processus (voir rate_scheduler.py). Avec TRIP_TABLE_MODE,
+les trajets standard entre grandes villes sont lus dans la table précalculée.
+
+Exemple :
+    python bulk_trips.py trips.csv results.csv --workers 8
+    python bulk_trips.py trips.jsonl results.parquet --no-stations
+    python bulk_trips.py trips.csv results.csv --resume
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FIELDS = [
+    'id', 'vehicle_id', 'departure', 'destination', 'distance_km', 'duration_h', 'num_stops',
+    'driving_h', 'charging_h', 'total_h', 'planner', 'route_source', 'stations', 'error'
+]
+
+# Module app chargé par le processus principal (hérité au fork) ou par init_worker
+app = None
+with_stations = True
+
+
+# ==================== CALCUL ====================
+
+def load_app():
+    """Importe app.py et précharge catalogues et table précalculée"""
+    global app
+    if app is None:
+        import app as app_module
+        app = app_module
+    if not app.warmed_up.is_set():
+        app.warm_up()
+    return app
+
+
+def init_worker(stations, verbose):
+    global with_stations
+    with_stations = stations
+    if not verbose:
+        logging.getLogger('app').setLevel(logging.WARNING)
+    load_app()
+
+
+def station_summary(station):
+    return {
+        'name': station.get('name'),
+        'lat': station.get('lat'),
+        'lon': station.get('lon'),
+        'power': station.get('power')
+    }
+
+
+def plan_trip_row(row):
+    """Planifie un trajet ; renvoie une ligne de sortie (erreur renseignée en cas d'échec)"""
+    result = dict.fromkeys(OUTPUT_FIELDS)
+    result.update({
+        'id': row.get('id'),
+        'vehicle_id': row.get('vehicle_id'),
+        'departure': row.get('departure'),
+        'destination': row.get('destination')
+    })
+
+    try:
+        trip, error = app.prepare_trip(row, priority='batch')
+        if error:
+            result['error'] = error[0]
+            return result
+
+        stops = app.compute_trip_stops(trip)
+        result.update({
+            'distance_km': trip['distance'],
+            'duration_h': trip['route_data'].get('duration'),
+            'num_stops': stops['num_stops'],
+            'driving_h': stops['time']['driving'],
+            'charging_h': stops['time']['charging'],
+            'total_h': stops['time']['total'],
+            'planner': (
+                'optimal' if stops['plan']
+                else 'table' if stops['stations'] is not None
+                else 'standard'
+            ),
+            'route_source': 'ors' if trip['route_data'].get('geometry') else 'estimation'
+        })
+
+        if with_stations:
+            stations = [station_summary(s) for s in app.iter_trip_stations(trip, stops) if s]
+            result['stations'] = json.dumps(stations, ensure_ascii=False)
+
+    except Exception as e:
+        result['error'] = str(e)
+
+    return result
+
+
+# ==================== ENTRÉE / SORTIE ====================
+
+def detect_format(path, explicit=None):
+    if explicit:
+        return explicit
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.parquet':
+        return 'parquet'
+    return 'csv'
+
+
+def read_trips(path, fmt):
+    """Trajets lus un à un (jamais tout le fichier en mémoire)"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class CsvSink:
+    """Sortie CSV ; l'état de reprise est la taille du fichier au dernier lot validé"""
+
+    def __init__(self, path, state=None):
+        self.path = path
+        if state:
+            self.file = open(path, 'r+', newline='', encoding='utf-8')
+            # Lignes écrites après le dernier point de reprise : supprimées
+            self.file.truncate(state['output_bytes'])
+            self.file.seek(state['output_bytes'])
+            self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS)
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS)
+            self.writer.writeheader()
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'output_bytes': self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Sortie Parquet : un fichier part-NNNNN.parquet par lot dans le répertoire de sortie"""
+
+    SCHEMA_TYPES = {
+        'distance_km': 'float64', 'duration_h': 'float64', 'num_stops': 'int32',
+        'driving_h': 'float64', 'charging_h': 'float64', 'total_h': 'float64'
+    }
+
+    def __init__(self, path, state=None):
+        if pyarrow is None:
+            raise RuntimeError("Sortie Parquet : installer pyarrow (pip install pyarrow)")
+
+        self.path = path
+        self.schema = pyarrow.schema([
+            (name, getattr(pyarrow, self.SCHEMA_TYPES.get(name, 'string'))()) for name in OUTPUT_FIELDS
+        ])
+        self.parts = state['parts'] if state else 0
+        self.rows = []
+
+        if not state and os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+
+        # Fichiers écrits après le dernier point de reprise : supprimés (autres fichiers ignorés)
+        for name in os.listdir(path):
+            match = re.fullmatch(r'part-(\d{5})\.parquet', name)
+            if match and int(match.group(1)) >= self.parts:
+                os.remove(os.path.join(path, name))
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.rows.append({
+                name: (str(value) if value is not None and name not in self.SCHEMA_TYPES else value)
+                for name, value in row.items()
+            })
+
+    def commit(self):
+        if self.rows:
+            table = pyarrow.Table.from_pylist(self.rows, schema=self.schema)
+            pq.write_table(table, os.path.join(self.path, f'part-{self.parts:05d}.parquet'))
+            self.parts += 1
+            self.rows = []
+        return {'parts': self.parts}
+
+    def close(self):
+        pass
+
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink}
+
+
+# ==================== POINTS DE REPRISE ====================
+
+def checkpoint_path(output):
+    return f'{output.rstrip(os.sep)}.checkpoint.json'
+
+
+def load_checkpoint(output, input_path):
+    """Point de reprise du même fichier d'entrée, ou None"""
+    try:
+        with open(checkpoint_path(output), encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return checkpoint if checkpoint.get('input') == os.path.abspath(input_path) else None
+
+
+def save_checkpoint(output, checkpoint):
+    """Écriture atomique (fichier temporaire puis renommage)"""
+    path = checkpoint_path(output)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+# ==================== TRAITEMENT ====================
+
+def configure_environment(args):
+    """Variables lues par app.py à l'import : à fixer avant de le charger"""
+    if not args.travel_service:
+        os.environ.setdefault('SOAP_PROTOCOL', 'local')
+    # Pas de thread de fond : warm_up() précharge avant le fork des processus
+    os.environ['APP_PRELOAD'] = '1'
+    os.environ.setdefault('RATE_LIMIT_WORKERS', str(args.workers))
+    # Appels amont identiques coalescés entre les processus du pool
+    os.environ.setdefault('SINGLE_FLIGHT_DIR', os.path.join(tempfile.gettempdir(), 'ev_bulk_single_flight'))
+
+
+def run(args):
+    input_format = detect_format(args.input, args.input_format)
+    output_format = detect_format(args.output, args.output_format)
+    if output_format not in SINKS:
+        raise ValueError(f"Format de sortie non pris en charge : {output_format}")
+
+    checkpoint = load_checkpoint(args.output, args.input) if args.resume else None
+    done = checkpoint['rows'] if checkpoint else 0
+    if checkpoint:
+        logger.info(f"🔄 Reprise après {done} trajets")
+
+    configure_environment(args)
+    init_worker(not args.no_stations, args.verbose)
+    # Table précalculée (TRIP_TABLE_MODE) : construite si besoin une seule fois, avant le fork
+    if app.TRIP_TABLE_MODE != 'off':
+        app.refresh_trip_table()
+
+    sink = SINKS[output_format](args.output, checkpoint['sink'] if checkpoint else None)
+    trips = islice(read_trips(args.input, input_format), done, None)
+    started, processed = time.time(), 0
+
+    try:
+        with Pool(args.workers, initializer=init_worker, initargs=(not args.no_stations, args.verbose)) as pool:
+            while True:
+                batch = list(islice(trips, args.batch_size))
+                if not batch:
+                    break
+
+                # imap conserve l'ordre d'entrée : le point de reprise est un simple compteur
+                sink.write_rows(pool.imap(plan_trip_row, batch, chunksize=args.chunksize))
+                done += len(batch)
+                processed += len(batch)
+                save_checkpoint(args.output, {
+                    'input': os.path.abspath(args.input),
+                    'rows': done,
+                    'sink': sink.commit()
+                })
+
+                elapsed = time.time() - started
+                logger.info(f"✅ {done} trajets ({processed / elapsed:.0f} trajets/s)")
+    finally:
+        sink.close()
+
+    logger.info(f"✅ Terminé : {done} trajets dans {args.output}")
+    return done
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Planification de trajets en masse (CSV/JSONL -> CSV/Parquet)")
+    parser.add_argument('input', help="Fichier de trajets (.csv, .jsonl)")
+    parser.add_argument('output', help="Fichier de résultats (.csv) ou répertoire Parquet (.parquet)")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--output-format', choices=('csv', 'parquet'))
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    parser.add_argument('--batch-size', type=int, default=5000, help="Trajets par lot (et par point de reprise)")
+    parser.add_argument('--chunksize', type=int, default=50, help="Trajets envoyés à la fois à un processus")
+    parser.add_argument('--resume', action='store_true', help="Reprend après le dernier point de reprise")
+    parser.add_argument('--no-stations', action='store_true', help="Sans recherche des bornes (plus rapide)")
+    parser.add_argument('--travel-service', action='store_true',
+                        help="Arrêts calculés par le service SOAP/JSON plutôt que dans le processus")
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+    try:
+        run(args)
+    except (OSError, ValueError, RuntimeError) as e:
+        logger.error(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# charging_planner.py
+"""
+Planificateur d'arrêts de recharge à temps total minimal
+Recherche A* sur un graphe (station candidate, état de charge) : le coût des
+arcs dépend de la puissance des bornes, de la batterie et de l'autonomie du
+véhicule, et de l'état de charge (la recharge ralentit au-delà de 80 %).
+"""
+
+import heapq
+import logging
+import re
+from math import ceil
+
+logger = logging.getLogger(__name__)
+
+AVERAGE_SPEED = 90  # km/h, identique au service SOAP
+SOC_STEP = 0.05  # granularité de l'état de charge (5 %)
+START_SOC = 1.0  # départ batterie pleine
+MIN_SOC = 0.10  # réserve minimale à l'arrivée à chaque borne et à destination
+STOP_OVERHEAD_H = 5 / 60  # détour, branchement, paiement
+DEFAULT_STATION_POWER_KW = 22  # puissance supposée si IRVE ne la renseigne pas
+TAPER_SOC = 0.8  # au-delà, la puissance de charge chute
+TAPER_FACTOR = 0.35
+
+_POWER_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+def parse_power_kw(value):
+    """Puissance en kW à partir d'une valeur IRVE (22, '22', '7,4', '50 kW', 'N/A')"""
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    match = _POWER_PATTERN.search(str(value or ''))
+    if not match:
+        return None
+    power = float(match.group().replace(',', '.'))
+    # Certains jeux IRVE expriment la puissance en W
+    return power / 1000 if power > 1000 else power or None
+
+
+def vehicle_max_power_kw(vehicle):
+    """Puissance de charge maximale estimée : batterie / temps de recharge nominal"""
+    if vehicle.get('chargeTime'):
+        return vehicle['battery'] / vehicle['chargeTime']
+    return 50.0
+
+
+def charging_power_kw(station_kw, vehicle_kw, soc):
+    """Puissance effective à un état de charge donné"""
+    power = min(station_kw, vehicle_kw)
+    return power * TAPER_FACTOR if soc >= TAPER_SOC else power
+
+
+def plan_charging_stops(vehicle, distance_km, candidates, start_soc=START_SOC, min_soc=MIN_SOC,
+                        soc_step=SOC_STEP, average_speed=AVERAGE_SPEED, stop_overhead_h=STOP_OVERHEAD_H):
+    """
+    Choisit les bornes et les quantités de recharge minimisant le temps total
+
+    Args:
+        vehicle: Véhicule (autonomy en km, battery en kWh, chargeTime en h)
+        distance_km: Distance totale du trajet
+        candidates: Stations candidates avec 'distance_from_start' (km le long
+            de l'itinéraire) et 'power'
+        start_soc: État de charge au départ (0-1)
+        min_soc: État de charge minimal à l'arrivée à chaque point
+
+    Returns:
+        dict {stops, driving_time, charging_time, total_time} ou None si
+        aucune combinaison de bornes ne permet d'atteindre la destination
+    """
+    autonomy = float(vehicle['autonomy'])
+    battery = float(vehicle['battery'])
+    if autonomy <= 0 or battery <= 0:
+        return None
+
+    stations = sorted(
+        (c for c in candidates if 0 < c.get('distance_from_start', -1) < distance_km),
+        key=lambda c: c['distance_from_start']
+    )
+    positions = [0.0] + [s['distance_from_start'] for s in stations] + [float(distance_km)]
+    goal = len(positions) - 1
+
+    levels = int(round(1 / soc_step))
+    start_level = int(start_soc / soc_step + 1e-9)
+    min_level = int(ceil(min_soc / soc_step - 1e-9))
+    vehicle_kw = vehicle_max_power_kw(vehicle)
+    step_energy = battery * soc_step
+
+    # Temps pour gagner un niveau de charge à chaque borne, par niveau de départ
+    step_times = [None]
+    for station in stations:
+        station_kw = parse_power_kw(station.get('power')) or DEFAULT_STATION_POWER_KW
+        step_times.append([
+            step_energy / charging_power_kw(station_kw, vehicle_kw, level * soc_step)
+            for level in range(levels)
+        ])
+    step_times.append(None)
+
+    # Niveaux consommés entre deux points consécutifs. L'arrondi porte sur la
+    # position cumulée : sur un tronçon sans recharge l'erreur reste inférieure
+    # à un niveau (couverte par la réserve) au lieu de s'accumuler à chaque borne.
+    km_per_level = autonomy * soc_step
+    cumulative = [int(ceil(p / km_per_level - 1e-9)) for p in positions]
+    drive_levels = [cumulative[i + 1] - cumulative[i] for i in range(goal)]
+
+    # État = (point, niveau, a_déjà_chargé_ici) encodé en entier
+    def encode(point, level, charged):
+        return (point * (levels + 1) + level) * 2 + charged
+
+    def heuristic(point):
+        return (distance_km - positions[point]) / average_speed
+
+    inf = float('inf')
+    start = encode(0, start_level, 0)
+    best = [inf] * encode(goal + 1, 0, 0)
+    parent = [None] * len(best)
+    best[start] = 0.0
+    heap = [(heuristic(0), 0.0, start, 0, start_level, 0)]
+
+    while heap:
+        _, cost, state, point, level, charged = heapq.heappop(heap)
+        if cost > best[state]:
+            continue
+        if point == goal:
+            return _build_plan(state, parent, stations, positions, levels, soc_step, cost, distance_km, average_speed)
+
+        moves = []
+        arrival = level - drive_levels[point]
+        if arrival >= min_level:
+            moves.append((point + 1, arrival, 0, (positions[point + 1] - positions[point]) / average_speed))
+        if step_times[point] is not None and level < levels:
+            overhead = 0.0 if charged else stop_overhead_h
+            moves.append((point, level + 1, 1, step_times[point][level] + overhead))
+
+        for next_point, next_level, next_charged, edge_cost in moves:
+            next_state = encode(next_point, next_level, next_charged)
+            next_cost = cost + edge_cost
+            if next_cost < best[next_state]:
+                best[next_state] = next_cost
+                parent[next_state] = state
+                heapq.heappush(heap, (next_cost + heuristic(next_point), next_cost, next_state,
+                                      next_point, next_level, next_charged))
+
+    logger.warning(f"⚠️ Aucun plan de recharge possible ({len(stations)} bornes candidates)")
+    return None
+
+
+def _build_plan(goal_state, parent, stations, positions, levels, soc_step, total_time, distance_km, average_speed):
+    """Reconstruit les arrêts (borne, charge à l'arrivée / au départ) depuis l'état final"""
+    path = []
+    state = goal_state
+    while state is not None:
+        path.append(state)
+        state = parent[state]
+    path.reverse()
+
+    def decode(state):
+        charged = state % 2
+        point, level = divmod(state // 2, levels + 1)
+        return point, level, charged
+
+    stops = []
+    for previous, current in zip(path, path[1:]):
+        prev_point, prev_level, prev_charged = decode(previous)
+        point, level, charged = decode(current)
+        if point != prev_point:
+            continue
+        if not prev_charged:
+            stops.append(dict(stations[point - 1], arrival_soc=round(prev_level * soc_step, 2)))
+        stops[-1]['departure_soc'] = round(level * soc_step, 2)
+
+    driving_time = distance_km / average_speed
+    for number, stop in enumerate(stops, 1):
+        stop['stop_number'] = number
+
+    return {
+        'stops': stops,
+        'driving_time': round(driving_time, 2),
+        'charging_time': round(total_time - driving_time, 2),
+        'total_time': round(total_time, 2)
+    }
@@ -0,0 +1,288 @@
+# city_store.py
+"""
+Catalogue des communes stocké par colonnes
+
+Au lieu d'un dictionnaire de dictionnaires par ville (~1 Ko par commune), les
+~35 000 communes françaises tiennent dans quelques tableaux NumPy :
+- lat / lon : float64, population : int32, codes INSEE : octets de largeur fixe
+- noms internés : table des noms distincts (blob UTF-8 + offsets) et indice du
+  nom par commune
+- clés : blob UTF-8 + offsets ; index clé -> ligne par empreintes 64 bits
+  triées (recherche dichotomique, tableaux array pour éviter le coût des
+  scalaires NumPy à chaque recherche)
+
+CityStore se comporte comme un dictionnaire en lecture seule {clé: {name,
+population, lat, lon, code}} : les fiches sont construites à la demande.
+
+Une commune a pour clé son nom normalisé ; quand plusieurs communes portent le
+même nom, la plus peuplée garde cette clé et les autres reçoivent
+'<nom normalisé>_<code INSEE>'.
+
+Les centres des communes sont aussi indexés par une grille de cellules de
+GRID_CELL_DEG degrés (lignes triées par cellule) : nearest() ne calcule les
+distances que sur les cellules voisines du point.
+"""
+
+import hashlib
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from math import radians, cos, floor
+
+import numpy as np
+
+from packing import pack_strings, unpack_string
+
+# Grille des centres de communes : taille des cellules (degrés) et nombre de
+# cellules par demi-tour, pour numéroter les cellules (lat, lon) par un entier
+GRID_CELL_DEG = 0.1
+GRID_SPAN = int(360 / GRID_CELL_DEG)
+# Au-delà de ce rayon (en cellules), recherche exhaustive (point loin de toute commune)
+GRID_MAX_RING = 32
+EARTH_RADIUS_KM = 6371
+
+
+def normalize_city_key(name):
+    """Clé unique normalisée d'une ville (minuscules, sans tirets, espaces ni apostrophes)"""
+    return (
+        name.lower()
+            .replace("-", "")
+            .replace(" ", "")
+            .replace("'", "")
+    )
+
+
+def _key_hash(key):
+    """Empreinte 64 bits stable d'une clé (indépendante de PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _cell_ids(i, j):
+    """Numéro de cellule de la grille à partir des indices (lat, lon)"""
+    return (np.asarray(i, dtype=np.int64) + GRID_SPAN) * (2 * GRID_SPAN + 1) + (np.asarray(j, dtype=np.int64) + GRID_SPAN)
+
+
+def _distances_km(lat, lon, lats, lons):
+    """Distances haversine d'un point à un ensemble de points (tableaux NumPy)"""
+    lat1, lon1 = radians(lat), radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class CityStore(Mapping):
+    """Catalogue de communes en colonnes, avec l'interface d'un dictionnaire en lecture seule"""
+
+    def __init__(self, keys, names, codes, lat, lon, population):
+        """
+        Args:
+            keys: Clés uniques (une par commune)
+            names, codes: Noms et codes INSEE
+            lat, lon, population: Valeurs par commune
+        """
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.population = np.asarray(population, dtype=np.int32)
+        self.codes = np.array([code.encode('ascii', 'replace') for code in codes], dtype=bytes)
+
+        # Noms internés : une entrée par nom distinct
+        name_ids = {}
+        self.name_ids = np.array([name_ids.setdefault(name, len(name_ids)) for name in names], dtype=np.int32)
+        self.name_blob, self.name_offsets = pack_strings(list(name_ids))
+
+        self.key_blob, self.key_offsets = pack_strings(keys)
+        hashes = np.array([_key_hash(key) for key in keys], dtype=np.uint64)
+        order = np.argsort(hashes, kind='stable')
+        self.key_hashes = array('Q', hashes[order].tobytes())
+        self.key_rows = array('i', order.astype(np.int32).tobytes())
+
+        # Grille : lignes triées par cellule, numéros de cellule dans le même ordre
+        cells = _cell_ids(np.floor(self.lat / GRID_CELL_DEG), np.floor(self.lon / GRID_CELL_DEG))
+        self.grid_rows = np.argsort(cells, kind='stable').astype(np.int32)
+        self.grid_cells = cells[self.grid_rows]
+
+    @classmethod
+    def from_communes(cls, communes, min_population=0):
+        """
+        Catalogue construit depuis les communes de geo.api.gouv.fr
+        (champs nom, code, population, centre), triées par population décroissante
+        """
+        rows = []
+        for commune in communes:
+            coords = (commune.get('centre') or {}).get('coordinates', [])
+            population = commune.get('population') or 0
+            if len(coords) != 2 or not commune.get('nom') or population < min_population:
+                continue
+            rows.append((commune['nom'], commune.get('code', ''), coords[1], coords[0], population))
+
+        rows.sort(key=lambda row: -row[4])
+
+        keys, taken = [], set()
+        for name, code, _, _, _ in rows:
+            key = normalize_city_key(name)
+            # Homonymes : la commune la plus peuplée (vue en premier) garde la clé courte
+            if key in taken:
+                key = f'{key}_{code}' if f'{key}_{code}' not in taken else f'{key}_{code}_{len(keys)}'
+            taken.add(key)
+            keys.append(key)
+
+        return cls(
+            keys,
+            [row[0] for row in rows],
+            [row[1] for row in rows],
+            [row[2] for row in rows],
+            [row[3] for row in rows],
+            [row[4] for row in rows]
+        )
+
+    @classmethod
+    def from_dict(cls, cities):
+        """Catalogue construit depuis {clé: {name, lat, lon, population, code}}"""
+        items = sorted(cities.items(), key=lambda item: -item[1].get('population', 0))
+        return cls(
+            [key for key, _ in items],
+            [city['name'] for _, city in items],
+            [city.get('code', '') for _, city in items],
+            [city['lat'] for _, city in items],
+            [city['lon'] for _, city in items],
+            [city.get('population', 0) for _, city in items]
+        )
+
+    # ==================== RECHERCHE ====================
+
+    def row(self, key):
+        """Ligne de la commune de clé key, ou None"""
+        if not isinstance(key, str):
+            return None
+        h = _key_hash(key)
+        i = bisect_left(self.key_hashes, h)
+        while i < len(self.key_hashes) and self.key_hashes[i] == h:
+            row = self.key_rows[i]
+            if self.key(row) == key:
+                return row
+            i += 1
+        return None
+
+    def key(self, row):
+        return unpack_string(self.key_blob, self.key_offsets, row)
+
+    def name(self, row):
+        return unpack_string(self.name_blob, self.name_offsets, int(self.name_ids[row]))
+
+    def record(self, row):
+        """Fiche d'une commune, au format du dictionnaire historique"""
+        return {
+            'name': self.name(row),
+            'population': int(self.population[row]),
+            'lat': float(self.lat[row]),
+            'lon': float(self.lon[row]),
+            'code': self.codes[row].decode('ascii')
+        }
+
+    def __getitem__(self, key):
+        row = self.row(key)
+        if row is None:
+            raise KeyError(key)
+        return self.record(row)
+
+    def __contains__(self, key):
+        return self.row(key) is not None
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.key(row)
+
+    # ==================== INDEX SPATIAL ====================
+
+    def _grid_block(self, i, j, ring):
+        """Lignes des communes des cellules à au plus ring cellules de la cellule (i, j)"""
+        lat_cells = np.arange(i - ring, i + ring + 1)
+        starts = np.searchsorted(self.grid_cells, _cell_ids(lat_cells, j - ring), side='left')
+        ends = np.searchsorted(self.grid_cells, _cell_ids(lat_cells, j + ring), side='right')
+        return np.concatenate([self.grid_rows[start:end] for start, end in zip(starts, ends)])
+
+    def nearest(self, lat, lon, k=1, max_km=None):
+        """
+        Communes dont le centre est le plus proche d'un point
+
+        Les anneaux de cellules autour du point sont élargis jusqu'à contenir k
+        communes plus proches que toute commune située hors du bloc examiné.
+
+        Args:
+            lat, lon: Point de recherche
+            k: Nombre de communes renvoyées
+            max_km: Distance maximale (None : pas de limite)
+
+        Returns:
+            Liste de tuples (distance_km, ligne) triée par distance
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+
+        i, j = floor(lat / GRID_CELL_DEG), floor(lon / GRID_CELL_DEG)
+        ring = 1
+        while ring <= GRID_MAX_RING:
+            rows = self._grid_block(i, j, ring)
+            distances = _distances_km(lat, lon, self.lat[rows], self.lon[rows])
+            # Toute commune hors du bloc est au moins à ring cellules (largeur en
+            # longitude prise au bord du bloc le plus proche du pôle)
+            edge_lat = min(abs(lat) + ring * GRID_CELL_DEG, 90)
+            covered_km = ring * GRID_CELL_DEG * radians(1) * EARTH_RADIUS_KM * cos(radians(edge_lat))
+            if max_km is not None and max_km <= covered_km:
+                break
+            if len(rows) >= k and np.partition(distances, k - 1)[k - 1] <= covered_km:
+                break
+            ring *= 2
+        else:
+            rows = np.arange(len(self))
+            distances = _distances_km(lat, lon, self.lat, self.lon)
+
+        order = np.argsort(distances, kind='stable')[:k]
+        return [
+            (float(distances[n]), int(rows[n])) for n in order
+            if max_km is None or distances[n] <= max_km
+        ]
+
+    def distances_km(self, lat, lon):
+        """Distances à vol d'oiseau d'un point à toutes les communes (tableau NumPy, une passe vectorisée)"""
+        return _distances_km(lat, lon, self.lat, self.lon)
+
+    # ==================== SOUS-ENSEMBLES ====================
+
+    def subset(self, rows):
+        """Catalogue restreint aux lignes données (clés conservées)"""
+        rows = [int(row) for row in rows]
+        return CityStore(
+            [self.key(row) for row in rows],
+            [self.name(row) for row in rows],
+            [self.codes[row].decode('ascii') for row in rows],
+            self.lat[rows],
+            self.lon[rows],
+            self.population[rows]
+        )
+
+    def filter(self, min_population):
+        """Communes d'au moins min_population habitants"""
+        if min_population <= 0:
+            return self
+        return self.subset(np.flatnonzero(self.population >= min_population))
+
+    def memory_bytes(self):
+        """Octets occupés par les tableaux du catalogue"""
+        arrays = (
+            self.lat, self.lon, self.population, self.codes, self.name_ids, self.name_blob,
+            self.name_offsets, self.key_blob, self.key_offsets, self.grid_rows, self.grid_cells
+        )
+        index = (self.key_hashes, self.key_rows)
+        return int(sum(a.nbytes for a in arrays) + sum(a.itemsize * len(a) for a in index))
+
+    def info(self):
+        return {
+            'communes': len(self),
+            'distinct_names': len(self.name_offsets) - 1,
+            'bytes': self.memory_bytes()
+        }
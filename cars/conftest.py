@@ -0,0 +1,68 @@
+# conftest.py
+"""
+Fixtures pytest communes
+
+- stubs : faux services externes (stub_upstreams.py) pour toute la session
+- api : module app rechargé sur ces faux services (sans réseau, sans thread
+  de fond, arrêts calculés dans le processus, quotas illimités)
+- client : client de test Flask de cet app
+- soap_url : service SOAP (soap_service.py) servi dans un thread
+
+Les variables fixées ici sont lues par app.py à l'import : elles doivent
+l'être avant le premier import d'app (fixture api, bancs d'essai).
+"""
+
+import importlib
+import os
+import threading
+
+import pytest
+
+TEST_ENV = {
+    'APP_PRELOAD': '1',
+    'SOAP_PROTOCOL': 'local',
+    'TRIP_TABLE_MODE': 'off',
+    'JOB_STORE': 'memory',
+    'LOG_FORMAT': 'text',
+    'ORS_RATE_PER_MINUTE': '0',
+    'ORS_RATE_PER_DAY': '0',
+    'CHARGETRIP_RATE_PER_MINUTE': '0'
+}
+for key, value in TEST_ENV.items():
+    os.environ.setdefault(key, value)
+
+from stub_upstreams import StubUpstreams  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def stubs():
+    with StubUpstreams() as stubs:
+        yield stubs
+
+
+@pytest.fixture(scope='session')
+def api(stubs):
+    saved = dict(os.environ)
+    os.environ.update(stubs.env())
+    import app
+    importlib.reload(app)
+    yield app
+    os.environ.clear()
+    os.environ.update(saved)
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def soap_url():
+    from werkzeug.serving import make_server
+    from soap_service import wsgi_application
+
+    server = make_server('127.0.0.1', 0, wsgi_application, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='soap-test-server', daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
@@ -0,0 +1,40 @@
+# fallback_data.py
+"""
+Données de secours : véhicules et grandes villes servis quand Chargetrip ou
+geo.api.gouv.fr sont indisponibles.
+
+Module sans effet de bord (ni configuration, ni journalisation, ni base) :
+importable par les outils de test (stub_upstreams.py, load_test.py) sans
+charger app.py.
+"""
+
+FALLBACK_VEHICLES = [
+    {'id': 1, 'name': 'Tesla Model 3 Long Range', 'brand': 'Tesla', 'model': 'Model 3', 'autonomy': 580, 'battery': 75, 'chargeTime': 0.5, 'seats': 5},
+    {'id': 2, 'name': 'Renault Zoe R135', 'brand': 'Renault', 'model': 'Zoe', 'autonomy': 395, 'battery': 52, 'chargeTime': 0.75, 'seats': 5},
+    {'id': 3, 'name': 'Nissan Leaf e+ 62kWh', 'brand': 'Nissan', 'model': 'Leaf', 'autonomy': 385, 'battery': 62, 'chargeTime': 0.67, 'seats': 5},
+    {'id': 4, 'name': 'Peugeot e-208 GT', 'brand': 'Peugeot', 'model': 'e-208', 'autonomy': 340, 'battery': 50, 'chargeTime': 0.8, 'seats': 5},
+    {'id': 5, 'name': 'Volkswagen ID.3 Pro', 'brand': 'Volkswagen', 'model': 'ID.3', 'autonomy': 420, 'battery': 58, 'chargeTime': 0.7, 'seats': 5},
+    {'id': 6, 'name': 'Hyundai Kona Electric 64kWh', 'brand': 'Hyundai', 'model': 'Kona Electric', 'autonomy': 484, 'battery': 64, 'chargeTime': 0.65, 'seats': 5},
+    {'id': 7, 'name': 'BMW i3 120Ah', 'brand': 'BMW', 'model': 'i3', 'autonomy': 310, 'battery': 42, 'chargeTime': 0.85, 'seats': 4},
+    {'id': 8, 'name': 'Audi e-tron 55 quattro', 'brand': 'Audi', 'model': 'e-tron', 'autonomy': 436, 'battery': 95, 'chargeTime': 0.6, 'seats': 5},
+    {'id': 9, 'name': 'Mercedes EQC 400', 'brand': 'Mercedes', 'model': 'EQC', 'autonomy': 417, 'battery': 80, 'chargeTime': 0.7, 'seats': 5},
+    {'id': 10, 'name': 'Kia e-Niro 64kWh', 'brand': 'Kia', 'model': 'e-Niro', 'autonomy': 455, 'battery': 64, 'chargeTime': 0.65, 'seats': 5},
+]
+
+CITIES_COORDINATES = {
+    'paris': {'lat': 48.8566, 'lon': 2.3522, 'name': 'Paris', 'population': 2165423},
+    'lyon': {'lat': 45.7640, 'lon': 4.8357, 'name': 'Lyon', 'population': 516092},
+    'marseille': {'lat': 43.2965, 'lon': 5.3698, 'name': 'Marseille', 'population': 869815},
+    'bordeaux': {'lat': 44.8378, 'lon': -0.5792, 'name': 'Bordeaux', 'population': 254436},
+    'nice': {'lat': 43.7102, 'lon': 7.2620, 'name': 'Nice', 'population': 340017},
+    'toulouse': {'lat': 43.6047, 'lon': 1.4442, 'name': 'Toulouse', 'population': 479553},
+    'nantes': {'lat': 47.2184, 'lon': -1.5536, 'name': 'Nantes', 'population': 309346},
+    'strasbourg': {'lat': 48.5734, 'lon': 7.7521, 'name': 'Strasbourg', 'population': 280966},
+    'montpellier': {'lat': 43.6108, 'lon': 3.8767, 'name': 'Montpellier', 'population': 285121},
+    'lille': {'lat': 50.6292, 'lon': 3.0573, 'name': 'Lille', 'population': 232787},
+    'rennes': {'lat': 48.1173, 'lon': -1.6778, 'name': 'Rennes', 'population': 216815},
+    'reims': {'lat': 49.2583, 'lon': 4.0317, 'name': 'Reims', 'population': 182592},
+    'grenoble': {'lat': 45.1885, 'lon': 5.7245, 'name': 'Grenoble', 'population': 158454},
+    'dijon': {'lat': 47.3220, 'lon': 5.0415, 'name': 'Dijon', 'population': 155090},
+    'angers': {'lat': 47.4784, 'lon': -0.5632, 'name': 'Angers', 'population': 151229}
+}
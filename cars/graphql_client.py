@@ -2,109 +2,249 @@
 """
 Client GraphQL pour interroger l'API Chargetrip
 Récupère la liste des véhicules électriques avec leurs caractéristiques
+
+- Jeux de champs par cas d'usage (FIELD_SETS) : seuls les champs lus sont
+  demandés, au lieu de la fiche complète (media, performance, prises...)
+- Requêtes persistées (protocole APQ) : le document est envoyé avec son
+  empreinte SHA-256 à sa première utilisation (enregistrement), puis
+  l'empreinte seule ; un refus de l'empreinte seule (empreinte inconnue,
+  statut d'erreur, erreur GraphQL) est repris une fois avec le document, et
+  le mode est désactivé après MAX_PERSISTED_FAILURES refus consécutifs
+- Filtrage par marque côté serveur (argument search de vehicleList)
+- Synchronisation conditionnelle du catalogue : contenu inchangé (même
+  empreinte, ou 304 sur ETag) -> ni décodage JSON ni parsing
 """
 
+import hashlib
 import requests
 import json
 import logging
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_URL = 'https://api.chargetrip.io/graphql'
+
+# Refus consécutifs de l'empreinte seule avant de n'envoyer que des documents complets
+MAX_PERSISTED_FAILURES = 3
+
+# Champs demandés par cas d'usage
+FIELD_SETS = {
+    # Champs lus par ChargeTripClient._parse_vehicle
+    'summary': """
+        id
+        naming { make model version }
+        battery { usable_kwh }
+        range { chargetrip_range { best worst } }
+        charging { time }
+    """,
+    # Catalogue de l'API Flask (app.parse_chargetrip_vehicle)
+    'catalog': """
+        id
+        naming { make model version }
+        battery { usable_kwh }
+        body { seats }
+        range { chargetrip_range { best worst } }
+    """,
+    # Fiche complète (affichage détaillé)
+    'full': """
+        id
+        naming { make model version edition chargetrip_version }
+        battery { usable_kwh full_kwh }
+        range { chargetrip_range { best worst } }
+        performance { acceleration top_speed }
+        charging { time ports { standard max_electric_power } }
+        media { image { thumbnail_url } }
+    """
+}
+
+
+def _compact(query: str) -> str:
+    """Document sur une ligne : texte stable (même empreinte) et plus court"""
+    return ' '.join(query.split())
+
+
+def vehicle_list_query(fields: str = 'summary') -> str:
+    """Requête vehicleList pour un jeu de champs de FIELD_SETS"""
+    return _compact(f"""
+        query vehicleList($size: Int, $page: Int, $search: String) {{
+          vehicleList(size: $size, page: $page, search: $search) {{ {FIELD_SETS[fields]} }}
+        }}
+    """)
+
+
+def vehicle_query(fields: str = 'summary') -> str:
+    """Requête vehicle (un véhicule par ID) pour un jeu de champs de FIELD_SETS"""
+    return _compact(f"""
+        query vehicle($id: ID!) {{
+          vehicle(id: $id) {{ {FIELD_SETS[fields]} }}
+        }}
+    """)
+
+
+def query_hash(query: str) -> str:
+    """Empreinte SHA-256 d'un document (identifiant de requête persistée)"""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def _response_error(response) -> Optional[str]:
+    """
+    None si la réponse est exploitable (200 sans erreur GraphQL, 304) ; sinon
+    le premier message d'erreur GraphQL ('PersistedQueryNotFound'...) ou le statut HTTP
+    """
+    # Test sur les octets d'abord : une réponse normale n'est pas décodée
+    if b'"errors"' in response.content:
+        try:
+            errors = json.loads(response.content).get('errors') or []
+        except (ValueError, AttributeError):
+            errors = []
+        if errors:
+            return errors[0].get('message') or 'GraphQL error'
+    if response.status_code not in (200, 304):
+        return f'HTTP {response.status_code}'
+    return None
+
 
 class ChargeTripClient:
     """Client pour l'API GraphQL Chargetrip"""
     
-    def __init__(self, api_key: str, client_id: str = None):
+    def __init__(self, api_key: str, client_id: str = None, url: str = DEFAULT_URL,
+                 persisted_queries: bool = True, registered_hashes=None,
+                 transport: Optional[Callable] = None, timeout: float = 10):
         """
         Initialise le client GraphQL
         
         Args:
             api_key: Clé API Chargetrip
             client_id: ID client Chargetrip (optionnel)
+            url: Endpoint GraphQL
+            persisted_queries: Envoie l'empreinte des documents plutôt que leur texte (APQ)
+            registered_hashes: Empreintes déjà enregistrées côté serveur (liste blanche) :
+                envoyées seules dès le premier appel
+            transport: Fonction (url, json=, headers=, timeout=[, priority=]) -> requests.Response
+                (par défaut : session requests partagée)
         """
-        self.url = 'https://api.chargetrip.io/graphql'
+        self.url = url
         self.headers = {
             'x-client-id': client_id or 'YOUR_CLIENT_ID',
             'x-app-id': api_key,
             'Content-Type': 'application/json'
         }
+        self.timeout = timeout
+        self.persisted_queries = persisted_queries
+        self.registered = set(registered_hashes or ())
+        self.failures = 0
+        self.session = requests.Session()
+        self.transport = transport or self.session.post
+        # Dernière synchronisation du catalogue (sync_vehicles)
+        self.sync_state = {'digest': None, 'etag': None, 'vehicles': None}
+        self.counters = {
+            'requests': 0, 'bytes': 0, 'persisted': 0, 'registrations': 0, 'fallbacks': 0,
+            'unchanged': 0, 'parsed': 0
+        }
+    
+    def _send(self, body: Dict, headers: Dict, priority: Optional[str] = None):
+        # Priorité transmise au transport seulement si l'appelant en donne une (quota)
+        options = {'priority': priority} if priority else {}
+        response = self.transport(self.url, json=body, headers=headers, timeout=self.timeout, **options)
+        self.counters['requests'] += 1
+        self.counters['bytes'] += len(response.content)
+        return response
+    
+    def execute(self, query: str, variables: Optional[Dict] = None, headers: Optional[Dict] = None,
+                priority: Optional[str] = None):
+        """
+        Exécute une requête GraphQL ; renvoie la réponse HTTP (contenu non décodé)
+        
+        Requête persistée : document et empreinte à la première utilisation
+        (enregistrement, sans aller-retour PersistedQueryNotFound), puis
+        l'empreinte seule. Toute réponse non exploitable à l'empreinte seule est
+        reprise une fois avec le document ; après MAX_PERSISTED_FAILURES refus
+        consécutifs, ou si le serveur ne prend pas en charge le protocole, le
+        mode est désactivé pour les requêtes suivantes.
+        priority est transmise au transport (quota de l'appelant).
+        """
+        headers = dict(self.headers, **(headers or {}))
+        variables = {k: v for k, v in (variables or {}).items() if v is not None}
+        document = {'query': query, 'variables': variables}
+        
+        if not self.persisted_queries:
+            return self._send(document, headers, priority)
+        
+        digest = query_hash(query)
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': digest}}
+        if digest not in self.registered:
+            return self._register(digest, dict(document, extensions=extensions), headers, priority)
+        
+        response = self._send({'variables': variables, 'extensions': extensions}, headers, priority)
+        error = _response_error(response)
+        
+        if error is None:
+            self.counters['persisted'] += 1
+            self.failures = 0
+            return response
+        
+        if error == 'PersistedQueryNotSupported':
+            logger.info("Requêtes persistées non prises en charge : envoi du document complet")
+            self.persisted_queries = False
+            return self._send(document, headers, priority)
+        
+        # Empreinte seule refusée (inconnue, statut d'erreur, erreur GraphQL) : reprise avec le document
+        self.registered.discard(digest)
+        self.counters['fallbacks'] += 1
+        self.failures += 1
+        if self.failures >= MAX_PERSISTED_FAILURES:
+            logger.warning(f"Requêtes persistées désactivées après {self.failures} refus ({error})")
+            self.persisted_queries = False
+        return self._register(digest, dict(document, extensions=extensions), headers, priority)
+    
+    def _register(self, digest: str, body: Dict, headers: Dict, priority: Optional[str]):
+        """Document envoyé avec son empreinte : enregistrée côté serveur si la réponse est exploitable"""
+        response = self._send(body, headers, priority)
+        error = _response_error(response)
+        
+        if error is None:
+            self.counters['registrations'] += 1
+            self.registered.add(digest)
+        elif error == 'PersistedQueryNotSupported':
+            logger.info("Requêtes persistées non prises en charge : envoi du document complet")
+            self.persisted_queries = False
+            return self._send({'query': body['query'], 'variables': body['variables']}, headers, priority)
+        return response
     
     def get_vehicles(self, 
                      size: int = 20, 
                      min_range: Optional[int] = None,
-                     brand: Optional[str] = None) -> List[Dict]:
+                     brand: Optional[str] = None,
+                     fields: str = 'summary') -> List[Dict]:
         """
         Récupère la liste des véhicules électriques
         
         Args:
             size: Nombre de véhicules à récupérer
             min_range: Autonomie minimale en km
-            brand: Marque du véhicule
+            brand: Marque du véhicule (recherche côté serveur)
+            fields: Jeu de champs demandé (clé de FIELD_SETS)
             
         Returns:
             Liste des véhicules avec leurs caractéristiques
         """
-        query = """
-        query vehicleList($size: Int, $page: Int) {
-          vehicleList(size: $size, page: $page) {
-            id
-            naming {
-              make
-              model
-              version
-              edition
-              chargetrip_version
-            }
-            battery {
-              usable_kwh
-              full_kwh
-            }
-            range {
-              chargetrip_range {
-                best
-                worst
-              }
-            }
-            performance {
-              acceleration
-              top_speed
-            }
-            charging {
-              time
-              ports {
-                standard
-                max_electric_power
-              }
-            }
-            media {
-              image {
-                thumbnail_url
-              }
-            }
-          }
-        }
-        """
-        
         variables = {
             'size': size,
-            'page': 0
+            'page': 0,
+            # Filtrage côté serveur : seuls les véhicules de la marque sont téléchargés
+            'search': brand
         }
         
         try:
-            response = requests.post(
-                self.url,
-                json={'query': query, 'variables': variables},
-                headers=self.headers,
-                timeout=10
-            )
+            response = self.execute(vehicle_list_query(fields), variables)
             
             if response.status_code == 200:
                 data = response.json()
                 vehicles = self._parse_vehicles(data)
                 
-                # Appliquer les filtres
+                # La recherche porte aussi sur le modèle ; l'autonomie n'a pas de filtre serveur
                 if min_range:
                     vehicles = [v for v in vehicles if v.get('autonomy', 0) >= min_range]
                 if brand:
@@ -120,50 +260,86 @@ class ChargeTripClient:
             logger.error(f"✗ Erreur lors de la requête GraphQL: {e}")
             return []
     
-    def get_vehicle_by_id(self, vehicle_id: str) -> Optional[Dict]:
+    def sync_vehicles(self,
+                      size: int = 50,
+                      fields: str = 'catalog',
+                      parse: Optional[Callable[[List[Dict]], List[Dict]]] = None,
+                      priority: Optional[str] = None) -> Tuple[Optional[List[Dict]], bool]:
+        """
+        Synchronisation conditionnelle du catalogue
+        
+        L'empreinte SHA-256 du contenu reçu est comparée à celle de la dernière
+        synchronisation : si le catalogue n'a pas changé, la liste précédente est
+        renvoyée sans décodage JSON ni parsing. Si le serveur fournit un ETag, il
+        est renvoyé en If-None-Match (304 : rien n'est transféré).
+        
+        Args:
+            size: Nombre de véhicules
+            fields: Jeu de champs demandé (clé de FIELD_SETS)
+            parse: Liste GraphQL -> véhicules au format de l'appelant
+                (par défaut : _parse_vehicle sur chaque véhicule)
+            priority: Priorité de l'appel, transmise au transport (quota)
+        
+        Returns:
+            (véhicules, changed) ; (None, False) en cas d'échec
+        """
+        state = self.sync_state
+        headers = {'If-None-Match': state['etag']} if state['etag'] and state['vehicles'] is not None else None
+        
+        try:
+            response = self.execute(vehicle_list_query(fields), {'size': size, 'page': 0}, headers, priority)
+            
+            if response.status_code == 304 and state['vehicles'] is not None:
+                self.counters['unchanged'] += 1
+                return state['vehicles'], False
+            
+            if response.status_code != 200:
+                logger.error(f"✗ Erreur API: {response.status_code}")
+                return None, False
+            
+            digest = hashlib.sha256(response.content).hexdigest()
+            if digest == state['digest']:
+                self.counters['unchanged'] += 1
+                return state['vehicles'], False
+            
+            data = json.loads(response.content)
+            vehicle_list = (data.get('data') or {}).get('vehicleList')
+            if vehicle_list is None:
+                logger.error(f"✗ Réponse sans vehicleList: {data.get('errors')}")
+                return None, False
+            
+            if parse is None:
+                vehicles = [v for v in map(self._parse_vehicle, vehicle_list) if v]
+            else:
+                vehicles = parse(vehicle_list)
+            self.counters['parsed'] += 1
+            
+            state.update(digest=digest, etag=response.headers.get('ETag'), vehicles=vehicles)
+            return vehicles, True
+            
+        except Exception as e:
+            logger.error(f"✗ Erreur lors de la synchronisation GraphQL: {e}")
+            return None, False
+    
+    def stats(self) -> Dict:
+        """Requêtes, octets reçus, requêtes persistées, enregistrements, reprises et synchronisations sans changement"""
+        return dict(self.counters, persisted_queries=self.persisted_queries, registered=len(self.registered))
+    
+    def get_vehicle_by_id(self, vehicle_id: str, fields: str = 'summary') -> Optional[Dict]:
         """
         Récupère un véhicule spécifique par son ID
         
         Args:
             vehicle_id: ID du véhicule
+            fields: Jeu de champs demandé (clé de FIELD_SETS)
             
         Returns:
             Détails du véhicule ou None
         """
-        query = """
-        query vehicle($id: ID!) {
-          vehicle(id: $id) {
-            id
-            naming {
-              make
-              model
-              version
-            }
-            battery {
-              usable_kwh
-            }
-            range {
-              chargetrip_range {
-                best
-                worst
-              }
-            }
-            charging {
-              time
-            }
-          }
-        }
-        """
-        
         variables = {'id': vehicle_id}
         
         try:
-            response = requests.post(
-                self.url,
-                json={'query': query, 'variables': variables},
-                headers=self.headers,
-                timeout=10
-            )
+            response = self.execute(vehicle_query(fields), variables)
             
             if response.status_code == 200:
                 data = response.json()
@@ -0,0 +1,41 @@
+# gunicorn.conf.py
+"""
+Configuration gunicorn de l'API Flask (voir startup.sh)
+
+- preload_app : app.py est importé une seule fois dans le maître, qui précharge
+  catalogues et table précalculée (app.warm_up) avant d'ouvrir le port ; les
+  workers forkés partagent ces données en copie sur écriture et servent dès
+  leur création
+- post_fork : les threads de fond (table précalculée, tâches asynchrones)
+  démarrent dans chaque worker, les threads du maître ne survivant pas au fork
+
+GUNICORN_PRELOAD=0 revient au chargement de l'application par chaque worker.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# Lu par app.py à l'import : quotas des clés API répartis entre les workers
+os.environ.setdefault('RATE_LIMIT_WORKERS', str(workers))
+timeout = 600
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    # Lu par app.py à l'import : pas de thread de fond dans le maître
+    os.environ['APP_PRELOAD'] = '1'
+
+
+def on_starting(server):
+    """Maître, application préchargée, avant l'ouverture du port et le fork"""
+    if preload_app:
+        import app
+        app.warm_up()
+
+
+def post_fork(server, worker):
+    import app
+    if preload_app:
+        app.start_background_tasks()
+    # Tâches asynchrones en attente (soumises à un autre worker, ou avant un redémarrage)
+    app.start_job_workers()
@@ -0,0 +1,494 @@
+# job_queue.py
+"""
+File de tâches asynchrones (planifications longues, lots de trajets)
+
+POST /api/jobs enregistre une tâche et rend aussitôt son identifiant ; un
+nombre borné de threads du worker la calcule en arrière-plan, sans bloquer
+le worker gunicorn qui a reçu la requête. Le client interroge ensuite
+GET /api/jobs/<id> (attente optionnelle jusqu'à la fin de la tâche).
+
+Deux stockages, sans broker externe :
+- MemoryJobStore : dans le processus (un seul worker, tests)
+- SqliteJobStore : fichier SQLite partagé par les workers d'une machine ;
+  une tâche soumise à un worker peut être calculée par un autre et
+  consultée depuis n'importe lequel. Les tâches d'un worker arrêté en cours
+  de calcul sont remises en file au démarrage suivant.
+
+Les résultats sont conservés result_ttl secondes après la fin de la tâche.
+Au-delà de max_pending tâches en attente, la soumission est refusée
+(QueueFull) plutôt que d'allonger indéfiniment l'attente.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('queued', 'running', 'done', 'failed')
+FINISHED = ('done', 'failed')
+
+# Intervalle minimal entre deux purges des résultats expirés (secondes)
+PRUNE_INTERVAL_S = 60
+# Durées d'attente / de calcul conservées pour les statistiques
+TIMINGS_WINDOW = 1000
+
+
+class QueueFull(Exception):
+    """Trop de tâches en attente : soumission refusée"""
+
+
+class JobFailed(Exception):
+    """Échec d'une tâche avec un code HTTP (erreur de la requête plutôt que du serveur)"""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def new_job(job_type, payload, now):
+    return {
+        'id': uuid.uuid4().hex,
+        'type': job_type,
+        'payload': payload,
+        'status': 'queued',
+        'created_at': now,
+        'started_at': None,
+        'finished_at': None,
+        'expires_at': None,
+        'progress': None,
+        'result': None,
+        'error': None
+    }
+
+
+def job_view(job):
+    """Tâche telle que renvoyée par l'API (sans les paramètres, avec attente et durée de calcul)"""
+    view = {key: value for key, value in job.items() if key != 'payload'}
+    if job['started_at'] is not None:
+        view['wait_s'] = round(job['started_at'] - job['created_at'], 3)
+    if job['finished_at'] is not None:
+        view['run_s'] = round(job['finished_at'] - job['started_at'], 3)
+    return view
+
+
+# ==================== STOCKAGE ====================
+
+class MemoryJobStore:
+    """Tâches dans le processus ; file FIFO des tâches en attente"""
+
+    def __init__(self):
+        self.jobs = OrderedDict()
+        self.queued = deque()
+        self.lock = threading.Lock()
+
+    def add(self, job):
+        with self.lock:
+            self.jobs[job['id']] = job
+            self.queued.append(job['id'])
+
+    def claim(self, owner, now):
+        """Prochaine tâche en attente, passée à l'état running (None si la file est vide)"""
+        with self.lock:
+            while self.queued:
+                job = self.jobs.get(self.queued.popleft())
+                if job is not None and job['status'] == 'queued':
+                    job.update(status='running', started_at=now)
+                    return dict(job)
+            return None
+
+    def set_progress(self, job_id, progress):
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id]['progress'] = progress
+
+    def finish(self, job_id, status, result, error, now, expires_at):
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(
+                    status=status, result=result, error=error, finished_at=now, expires_at=expires_at
+                )
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def counts(self):
+        with self.lock:
+            counts = dict.fromkeys(STATUSES, 0)
+            for job in self.jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    def prune(self, now):
+        """Supprime les tâches terminées dont le résultat a expiré ; renvoie leur nombre"""
+        with self.lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job['expires_at'] is not None and job['expires_at'] <= now
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+            return len(expired)
+
+    def recover(self, owner):
+        """Rien à reprendre : les tâches ne survivent pas au processus"""
+        return 0
+
+
+class SqliteJobStore:
+    """Tâches dans un fichier SQLite partagé entre les workers (une connexion par thread)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            owner TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            expires_at REAL,
+            progress TEXT,
+            result TEXT,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, created_at);
+    """
+    JSON_COLUMNS = ('payload', 'progress', 'result', 'error')
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as db:
+            db.executescript(self.SCHEMA)
+
+    def _connection(self):
+        # Connexion propre au thread et au processus (non partageable après fork)
+        db = getattr(self.local, 'db', None)
+        if db is None or self.local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.local.db, self.local.pid = db, os.getpid()
+        return db
+
+    def _row_to_job(self, row):
+        job = {key: row[key] for key in row.keys() if key != 'owner'}
+        for key in self.JSON_COLUMNS:
+            if job[key] is not None:
+                job[key] = json.loads(job[key])
+        return job
+
+    def add(self, job):
+        self._connection().execute(
+            'INSERT INTO jobs (id, type, payload, status, created_at) VALUES (?, ?, ?, ?, ?)',
+            (job['id'], job['type'], json.dumps(job['payload']), job['status'], job['created_at'])
+        )
+
+    def claim(self, owner, now):
+        """Prochaine tâche en attente (tous workers confondus), réservée par owner"""
+        db = self._connection()
+        # File vide (cas courant d'un thread inactif) : simple lecture, sans verrou d'écriture
+        if db.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1").fetchone() is None:
+            return None
+        # Verrou d'écriture pris dès la lecture : deux workers ne réservent pas la même tâche
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, started_at = ? WHERE id = ?",
+                    (owner, now, row['id'])
+                )
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+        if row is None:
+            return None
+        job = self._row_to_job(row)
+        job.update(status='running', started_at=now)
+        return job
+
+    def set_progress(self, job_id, progress):
+        self._connection().execute('UPDATE jobs SET progress = ? WHERE id = ?', (json.dumps(progress), job_id))
+
+    def finish(self, job_id, status, result, error, now, expires_at):
+        self._connection().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? WHERE id = ?',
+            (status, json.dumps(result), json.dumps(error), now, expires_at, job_id)
+        )
+
+    def get(self, job_id):
+        row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def counts(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        for status, count in self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'):
+            counts[status] = count
+        return counts
+
+    def prune(self, now):
+        cursor = self._connection().execute('DELETE FROM jobs WHERE expires_at <= ?', (now,))
+        return cursor.rowcount
+
+    def recover(self, owner):
+        """Remet en file les tâches en cours d'un processus de la machine qui n'existe plus"""
+        requeued = 0
+        rows = self._connection().execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+        for row in rows:
+            host, _, pid = (row['owner'] or '').rpartition(':')
+            if host != owner.rpartition(':')[0] or not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, started_at = NULL "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (row['id'], row['owner'])
+            )
+            requeued += cursor.rowcount
+        return requeued
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Processus d'un autre utilisateur : considéré vivant
+        return True
+    return True
+
+
+# ==================== FILE ====================
+
+class JobQueue:
+    """Tâches calculées par un nombre borné de threads, par type de tâche enregistré"""
+
+    def __init__(self, store, workers=2, max_pending=100, result_ttl=3600, poll_s=0.5, clock=time.time):
+        """
+        Args:
+            store: MemoryJobStore ou SqliteJobStore
+            workers: Threads de calcul par processus
+            max_pending: Tâches en attente au-delà desquelles submit() refuse (0 : illimité)
+            result_ttl: Durée de conservation d'une tâche terminée (secondes)
+            poll_s: Intervalle de consultation du stockage par un thread inactif
+                (tâches soumises à un autre worker) et par get(wait=...)
+            clock: Horloge en secondes epoch (partagée entre processus)
+        """
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.poll_s = poll_s
+        self.clock = clock
+        self.handlers = {}
+
+        self.condition = threading.Condition()
+        self.pid = None
+        self.threads = []
+        self.pruned_at = 0.0
+        self.counters = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'expired': 0, 'recovered': 0,
+                         'store_errors': 0}
+        self.wait_times = deque(maxlen=TIMINGS_WINDOW)
+        self.run_times = deque(maxlen=TIMINGS_WINDOW)
+
+    def register(self, job_type, handler):
+        """
+        handler(payload, progress) -> résultat sérialisable en JSON ; progress(done, total)
+        publie l'avancement. Lever JobFailed pour un échec avec code HTTP.
+        """
+        self.handlers[job_type] = handler
+
+    @property
+    def owner(self):
+        """Identifiant du processus de calcul : '<machine>:<pid>'"""
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def start(self):
+        """Démarre les threads de calcul du processus courant (idempotent, relancé après fork)"""
+        with self.condition:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.threads = [
+                threading.Thread(target=self._run_worker, name=f'job-worker-{n}', daemon=True)
+                for n in range(self.workers)
+            ]
+
+        recovered = self.store.recover(self.owner)
+        if recovered:
+            self.counters['recovered'] += recovered
+            logger.info(f"🔄 {recovered} tâches interrompues remises en file")
+
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job_type, payload):
+        """
+        Enregistre une tâche en attente
+
+        Raises:
+            KeyError: type de tâche inconnu
+            QueueFull: max_pending tâches déjà en attente
+        """
+        if job_type not in self.handlers:
+            raise KeyError(job_type)
+
+        self.start()
+        self._maybe_prune()
+        if self.max_pending and self.store.counts()['queued'] >= self.max_pending:
+            with self.condition:
+                self.counters['rejected'] += 1
+            raise QueueFull(f"{self.max_pending} tâches déjà en attente")
+
+        job = new_job(job_type, payload, self.clock())
+        self.store.add(job)
+        with self.condition:
+            self.counters['submitted'] += 1
+            # Les get(wait=...) attendent sur la même condition : tous réveillés
+            self.condition.notify_all()
+        return job_view(job)
+
+    def get(self, job_id, wait=0):
+        """
+        Tâche (vue API) ou None si inconnue ou expirée
+
+        Args:
+            wait: Attente maximale de la fin de la tâche (secondes)
+        """
+        self._maybe_prune()
+        deadline = time.monotonic() + wait
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job['status'] in FINISHED:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Réveil à la fin d'une tâche de ce processus, sinon consultation périodique
+            with self.condition:
+                self.condition.wait(min(remaining, self.poll_s))
+
+        if job is None or (job['expires_at'] is not None and job['expires_at'] <= self.clock()):
+            return None
+        return job_view(job)
+
+    # ==================== CALCUL ====================
+
+    def _run_worker(self):
+        owner = self.owner
+        while True:
+            try:
+                job = self.store.claim(owner, self.clock())
+            except Exception as e:
+                logger.error(f"❌ File de tâches: {e}")
+                job = None
+
+            if job is None:
+                with self.condition:
+                    self.condition.wait(self.poll_s)
+                continue
+
+            try:
+                self._execute(job)
+            except Exception as e:
+                # Le thread de calcul ne s'arrête jamais sur une erreur
+                logger.error(f"❌ Tâche {job['id']}: {e}")
+
+    def _execute(self, job):
+        job_id = job['id']
+        started = job['started_at']
+
+        def progress(done, total):
+            self.store.set_progress(job_id, {'done': done, 'total': total})
+
+        result, error = None, None
+        try:
+            result = self.handlers[job['type']](job['payload'], progress)
+            status = 'done'
+        except JobFailed as e:
+            status, error = 'failed', {'error': str(e), 'status': e.status}
+        except Exception as e:
+            logger.error(f"❌ Tâche {job['type']} {job_id}: {e}")
+            status, error = 'failed', {'error': str(e), 'status': 500}
+
+        now = self.clock()
+        stored = True
+        try:
+            try:
+                self.store.finish(job_id, status, result, error, now, now + self.result_ttl)
+            except (TypeError, ValueError) as e:
+                # Résultat non sérialisable
+                status, error = 'failed', {'error': str(e), 'status': 500}
+                self.store.finish(job_id, status, None, error, now, now + self.result_ttl)
+        except Exception as e:
+            # Stockage indisponible (base SQLite verrouillée...) : résultat perdu, le thread continue
+            logger.error(f"❌ Tâche {job['type']} {job_id} : résultat non enregistré ({e})")
+            status, stored = 'failed', False
+
+        with self.condition:
+            self.counters['completed' if status == 'done' else 'failed'] += 1
+            if not stored:
+                self.counters['store_errors'] += 1
+            self.wait_times.append(started - job['created_at'])
+            self.run_times.append(now - started)
+            # Réveille les get(wait=...) en attente
+            self.condition.notify_all()
+
+    def _maybe_prune(self):
+        now = self.clock()
+        if now - self.pruned_at < PRUNE_INTERVAL_S:
+            return
+        self.pruned_at = now
+        expired = self.store.prune(now)
+        with self.condition:
+            self.counters['expired'] += expired
+
+    # ==================== STATISTIQUES ====================
+
+    def stats(self):
+        """
+        Profondeur de la file (tous workers pour SQLite) et compteurs du processus ;
+        attente (soumission -> début) et calcul en ms sur les TIMINGS_WINDOW dernières tâches
+        """
+        with self.condition:
+            counters = dict(self.counters)
+            wait_times, run_times = sorted(self.wait_times), sorted(self.run_times)
+
+        counts = self.store.counts()
+        return dict(
+            counters,
+            store=type(self.store).__name__,
+            workers=self.workers,
+            max_pending=self.max_pending,
+            depth=counts['queued'],
+            running=counts['running'],
+            stored=sum(counts.values()),
+            wait_ms=_percentiles_ms(wait_times),
+            run_ms=_percentiles_ms(run_times)
+        )
+
+
+def _percentiles_ms(values):
+    if not values:
+        return None
+    return {
+        'p50': round(values[len(values) // 2] * 1000, 1),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+        'max': round(values[-1] * 1000, 1)
+    }
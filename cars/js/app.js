@@ -97,7 +97,8 @@ function checkFormValid(){
     document.getElementById('plan-btn').disabled=!(dep && dest && selectedVehicle);
 }
 
-async function planTrip(){
+// Planification progressive (SSE) : itinéraire, puis arrêts, puis chaque borne dès qu'elle est trouvée
+function planTrip(){
     const dep=document.getElementById('departure').value;
     const dest=document.getElementById('destination').value;
     if(dep===dest){showError('Les villes de départ et d\'arrivée doivent être différentes'); return;}
@@ -107,19 +108,25 @@ async function planTrip(){
     document.getElementById('error').classList.remove('active');
     document.getElementById('results').classList.remove('active');
 
-    try{
-        const resp=await fetch(`${API_URL}/api/plan-trip`,{
-            method:'POST',
-            headers:{'Content-Type':'application/json'},
-            body:JSON.stringify({vehicle_id:selectedVehicle.id,departure:dep,destination:dest})
-        });
-        const data=await resp.json();
-        if(data.success){
-            displayResults(data.trip);
-            displayRouteOnMap(data.trip);
-        }else showError(data.error||'Erreur lors de la planification');
-    }catch(e){showError('Erreur de connexion au serveur');}
-    finally{btn.disabled=false; btn.textContent='🗺️ Planifier le voyage';}
+    const params=new URLSearchParams({vehicle_id:selectedVehicle.id,departure:dep,destination:dest});
+    const source=new EventSource(`${API_URL}/api/plan-trip/stream?${params}`);
+    const trip={chargingStations:[]};
+    const finish=()=>{source.close(); btn.disabled=false; btn.textContent='🗺️ Planifier le voyage';};
+    const render=()=>{displayResults(trip); displayRouteOnMap(trip);};
+
+    source.addEventListener('route',e=>{Object.assign(trip,JSON.parse(e.data)); render(); btn.textContent='⏳ Calcul des arrêts...';});
+    source.addEventListener('stops',e=>{Object.assign(trip,JSON.parse(e.data)); displayResults(trip); btn.textContent='⏳ Recherche des bornes...';});
+    source.addEventListener('station',e=>{
+        trip.chargingStations.push(JSON.parse(e.data));
+        trip.chargingStations.sort((a,b)=>a.stop_number-b.stop_number);
+        render();
+    });
+    source.addEventListener('done',e=>{Object.assign(trip,JSON.parse(e.data).trip); render(); finish();});
+    // Événement « error » du serveur (avec données) ou coupure de connexion (sans)
+    source.addEventListener('error',e=>{
+        showError(e.data ? JSON.parse(e.data).error : 'Erreur de connexion au serveur');
+        finish();
+    });
 }
 
 function displayResults(trip){
@@ -133,20 +140,38 @@ function displayResults(trip){
             ${s.address||''}<br>${s.city||''}<br>
             ⚡ Puissance: ${s.power} | 🔌 ${s.connector_type||'Type 2'} | 📏 À ${s.distance_from_start} km
             </div></div>`).join('')+'</div>';
+    }else if(trip.numberOfStops===undefined || trip.numberOfStops>0){
+        stationsHTML=`<div class="info-box">⏳ Recherche des bornes de recharge...</div>`;
     }else{
         stationsHTML=`<div class="info-box" style="background:#e8f5e9;color:#2e7d32;">✅ Votre véhicule peut effectuer ce trajet sans recharge.</div>`;
     }
+    const pending=value=>value===undefined?'…':value;
     container.innerHTML=`<div class="trip-summary">
         <h3>📊 Résumé du trajet</h3>
         <div class="trip-stats">
         <div class="stat"><div class="stat-value">${trip.distance}</div><div class="stat-label">km</div></div>
-        <div class="stat"><div class="stat-value">${trip.numberOfStops}</div><div class="stat-label">arrêt(s)</div></div>
-        <div class="stat"><div class="stat-value">${trip.time.driving}</div><div class="stat-label">h conduite</div></div>
-        <div class="stat"><div class="stat-value">${trip.time.total}</div><div class="stat-label">h total</div></div>
+        <div class="stat"><div class="stat-value">${pending(trip.numberOfStops)}</div><div class="stat-label">arrêt(s)</div></div>
+        <div class="stat"><div class="stat-value">${pending(trip.time && trip.time.driving)}</div><div class="stat-label">h conduite</div></div>
+        <div class="stat"><div class="stat-value">${pending(trip.time && trip.time.total)}</div><div class="stat-label">h total</div></div>
         </div></div>`+stationsHTML;
     container.classList.add('active');
 }
 
+// Décode une polyligne encodée (précision 5) en [[lat,lon],...]
+function decodePolyline(encoded){
+    const points=[]; let index=0, lat=0, lon=0;
+    while(index<encoded.length){
+        const deltas=[0,0].map(()=>{
+            let shift=0, result=0, byte;
+            do{ byte=encoded.charCodeAt(index++)-63; result|=(byte&0x1f)<<shift; shift+=5; }while(byte>=0x20);
+            return (result&1)?~(result>>1):(result>>1);
+        });
+        lat+=deltas[0]; lon+=deltas[1];
+        points.push([lat/1e5,lon/1e5]);
+    }
+    return points;
+}
+
 function displayRouteOnMap(trip){
     routeLayer.clearLayers(); markersLayer.clearLayers();
     const depCoords=trip.departure.coordinates;
@@ -155,18 +180,19 @@ function displayRouteOnMap(trip){
     const startIcon=L.divIcon({className:'custom-marker',html:'<div style="background:#4caf50;color:white;padding:8px 12px;border-radius:20px;font-weight:bold;box-shadow:0 2px 8px rgba(0,0,0,0.3);">🏁 Départ</div>',iconSize:[100,40]});
     L.marker([depCoords.lat,depCoords.lon],{icon:startIcon}).addTo(markersLayer).bindPopup(`<b>${trip.departure.city}</b><br>Point de départ`);
 
-    const endIcon=L.divIcon({className:'custom-marker',html:'<div style="background:#f44336;color:white;padding:8px 12px;border-radius:20px;font-weight:bold;box-shadow:0 2px 8px rgba(0,0,0,0.3);">🎯 Arrivée</div>`,iconSize:[100,40]});
+    const endIcon=L.divIcon({className:'custom-marker',html:'<div style="background:#f44336;color:white;padding:8px 12px;border-radius:20px;font-weight:bold;box-shadow:0 2px 8px rgba(0,0,0,0.3);">🎯 Arrivée</div>',iconSize:[100,40]});
     L.marker([destCoords.lat,destCoords.lon],{icon:endIcon}).addTo(markersLayer).bindPopup(`<b>${trip.destination.city}</b><br>Destination`);
 
-    L.polyline([[depCoords.lat,depCoords.lon],[destCoords.lat,destCoords.lon]],{color:'#667eea',weight:4,opacity:0.7}).addTo(routeLayer);
+    // Tracé simplifié côté serveur pour le zoom d'affichage ; ligne directe à défaut
+    const path=trip.route ? decodePolyline(trip.route) : [[depCoords.lat,depCoords.lon],[destCoords.lat,destCoords.lon]];
+    L.polyline(path,{color:'#667eea',weight:4,opacity:0.7}).addTo(routeLayer);
 
     if(trip.chargingStations) trip.chargingStations.forEach((s,i)=>{
         const stationIcon=L.divIcon({className:'custom-marker',html:`<div class="station-marker">⚡ Station ${i+1}</div>`,iconSize:[120,40]});
         L.marker([s.lat,s.lon],{icon:stationIcon}).addTo(markersLayer).bindPopup(`<b>${s.name}</b><br>${s.address}<br><strong>Puissance:</strong> ${s.power}<br><strong>Distance du départ:</strong> ${s.distance_from_start} km`);
     });
 
-    const bounds=L.latLngBounds([[depCoords.lat,depCoords.lon],[destCoords.lat,destCoords.lon]]);
-    map.fitBounds(bounds,{padding:[50,50]});
+    map.fitBounds(L.latLngBounds(path),{padding:[50,50]});
 }
 
 function showError(msg){
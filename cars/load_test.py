@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# load_test.py
+"""
+Test de charge reproductible de l'API Flask
+Démarre les faux services externes (stub_upstreams.py), le vrai service SOAP
+et app.py configurés par variables d'environnement, puis mesure débit et
+latences (p50/p95/p99) sur /api/plan-trip, /api/cities et /api/vehicles.
+
+Les quotas des clés API (ORS, Chargetrip) sont désactivés : le test mesure le
+service et non l'attente de quota. --quota garde les quotas de production ;
+refus de quota et estimations à vol d'oiseau sont rapportés à part des latences.
+
+Exemple :
+    python load_test.py --concurrency 16 --duration 30 --latency ors=200 --errors irve=0.05
+    python load_test.py --json results.json --baseline load_baseline.json --max-regression 0.15
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from fallback_data import CITIES_COORDINATES
+from stub_upstreams import StubConfig, StubUpstreams, UPSTREAMS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ENDPOINTS = ('plan-trip', 'cities', 'vehicles')
+
+# Quotas illimités (0), comme dans conftest.py
+UNLIMITED_QUOTAS = {
+    'ORS_RATE_PER_MINUTE': '0',
+    'ORS_RATE_PER_DAY': '0',
+    'CHARGETRIP_RATE_PER_MINUTE': '0',
+    'CHARGETRIP_RATE_PER_DAY': '0'
+}
+
+
+# ==================== PROCESSUS ====================
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url, timeout=30):
+    """Attend qu'une URL réponde 200 (remplace un sleep fixe)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Service non disponible après {timeout}s : {url}")
+
+
+def start_soap_service(port):
+    env = dict(os.environ, SOAP_HOST='127.0.0.1', SOAP_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, 'soap_service.py'], cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _wait_until_ready(f'http://127.0.0.1:{port}/?wsdl')
+    return process
+
+
+def start_api(port, upstream_env, server='flask', workers=2, quota=False):
+    """Démarre app.py ; quota=False : quotas des clés API désactivés (UNLIMITED_QUOTAS)"""
+    env = dict(os.environ, HOST='127.0.0.1', PORT=str(port), **upstream_env)
+    if not quota:
+        env.update(UNLIMITED_QUOTAS)
+    if server == 'gunicorn':
+        command = ['gunicorn', '--bind', f'127.0.0.1:{port}', f'--workers={workers}', 'app:app']
+        # Sans gunicorn.conf.py : quotas répartis entre les workers lancés
+        env['RATE_LIMIT_WORKERS'] = str(workers)
+    else:
+        command = [sys.executable, 'app.py']
+    process = subprocess.Popen(
+        command, cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _wait_until_ready(f'http://127.0.0.1:{port}/api/info')
+    return process
+
+
+# ==================== GÉNÉRATION DE CHARGE ====================
+
+def percentile(sorted_values, pct):
+    """Percentile par rang le plus proche sur une liste triée"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class LoadGenerator:
+    """Envoie des requêtes en boucle depuis N threads et enregistre les latences"""
+
+    def __init__(self, base_url, mix, concurrency, duration=None, total_requests=None, seed=1):
+        self.base_url = base_url
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.total_requests = total_requests
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.results = {name: {'latencies': [], 'errors': 0} for name in ENDPOINTS}
+        self.cities = list(CITIES_COORDINATES.keys())
+        self.vehicle_ids = []
+
+    def _next_endpoint(self, rng):
+        names = [n for n in ENDPOINTS if self.mix.get(n)]
+        return rng.choices(names, weights=[self.mix[n] for n in names])[0]
+
+    def _request(self, session, endpoint, rng):
+        if endpoint == 'plan-trip':
+            departure, destination = rng.sample(self.cities, 2)
+            return session.post(f'{self.base_url}/api/plan-trip', json={
+                'vehicle_id': rng.choice(self.vehicle_ids),
+                'departure': departure,
+                'destination': destination
+            }, timeout=120)
+        return session.get(f'{self.base_url}/api/{endpoint}', timeout=120)
+
+    def _take_slot(self, deadline):
+        with self.lock:
+            if self.total_requests is not None and self.sent >= self.total_requests:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self.sent += 1
+            return True
+
+    def _worker(self, seed, deadline):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while self._take_slot(deadline):
+            endpoint = self._next_endpoint(rng)
+            start = time.perf_counter()
+            try:
+                ok = self._request(session, endpoint, rng).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.results[endpoint]['latencies'].append(elapsed)
+                if not ok:
+                    self.results[endpoint]['errors'] += 1
+
+    def run(self):
+        vehicles = requests.get(f'{self.base_url}/api/vehicles', timeout=60).json()['vehicles']
+        self.vehicle_ids = [v['id'] for v in vehicles]
+
+        deadline = time.monotonic() + self.duration if self.duration else None
+        threads = [
+            threading.Thread(target=self._worker, args=(self.rng.random(), deadline))
+            for _ in range(self.concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed):
+        report = {'elapsed_s': round(elapsed, 3), 'concurrency': self.concurrency, 'endpoints': {}}
+        for name, data in self.results.items():
+            latencies = sorted(data['latencies'])
+            if not latencies:
+                continue
+            report['endpoints'][name] = {
+                'requests': len(latencies),
+                'errors': data['errors'],
+                'throughput_rps': round(len(latencies) / elapsed, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2)
+            }
+        total = sum(e['requests'] for e in report['endpoints'].values())
+        report['throughput_rps'] = round(total / elapsed, 2)
+        return report
+
+
+def fetch_upstream_metrics(base_url):
+    """
+    Refus de quota par API et itinéraires estimés à vol d'oiseau par cause
+    (/api/metrics ; avec gunicorn, compteurs du seul worker qui répond)
+    """
+    metrics = requests.get(f'{base_url}/api/metrics', timeout=30).json()
+    return {
+        'quota_rejected': {name: sum(quota['rejected'].values()) for name, quota in metrics['quotas'].items()},
+        'route_fallbacks': metrics['route_fallbacks']
+    }
+
+
+# ==================== RAPPORT / RÉGRESSIONS ====================
+
+def print_report(report):
+    print("=" * 78)
+    print(f"📈 RÉSULTATS - {report['concurrency']} clients, {report['elapsed_s']} s, {report['throughput_rps']} req/s")
+    print("=" * 78)
+    print(f"{'endpoint':<12}{'req':>8}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in report['endpoints'].items():
+        print(f"{name:<12}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    print("=" * 78)
+    upstream = report.get('upstream')
+    if upstream:
+        print(f"🚦 Quotas {'de production' if report.get('quota') else 'désactivés'} - refus : "
+              + ', '.join(f"{name}={count}" for name, count in upstream['quota_rejected'].items()))
+        print("🧭 Itinéraires estimés (vol d'oiseau) : "
+              + ', '.join(f"{reason}={count}" for reason, count in upstream['route_fallbacks'].items()))
+        print("=" * 78)
+
+
+def compare_with_baseline(report, baseline, max_regression):
+    """Liste les régressions : débit en baisse ou p95/p99 en hausse au-delà du seuil"""
+    regressions = []
+    for name, base in baseline.get('endpoints', {}).items():
+        current = report['endpoints'].get(name)
+        if not current:
+            continue
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - max_regression):
+            regressions.append(f"{name}: débit {current['throughput_rps']} < {base['throughput_rps']} req/s")
+        for key in ('p95_ms', 'p99_ms'):
+            if current[key] > base[key] * (1 + max_regression):
+                regressions.append(f"{name}: {key} {current[key]} > {base[key]}")
+    return regressions
+
+
+def _parse_overrides(values, cast):
+    """Convertit ['ors=200', 'irve=50'] en {'ors': 200.0, 'irve': 50.0}"""
+    overrides = {}
+    for value in values or []:
+        name, _, number = value.partition('=')
+        if name not in UPSTREAMS:
+            raise SystemExit(f"Service inconnu : {name} (attendu : {', '.join(UPSTREAMS)})")
+        overrides[name] = cast(number)
+    return overrides
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge EV Trip Planner avec services simulés")
+    parser.add_argument('--concurrency', type=int, default=8, help="Nombre de clients simultanés")
+    parser.add_argument('--duration', type=float, default=20, help="Durée du test en secondes")
+    parser.add_argument('--requests', type=int, default=None, help="Nombre total de requêtes (remplace --duration)")
+    parser.add_argument('--mix', default='plan-trip=8,cities=1,vehicles=1', help="Pondération des endpoints")
+    parser.add_argument('--latency', action='append', help="Latence simulée en ms, ex. ors=200")
+    parser.add_argument('--jitter', action='append', help="Gigue en ms, ex. irve=20")
+    parser.add_argument('--errors', action='append', help="Taux d'erreur injecté, ex. irve=0.05")
+    parser.add_argument('--server', choices=['flask', 'gunicorn'], default='flask')
+    parser.add_argument('--workers', type=int, default=2, help="Workers gunicorn")
+    parser.add_argument('--quota', action='store_true',
+                        help="Garde les quotas de production des clés API (désactivés par défaut)")
+    parser.add_argument('--json', help="Écrit le rapport JSON dans ce fichier")
+    parser.add_argument('--baseline', help="Rapport JSON de référence à comparer")
+    parser.add_argument('--max-regression', type=float, default=0.15, help="Régression tolérée (0.15 = 15 %%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    latency = _parse_overrides(args.latency, float)
+    jitter = _parse_overrides(args.jitter, float)
+    errors = _parse_overrides(args.errors, float)
+    configs = {
+        name: StubConfig(latency.get(name, 0.0), jitter.get(name, 0.0), errors.get(name, 0.0))
+        for name in UPSTREAMS
+    }
+    mix = {name: float(weight) for name, _, weight in (item.partition('=') for item in args.mix.split(','))}
+
+    processes = []
+    with StubUpstreams(configs) as stubs:
+        try:
+            soap_port, api_port = _free_port(), _free_port()
+            processes.append(start_soap_service(soap_port))
+            upstream_env = dict(stubs.env(), SOAP_URL=f'http://127.0.0.1:{soap_port}/?wsdl')
+            processes.append(start_api(api_port, upstream_env, args.server, args.workers, args.quota))
+
+            base_url = f'http://127.0.0.1:{api_port}'
+            generator = LoadGenerator(
+                base_url, mix, args.concurrency,
+                duration=None if args.requests else args.duration,
+                total_requests=args.requests
+            )
+            report = generator.run()
+            report['quota'] = args.quota
+            report['upstream'] = fetch_upstream_metrics(base_url)
+            report['upstream_calls'] = stubs.stats
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(timeout=10)
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.max_regression)
+        if regressions:
+            print("❌ Régressions de performance :")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print(f"✅ Aucune régression au-delà de {args.max_regression:.0%}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
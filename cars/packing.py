@@ -0,0 +1,22 @@
+# packing.py
+"""
+Chaînes stockées en colonnes NumPy : octets UTF-8 concaténés et offsets.
+Partagé par le catalogue de communes (city_store.py) et la table précalculée
+(trip_table.py) : un tableau d'octets au lieu de millions d'objets str,
+enregistrable tel quel dans un fichier .npz.
+"""
+
+import numpy as np
+
+
+def pack_strings(strings):
+    """Chaînes -> (octets UTF-8 concaténés, offsets int64 [n + 1])"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_string(blob, offsets, index):
+    """Chaîne de rang index"""
+    return blob[offsets[index]:offsets[index + 1]].tobytes().decode('utf-8')
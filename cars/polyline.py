@@ -0,0 +1,119 @@
+# polyline.py
+"""
+Polylignes encodées (format Google, utilisé par OpenRouteService),
+simplification de Douglas-Peucker et tolérances par niveau de zoom
+"""
+
+from math import cos, log2, radians
+
+
+def encode_polyline(points, precision=5):
+    """Encode une liste de (lat, lon) au format polyline"""
+    factor = 10 ** precision
+    output = []
+    prev_lat = prev_lon = 0
+
+    for lat, lon in points:
+        ilat, ilon = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        prev_lat, prev_lon = ilat, ilon
+
+    return ''.join(output)
+
+
+def decode_polyline(encoded, precision=5):
+    """Décode une polyline en liste de (lat, lon)"""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    length = len(encoded)
+
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+
+    return points
+
+
+def simplify_douglas_peucker(points, tolerance_km):
+    """
+    Simplifie une polyligne (lat, lon) : supprime les points à moins de
+    tolerance_km du segment qui les encadre. Les extrémités sont conservées.
+    """
+    if len(points) < 3 or tolerance_km <= 0:
+        return list(points)
+
+    # Projection équirectangulaire locale en km
+    scale = cos(radians(sum(p[0] for p in points) / len(points)))
+    xy = [(lon * 111.32 * scale, lat * 110.57) for lat, lon in points]
+    tolerance_sq = tolerance_km * tolerance_km
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xy[first]
+        dx, dy = xy[last][0] - ax, xy[last][1] - ay
+        length_sq = dx * dx + dy * dy
+
+        farthest, max_dist_sq = None, tolerance_sq
+        for i in range(first + 1, last):
+            px, py = xy[i][0] - ax, xy[i][1] - ay
+            if length_sq:
+                t = min(1.0, max(0.0, (px * dx + py * dy) / length_sq))
+                px, py = px - t * dx, py - t * dy
+            dist_sq = px * px + py * py
+            if dist_sq > max_dist_sq:
+                farthest, max_dist_sq = i, dist_sq
+
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+# ==================== NIVEAUX DE ZOOM ====================
+
+# Mètres par pixel à l'équateur au zoom 0 (tuiles Web Mercator de 256 px)
+METERS_PER_PIXEL_Z0 = 156543.03
+MAX_ZOOM = 18
+
+
+def zoom_tolerance_km(zoom, lat, pixels=1.0):
+    """Distance au sol (km) couverte par `pixels` pixels à un niveau de zoom"""
+    return pixels * METERS_PER_PIXEL_Z0 * cos(radians(lat)) / (2 ** zoom) / 1000
+
+
+def fit_zoom(points, viewport_px=800):
+    """Niveau de zoom auquel l'emprise de la polyligne tient dans viewport_px pixels"""
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    lat = (min(lats) + max(lats)) / 2
+    span_km = max(
+        (max(lats) - min(lats)) * 110.57,
+        (max(lons) - min(lons)) * 111.32 * cos(radians(lat)),
+        0.001
+    )
+    zoom = int(log2(viewport_px * zoom_tolerance_km(0, lat) / span_km))
+    return max(0, min(MAX_ZOOM, zoom))
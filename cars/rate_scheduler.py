@@ -0,0 +1,176 @@
+# rate_scheduler.py
+"""
+Ordonnanceur des appels sortants sous quotas (OpenRouteService, Chargetrip...)
+
+Pour chaque API amont :
+- un seau à jetons par minute (capacité = quota par minute, rechargé en continu)
+- un compteur journalier remis à zéro à minuit UTC (quota par jour)
+
+Un appel sans jeton disponible attend brièvement au lieu d'échouer. Les appels
+en attente sont servis par priorité (interactive > batch > warmup), puis par
+ordre d'arrivée. Les priorités de fond ne consomment pas la réserve de quota
+laissée au trafic interactif.
+
+Les quotas sont par processus : avec plusieurs workers, configurer la part de
+chacun.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+PRIORITIES = {'interactive': 0, 'batch': 1, 'warmup': 2}
+
+# Attente maximale d'un jeton par priorité (secondes)
+DEFAULT_MAX_WAIT = {'interactive': 3.0, 'batch': 300.0, 'warmup': 300.0}
+
+
+class QuotaExceeded(Exception):
+    """Aucun jeton obtenu dans le délai d'attente"""
+
+
+class UpstreamQuota:
+    """Quotas d'une API amont et file d'attente des appels"""
+
+    def __init__(self, name, per_minute=0, per_day=0, reserve=0.2, clock=time.time):
+        """
+        Args:
+            name: Nom de l'API amont
+            per_minute: Appels autorisés par minute (0 : illimité)
+            per_day: Appels autorisés par jour UTC (0 : illimité)
+            reserve: Fraction de chaque quota réservée au trafic interactif
+            clock: Horloge en secondes epoch (injectable pour les tests)
+        """
+        self.name = name
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.reserve = reserve
+        self.clock = clock
+
+        now = clock()
+        self.tokens = float(per_minute)
+        self.refilled_at = now
+        self.day = int(now // 86400)
+        self.day_used = 0
+
+        self.condition = threading.Condition()
+        self.queue = []
+        self.sequence = itertools.count()
+        self.granted = dict.fromkeys(PRIORITIES, 0)
+        self.rejected = dict.fromkeys(PRIORITIES, 0)
+        self.waited_s = 0.0
+
+    def _refill(self, now):
+        if self.per_minute:
+            elapsed = max(0.0, now - self.refilled_at)
+            self.tokens = min(float(self.per_minute), self.tokens + elapsed * self.per_minute / 60)
+        self.refilled_at = now
+
+        day = int(now // 86400)
+        if day != self.day:
+            self.day = day
+            self.day_used = 0
+
+    def _floors(self, priority):
+        """Jetons (minute, jour) à laisser disponibles pour cette priorité"""
+        if priority == 'interactive':
+            return 0.0, 0.0
+        return self.per_minute * self.reserve, self.per_day * self.reserve
+
+    def _wait_for_token(self, now, priority):
+        """0 si un appel est possible maintenant, sinon délai estimé avant le prochain jeton"""
+        minute_floor, day_floor = self._floors(priority)
+
+        if self.per_day and self.per_day - self.day_used <= day_floor:
+            return (self.day + 1) * 86400 - now
+
+        if self.per_minute and self.tokens - minute_floor < 1:
+            return (minute_floor + 1 - self.tokens) * 60 / self.per_minute
+
+        return 0.0
+
+    def acquire(self, priority='interactive', max_wait=None):
+        """
+        Attend un jeton pour un appel
+
+        Raises:
+            QuotaExceeded: si aucun jeton n'est obtenu dans max_wait secondes
+        """
+        max_wait = DEFAULT_MAX_WAIT[priority] if max_wait is None else max_wait
+        started = self.clock()
+        deadline = started + max_wait
+        ticket = (PRIORITIES[priority], next(self.sequence))
+
+        with self.condition:
+            heapq.heappush(self.queue, ticket)
+            try:
+                while True:
+                    now = self.clock()
+                    self._refill(now)
+
+                    if self.queue[0] == ticket:
+                        delay = self._wait_for_token(now, priority)
+                        if delay == 0:
+                            if self.per_minute:
+                                self.tokens -= 1
+                            self.day_used += 1
+                            self.granted[priority] += 1
+                            self.waited_s += now - started
+                            return now - started
+                    else:
+                        # Réveillé par notify_all quand la tête de file change
+                        delay = max_wait
+
+                    remaining = deadline - now
+                    if remaining <= 0 or (delay > remaining and self.queue[0] == ticket):
+                        self.rejected[priority] += 1
+                        raise QuotaExceeded(f"Quota {self.name} épuisé ({priority})")
+
+                    self.condition.wait(min(delay, remaining))
+            finally:
+                self.queue.remove(ticket)
+                heapq.heapify(self.queue)
+                self.condition.notify_all()
+
+    def exhaust(self):
+        """L'API amont a répondu 429 : plus de jeton avant la recharge"""
+        with self.condition:
+            self._refill(self.clock())
+            self.tokens = min(self.tokens, 0.0)
+
+    def stats(self):
+        with self.condition:
+            self._refill(self.clock())
+            return {
+                'per_minute': self.per_minute,
+                'per_day': self.per_day,
+                'minute_remaining': int(self.tokens) if self.per_minute else None,
+                'day_remaining': self.per_day - self.day_used if self.per_day else None,
+                'day_used': self.day_used,
+                'waiting': len(self.queue),
+                'granted': dict(self.granted),
+                'rejected': dict(self.rejected),
+                'waited_s': round(self.waited_s, 3)
+            }
+
+
+class RateScheduler:
+    """Quotas de toutes les API amont ; les API non configurées ne sont pas limitées"""
+
+    def __init__(self, quotas=None):
+        self.quotas = {quota.name: quota for quota in quotas or []}
+
+    def acquire(self, upstream, priority='interactive', max_wait=None):
+        quota = self.quotas.get(upstream)
+        if quota is None:
+            return 0.0
+        return quota.acquire(priority, max_wait)
+
+    def exhaust(self, upstream):
+        quota = self.quotas.get(upstream)
+        if quota is not None:
+            quota.exhaust()
+
+    def stats(self):
+        return {name: quota.stats() for name, quota in self.quotas.items()}
@@ -0,0 +1,129 @@
+# response_encoding.py
+"""
+Encodage des réponses de l'API Flask
+- Fournisseur JSON basé sur orjson (sérialisation native en UTF-8, ~10x plus
+  rapide que json de la bibliothèque standard), si le paquet est installé
+- Compression gzip / brotli négociée via Accept-Encoding au-delà d'un seuil
+"""
+
+import gzip
+import logging
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_SIZE = 1024  # octets : en dessous, l'en-tête coûte plus que le gain
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # compromis CPU / taux adapté à la compression à la volée
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+# ==================== JSON ====================
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Fournisseur JSON Flask s'appuyant sur orjson
+
+    Les noms de villes sont émis en UTF-8 (pas d'échappement \\uXXXX), les
+    flottants au format le plus court qui se relit à l'identique ; NaN et
+    Infinity, invalides en JSON, deviennent null.
+    """
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(
+            obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# ==================== COMPRESSION ====================
+
+def choose_encoding(accept_encodings):
+    """Encodage préféré par le client parmi ceux disponibles ('br', 'gzip' ou None)"""
+    candidates = (['br'] if brotli else []) + ['gzip']
+    best = max(candidates, key=lambda name: accept_encodings.quality(name))
+    return best if accept_encodings.quality(best) > 0 else None
+
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response, accept_encodings, min_size=COMPRESS_MIN_SIZE):
+    """Compresse une réponse en mémoire si le type, la taille et le client s'y prêtent"""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES and not response.mimetype.startswith('text/'):
+        return response
+
+    # La représentation dépend d'Accept-Encoding, y compris quand elle n'est pas compressée
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_response_encoding(app, min_size=COMPRESS_MIN_SIZE):
+    """Installe le fournisseur orjson (si disponible) et la compression des réponses"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        logger.warning("⚠️  orjson non installé : encodeur JSON standard")
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, request.accept_encodings, min_size)
+
+    return app
@@ -0,0 +1,170 @@
+# route_corridor.py
+"""
+Corridor autour d'un itinéraire : distance de points (bornes) à la polyligne
+et position le long du trajet, calculées de façon vectorisée (NumPy) avec une
+grille de segments, plus le polygone tampon utilisé pour interroger IRVE en
+une seule requête.
+"""
+
+from math import cos, radians
+
+import numpy as np
+
+from polyline import simplify_douglas_peucker
+
+KM_PER_DEG_LAT = 110.57
+KM_PER_DEG_LON = 111.32
+
+
+class RouteCorridor:
+    """Polyligne projetée en km, indexée par une grille de cellules de la taille du tampon"""
+
+    def __init__(self, points, buffer_km=5.0):
+        """
+        Args:
+            points: Polyligne de l'itinéraire, liste de (lat, lon)
+            buffer_km: Demi-largeur du corridor en km
+        """
+        if len(points) < 2:
+            points = list(points) * 2
+        self.points = points
+        self.buffer_km = float(buffer_km)
+
+        lats = np.array([p[0] for p in points], dtype=float)
+        lons = np.array([p[1] for p in points], dtype=float)
+        self.lat0 = float(lats.mean())
+        self.scale = cos(radians(self.lat0)) * KM_PER_DEG_LON
+
+        x, y = self._project(lats, lons)
+        self.ax, self.ay = x[:-1], y[:-1]
+        self.dx, self.dy = x[1:] - x[:-1], y[1:] - y[:-1]
+        self.length_sq = self.dx ** 2 + self.dy ** 2
+        lengths = np.sqrt(self.length_sq)
+        self.start_along = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+        self.length_km = float(lengths.sum())
+
+        self._build_grid()
+
+    def _project(self, lats, lons):
+        return np.asarray(lons) * self.scale, np.asarray(lats) * KM_PER_DEG_LAT
+
+    def _cells(self, x, y):
+        return np.floor(x / self.buffer_km).astype(np.int64), np.floor(y / self.buffer_km).astype(np.int64)
+
+    def _build_grid(self):
+        """
+        Grille cellule -> segments dont l'emprise élargie du tampon recouvre la
+        cellule, stockée à plat (CSR) : cell_rows[cellule] indexe offsets/counts
+        dans segment_ids
+        """
+        bx, by = self.ax + self.dx, self.ay + self.dy
+        x_min, y_min = self._cells(np.minimum(self.ax, bx) - self.buffer_km, np.minimum(self.ay, by) - self.buffer_km)
+        x_max, y_max = self._cells(np.maximum(self.ax, bx) + self.buffer_km, np.maximum(self.ay, by) + self.buffer_km)
+
+        grid = {}
+        for segment in range(len(self.ax)):
+            for i in range(x_min[segment], x_max[segment] + 1):
+                for j in range(y_min[segment], y_max[segment] + 1):
+                    grid.setdefault((i, j), []).append(segment)
+
+        self.cell_rows = {cell: row for row, cell in enumerate(grid)}
+        self.counts = np.array([len(segments) for segments in grid.values()], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)[:-1])).astype(np.int64)
+        self.segment_ids = np.fromiter(
+            (segment for segments in grid.values() for segment in segments), dtype=np.int64, count=int(self.counts.sum())
+        )
+
+    def locate(self, lats, lons):
+        """
+        Distance au tracé et position le long du trajet pour un lot de points
+
+        Returns:
+            (distance_km, along_km) : tableaux NumPy ; distance = inf pour les
+            points hors de la grille du corridor
+        """
+        x, y = self._project(np.asarray(lats, dtype=float), np.asarray(lons, dtype=float))
+        cx, cy = self._cells(x, y)
+        distance = np.full(len(x), np.inf)
+        along = np.zeros(len(x))
+
+        rows = np.array([self.cell_rows.get(cell, -1) for cell in zip(cx.tolist(), cy.tolist())], dtype=np.int64)
+        points = np.flatnonzero(rows >= 0)
+        if not len(points):
+            return distance, along
+        rows = rows[points]
+
+        # Paires (point, segment candidat de sa cellule), calculées en un seul passage
+        counts = self.counts[rows]
+        pair_points = np.repeat(points, counts)
+        first_pair = np.cumsum(counts) - counts
+        pair_rank = np.arange(len(pair_points)) - np.repeat(first_pair, counts)
+        segments = self.segment_ids[np.repeat(self.offsets[rows], counts) + pair_rank]
+
+        px = x[pair_points] - self.ax[segments]
+        py = y[pair_points] - self.ay[segments]
+        dx, dy = self.dx[segments], self.dy[segments]
+        length_sq = self.length_sq[segments]
+        safe_length_sq = np.where(length_sq > 0, length_sq, 1)
+        t = np.clip((px * dx + py * dy) / safe_length_sq, 0.0, 1.0)
+        dist = np.hypot(px - t * dx, py - t * dy)
+
+        # Segment le plus proche de chaque point : premier de chaque groupe trié par distance
+        order = np.lexsort((dist, pair_points))
+        best = order[np.concatenate(([True], np.diff(pair_points[order]) != 0))]
+        nearest_points = pair_points[best]
+        distance[nearest_points] = dist[best]
+        along[nearest_points] = self.start_along[segments[best]] + t[best] * np.sqrt(length_sq[best])
+
+        return distance, along
+
+    def points_at(self, fractions):
+        """Points (lat, lon) du tracé situés aux fractions données (0-1) de sa longueur"""
+        along = np.clip(np.asarray(fractions, dtype=float), 0.0, 1.0) * self.length_km
+        segments = np.clip(np.searchsorted(self.start_along, along, side='right') - 1, 0, len(self.ax) - 1)
+        lengths = np.sqrt(self.length_sq[segments])
+        t = np.clip((along - self.start_along[segments]) / np.where(lengths > 0, lengths, 1), 0.0, 1.0)
+        x = self.ax[segments] + t * self.dx[segments]
+        y = self.ay[segments] + t * self.dy[segments]
+        return list(zip((y / KM_PER_DEG_LAT).tolist(), (x / self.scale).tolist()))
+
+    def polygon(self, max_vertices=60):
+        """
+        Polygone tampon (liste de (lat, lon)) englobant le corridor, construit
+        sur le tracé simplifié et élargi de la tolérance de simplification
+        """
+        tolerance = self.buffer_km / 2
+        simplified = simplify_douglas_peucker(self.points, tolerance)
+        while len(simplified) > max_vertices:
+            tolerance *= 2
+            simplified = simplify_douglas_peucker(self.points, tolerance)
+
+        lats = np.array([p[0] for p in simplified])
+        lons = np.array([p[1] for p in simplified])
+        x, y = self._project(lats, lons)
+        offset = self.buffer_km + tolerance
+
+        # Normale moyenne des segments adjacents à chaque sommet
+        dx, dy = np.diff(x), np.diff(y)
+        norms = np.hypot(dx, dy)
+        norms[norms == 0] = 1
+        nx, ny = -dy / norms, dx / norms
+        vx = np.concatenate(([nx[0]], nx[:-1] + nx[1:], [nx[-1]]))
+        vy = np.concatenate(([ny[0]], ny[:-1] + ny[1:], [ny[-1]]))
+        v_norm = np.hypot(vx, vy)
+        v_norm[v_norm == 0] = 1
+        vx, vy = vx / v_norm, vy / v_norm
+
+        # Extrémités prolongées pour couvrir le départ et l'arrivée : tangente
+        # (dx, dy) = (ny, -nx), reculée au départ et avancée à l'arrivée
+        tx, ty = ny[0], -nx[0]
+        ex, ey = ny[-1], -nx[-1]
+        x = np.concatenate(([x[0] - tx * offset], x, [x[-1] + ex * offset]))
+        y = np.concatenate(([y[0] - ty * offset], y, [y[-1] + ey * offset]))
+        vx = np.concatenate(([vx[0]], vx, [vx[-1]]))
+        vy = np.concatenate(([vy[0]], vy, [vy[-1]]))
+
+        left = list(zip(y + vy * offset, x + vx * offset))
+        right = list(zip(y - vy * offset, x - vx * offset))
+        ring = left + right[::-1]
+
+        return [(ry / KM_PER_DEG_LAT, rx / self.scale) for ry, rx in ring]
@@ -0,0 +1,175 @@
+# single_flight.py
+"""
+Coalescence des appels identiques en cours (« single-flight »)
+
+Des appelants concurrents avec la même clé attendent un unique appel et en
+partagent le résultat ou l'erreur. Optionnellement, entre workers (processus)
+d'une même machine : un verrou de fichier par clé sérialise l'appel et le
+résultat du premier worker, déposé dans un fichier, est réutilisé par les
+workers qui attendaient pendant share_s secondes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : coalescence limitée au processus
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 500  # appels exécutés entre deux nettoyages du répertoire partagé
+
+
+@contextmanager
+def file_lock(path):
+    """Verrou exclusif entre processus d'une même machine (sans effet sous Windows)"""
+    if fcntl is None:
+        yield
+        return
+
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Groupe d'appels coalescés par clé"""
+
+    def __init__(self, shared_dir=None, share_s=5.0):
+        """
+        Args:
+            shared_dir: Répertoire des verrous et résultats partagés entre
+                workers (None : coalescence dans le processus uniquement)
+            share_s: Durée pendant laquelle un résultat déposé par un autre
+                worker est réutilisé
+        """
+        self.shared_dir = shared_dir if fcntl is not None else None
+        self.share_s = share_s
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.counters = {'calls': 0, 'executed': 0, 'coalesced': 0, 'shared_across_workers': 0, 'errors': 0}
+
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def do(self, key, fn):
+        """
+        Exécute fn() une seule fois pour tous les appelants concurrents de key
+
+        Le résultat est partagé tel quel entre appelants : ne pas le modifier.
+        """
+        with self.lock:
+            self.counters['calls'] += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._execute(key, fn) if self.shared_dir else self._run(fn)
+        except Exception as e:
+            call.error = e
+            self._count('errors')
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+    def _run(self, fn):
+        self._count('executed')
+        return fn()
+
+    # ==================== ENTRE WORKERS ====================
+
+    def _execute(self, key, fn):
+        """Appel sous verrou de fichier ; réutilise le résultat récent d'un autre worker"""
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        lock_path = os.path.join(self.shared_dir, f'{digest}.lock')
+        result_path = os.path.join(self.shared_dir, f'{digest}.json')
+
+        with file_lock(lock_path):
+            shared = self._read_shared(result_path)
+            if shared is not None:
+                self._count('shared_across_workers')
+                return shared['result']
+
+            result = self._run(fn)
+            self._write_shared(result_path, result)
+            return result
+
+    def _read_shared(self, path):
+        try:
+            if time.time() - os.path.getmtime(path) > self.share_s:
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_shared(self, path, result):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'result': result}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # Résultat non sérialisable : partagé seulement dans le processus
+            logger.debug(f"Résultat non partagé entre workers: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if self.counters['executed'] % PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self):
+        """Supprime les résultats et verrous trop anciens pour être réutilisés"""
+        limit = time.time() - max(60.0, self.share_s * 10)
+        for name in os.listdir(self.shared_dir):
+            path = os.path.join(self.shared_dir, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Compteurs ; saved = appels évités (coalescés + partagés entre workers)"""
+        with self.lock:
+            counters = dict(self.counters)
+        counters['saved'] = counters['coalesced'] + counters['shared_across_workers']
+        counters['in_flight'] = len(self.calls)
+        counters['cross_worker'] = bool(self.shared_dir)
+        return counters
@@ -3,8 +3,15 @@
 Client SOAP pour tester le service de calcul de temps de trajet
 """
 
-from zeep import Client
+from zeep import Client, AsyncClient
+from zeep.cache import InMemoryCache
+from zeep.transports import AsyncTransport
+from zeep.wsdl import Document
+import asyncio
+import httpx
 import logging
+import threading
+import time
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -99,6 +106,138 @@ class TravelTimeClient:
             return None
 
 
+class AsyncTravelTimeClient:
+    """
+    Client SOAP asynchrone : pool de connexions HTTP persistantes (httpx)
+    et nombre d'appels simultanés borné
+    """
+    
+    # WSDL analysés, partagés entre toutes les instances
+    # (URL du WSDL -> (document, date de chargement))
+    _documents = {}
+    _documents_lock = threading.Lock()
+    
+    def __init__(self, wsdl_url='http://localhost:8000/?wsdl', max_concurrency=10,
+                 max_connections=10, max_keepalive_connections=5, timeout=10,
+                 wsdl_cache_timeout=3600):
+        """
+        Initialise le client SOAP asynchrone
+        
+        Args:
+            wsdl_url: URL du fichier WSDL du service
+            max_concurrency: Nombre maximum d'appels en vol simultanément
+            max_connections: Taille maximale du pool de connexions
+            max_keepalive_connections: Connexions gardées ouvertes entre appels
+            timeout: Délai maximum d'un appel en secondes
+            wsdl_cache_timeout: Durée de validité du WSDL en cache (secondes)
+        """
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.http = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self.transport = AsyncTransport(
+            client=self.http,
+            wsdl_client=httpx.Client(timeout=timeout),
+            cache=InMemoryCache(timeout=wsdl_cache_timeout)
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        
+        try:
+            document = self._get_document(wsdl_url, self.transport, wsdl_cache_timeout)
+            self.client = AsyncClient(document, transport=self.transport)
+            logger.info(f"✓ Client SOAP asynchrone connecté à {wsdl_url}")
+        except Exception as e:
+            logger.error(f"✗ Erreur de connexion au service SOAP: {e}")
+            raise
+        finally:
+            # Le client synchrone ne sert qu'au téléchargement du WSDL
+            self.transport.wsdl_client.close()
+    
+    @classmethod
+    def _get_document(cls, wsdl_url, transport, timeout):
+        """Renvoie le WSDL analysé, retéléchargé s'il date de plus de timeout secondes"""
+        with cls._documents_lock:
+            cached = cls._documents.get(wsdl_url)
+            if cached is None or time.monotonic() - cached[1] >= timeout:
+                cached = cls._documents[wsdl_url] = (Document(wsdl_url, transport), time.monotonic())
+            return cached[0]
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Ferme les connexions du pool"""
+        await self.http.aclose()
+    
+    async def _call(self, method, **params):
+        async with self.semaphore:
+            try:
+                return await getattr(self.client.service, method)(**params)
+            except Exception as e:
+                logger.error(f"Erreur lors du calcul ({method}): {e}")
+                return None
+    
+    async def calculate_travel_time(self, distance, autonomy, charge_time):
+        """Calcule le temps total de voyage (heures)"""
+        return await self._call(
+            'calculate_travel_time',
+            distance=float(distance),
+            autonomy=float(autonomy),
+            charge_time=float(charge_time)
+        )
+    
+    async def calculate_number_of_stops(self, distance, autonomy):
+        """Calcule le nombre d'arrêts nécessaires"""
+        result = await self._call(
+            'calculate_number_of_stops',
+            distance=float(distance),
+            autonomy=float(autonomy)
+        )
+        return int(result) if result is not None else None
+    
+    async def calculate_driving_time(self, distance, average_speed=90):
+        """Calcule le temps de conduite seul (heures)"""
+        return await self._call(
+            'calculate_driving_time',
+            distance=float(distance),
+            average_speed=float(average_speed)
+        )
+    
+    async def gather_travel_times(self, trips):
+        """
+        Calcule les temps de voyage d'un lot de trajets en parallèle
+        
+        Args:
+            trips: Itérable de tuples (distance, autonomy, charge_time)
+            
+        Returns:
+            Liste des temps totaux (None pour les appels en échec), dans l'ordre
+        """
+        return await asyncio.gather(*(
+            self.calculate_travel_time(distance, autonomy, charge_time)
+            for distance, autonomy, charge_time in trips
+        ))
+    
+    async def gather_number_of_stops(self, trips):
+        """
+        Calcule les nombres d'arrêts d'un lot de trajets en parallèle
+        
+        Args:
+            trips: Itérable de tuples (distance, autonomy)
+            
+        Returns:
+            Liste des nombres d'arrêts (None pour les appels en échec), dans l'ordre
+        """
+        return await asyncio.gather(*(
+            self.calculate_number_of_stops(distance, autonomy)
+            for distance, autonomy in trips
+        ))
+
+
 def test_service():
     """Fonction de test du service SOAP"""
     
@@ -173,5 +312,23 @@ def test_service():
         print("Assurez-vous que le service SOAP est démarré!")
 
 
+async def test_async_service():
+    """Fonction de test du client SOAP asynchrone (lot de trajets en parallèle)"""
+    
+    print("\n📦 Test asynchrone: 50 trajets en parallèle")
+    print("-" * 40)
+    
+    trips = [(100 + 15 * i, 395, 0.75) for i in range(50)]
+    
+    async with AsyncTravelTimeClient(max_concurrency=10) as client:
+        times = await client.gather_travel_times(trips)
+    
+    ok = [t for t in times if t is not None]
+    print(f"→ {len(ok)}/{len(trips)} calculs réussis")
+    if ok:
+        print(f"→ Temps total min/max: {min(ok):.2f} h / {max(ok):.2f} h")
+
+
 if __name__ == '__main__':
-    test_service()
\ No newline at end of file
+    test_service()
+    asyncio.run(test_async_service())
\ No newline at end of file
@@ -6,13 +6,20 @@ Compatible Azure Web App
 
 from spyne import Application, rpc, ServiceBase, Float, Integer
 from spyne.protocol.soap import Soap11
+from spyne.protocol.http import HttpRpc
+from spyne.protocol.json import JsonDocument
 from spyne.server.wsgi import WsgiApplication
+from spyne.util.wsgi_wrapper import WsgiMounter
 from wsgiref.simple_server import make_server
 import logging
 import os
+import signal
+import threading
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO)
+from structured_logging import configure_logging, sampled
+
+# Configuration du logging : JSON non bloquant, un calcul sur LOG_SAMPLE_RATE journalisé
+configure_logging('soap')
 logger = logging.getLogger(__name__)
 
 
@@ -53,7 +60,10 @@ class TravelTimeService(ServiceBase):
             # Temps total
             total_time = driving_time + total_charge_time
             
-            logger.info(f"Calcul: {distance}km, {number_of_stops} arrêts, {total_time:.2f}h")
+            logger.info(
+                "Calcul: %skm, %d arrêts, %.2fh", distance, number_of_stops, total_time,
+                extra=sampled(event='travel_time', distance_km=distance, stops=number_of_stops, total_h=round(total_time, 2))
+            )
             
             return total_time
             
@@ -144,7 +154,162 @@ application = Application(
     out_protocol=Soap11()
 )
 
-wsgi_application = WsgiApplication(application)
+# Même service exposé en HttpRpc/JSON sous /json pour les appelants internes
+# (app.py) : pas de validation de schéma XML ni d'enveloppe SOAP.
+# Ex. GET /json/calculate_travel_time?distance=775&autonomy=395&charge_time=0.75
+json_application = Application(
+    [TravelTimeService],
+    tns='fr.usmb.info802.evtrip.soap',
+    in_protocol=HttpRpc(validator='soft'),
+    out_protocol=JsonDocument()
+)
+
+soap_wsgi_application = WsgiApplication(application)
+json_wsgi_application = WsgiApplication(json_application)
+
+wsgi_application = WsgiMounter({
+    '': soap_wsgi_application,
+    'json': json_wsgi_application,
+})
+
+
+# ==================== SERVEURS WSGI ====================
+
+# Serveur utilisé : 'gunicorn' (multi-workers, keep-alive), 'threaded' (un
+# processus multi-threads, keep-alive, utilisable sous Windows) ou 'simple'
+# (wsgiref mono-thread historique)
+SOAP_SERVER = os.environ.get('SOAP_SERVER', 'gunicorn')
+SOAP_WORKERS = int(os.environ.get('SOAP_WORKERS', 2))
+SOAP_THREADS = int(os.environ.get('SOAP_THREADS', 8))
+SOAP_BACKLOG = int(os.environ.get('SOAP_BACKLOG', 2048))
+SOAP_KEEPALIVE = int(os.environ.get('SOAP_KEEPALIVE', 5))
+SOAP_GRACEFUL_TIMEOUT = int(os.environ.get('SOAP_GRACEFUL_TIMEOUT', 30))
+
+
+def run_gunicorn(host, port):
+    """Sert le WSDL via gunicorn (workers gthread, keep-alive, arrêt gracieux sur SIGTERM)"""
+    from gunicorn.app.base import BaseApplication
+
+    class SoapApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': f'{host}:{port}',
+                'workers': SOAP_WORKERS,
+                'worker_class': 'gthread',
+                'threads': SOAP_THREADS,
+                'backlog': SOAP_BACKLOG,
+                'keepalive': SOAP_KEEPALIVE,
+                'graceful_timeout': SOAP_GRACEFUL_TIMEOUT,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return wsgi_application
+
+    SoapApplication().run()
+
+
+def run_threaded(host, port):
+    """Serveur wsgiref multi-threads en HTTP/1.1 (keep-alive)"""
+    import io
+    from http.server import BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer
+
+    class KeepAliveServerHandler(ServerHandler):
+        http_version = '1.1'
+
+        def cleanup_headers(self):
+            super().cleanup_headers()
+            # Sans longueur, seule la fermeture signale la fin de la réponse
+            if 'Content-Length' not in self.headers:
+                self.request_handler.close_connection = True
+                self.headers['Connection'] = 'close'
+
+        def handle_error(self):
+            self.request_handler.close_connection = True
+            super().handle_error()
+
+    class KeepAliveRequestHandler(WSGIRequestHandler):
+        """
+        wsgiref (comme Werkzeug) ne sert qu'une requête par connexion : le corps,
+        de longueur connue, est ici lu en entier avant l'appel de l'application
+        et la connexion reste ouverte pour la requête suivante.
+        """
+        protocol_version = 'HTTP/1.1'
+        # Fermeture des connexions inactives
+        timeout = SOAP_KEEPALIVE
+        handle = BaseHTTPRequestHandler.handle
+
+        def handle_one_request(self):
+            try:
+                self.raw_requestline = self.rfile.readline(65537)
+            except TimeoutError:
+                self.close_connection = True
+                return
+            if len(self.raw_requestline) > 65536:
+                self.send_error(414)
+                return
+            if not self.raw_requestline:
+                self.close_connection = True
+                return
+            if not self.parse_request():
+                return
+            if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+                self.send_error(411)
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self.send_error(400, 'Content-Length invalide')
+                return
+
+            body = io.BytesIO(self.rfile.read(length))
+            handler = KeepAliveServerHandler(
+                body, self.wfile, self.get_stderr(), self.get_environ(), multithread=True
+            )
+            handler.request_handler = self
+            handler.run(self.server.get_app())
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    class SoapWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = SOAP_BACKLOG
+
+    server = make_server(host, port, wsgi_application,
+                         server_class=SoapWSGIServer, handler_class=KeepAliveRequestHandler)
+    _serve_until_stopped(server)
+
+
+def run_simple(host, port):
+    """Serveur wsgiref mono-thread (une requête à la fois, sans keep-alive)"""
+    _serve_until_stopped(make_server(host, port, wsgi_application))
+
+
+def _serve_until_stopped(server):
+    """Boucle de service ; SIGTERM termine la requête en cours puis arrête le serveur"""
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+SERVERS = {
+    'gunicorn': run_gunicorn,
+    'threaded': run_threaded,
+    'simple': run_simple,
+}
 
 
 if __name__ == '__main__':
@@ -152,19 +317,22 @@ if __name__ == '__main__':
     PORT = int(os.environ.get('SOAP_PORT', 8000))
     HOST = os.environ.get('SOAP_HOST', '0.0.0.0')
     
+    server_name = SOAP_SERVER if SOAP_SERVER in SERVERS else 'gunicorn'
+    if server_name == 'gunicorn' and os.name == 'nt':
+        # gunicorn ne fonctionne pas sous Windows
+        server_name = 'threaded'
+    
     print("=" * 70)
     print("🔵 SERVICE SOAP - EV TRIP PLANNER")
     print("=" * 70)
     print(f"🌐 URL     : http://{HOST}:{PORT}")
     print(f"📄 WSDL    : http://{HOST}:{PORT}/?wsdl")
+    print(f"🟢 JSON    : http://{HOST}:{PORT}/json/<méthode>?<paramètres>")
     print(f"⚡ Service : Calcul de temps de trajet véhicules électriques")
+    print(f"🧵 Serveur : {server_name}")
     print("=" * 70)
     
-    server = make_server(HOST, PORT, wsgi_application)
-    
-    try:
-        logger.info(f"Service SOAP démarré sur {HOST}:{PORT}")
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("\n🛑 Arrêt du service SOAP")
-        logger.info("Service SOAP arrêté")
\ No newline at end of file
+    logger.info(f"Service SOAP démarré sur {HOST}:{PORT} ({server_name})")
+    SERVERS[server_name](HOST, PORT)
+    print("\n🛑 Arrêt du service SOAP")
+    logger.info("Service SOAP arrêté")
\ No newline at end of file
@@ -3,15 +3,29 @@ echo "==================================="
 echo "Starting EV Trip Planner on Render"
 echo "==================================="
 
-# Lancer le service SOAP
+# Attend qu'une URL réponde (sonde toutes les 100 ms, au plus $2 secondes)
+wait_until_ready() {
+    local url=$1 timeout=$2 started=$SECONDS
+    until curl -sf -o /dev/null --max-time 1 "$url"; do
+        if (( SECONDS - started >= timeout )); then
+            echo "Service not ready after ${timeout}s: $url"
+            return 1
+        fi
+        sleep 0.1
+    done
+}
+
+# Lancer le service SOAP (gunicorn multi-workers, voir SOAP_SERVER / SOAP_WORKERS)
 echo "Starting SOAP service on port 8000..."
 python cars/soap_service.py &
 SOAP_PID=$!
 echo "SOAP service started with PID: $SOAP_PID"
 
-# Attendre 5 secondes pour que SOAP démarre
-sleep 5
+# Sonde de disponibilité du SOAP au lieu d'une attente fixe
+wait_until_ready "http://127.0.0.1:8000/?wsdl" 30
+echo "SOAP service ready after ${SECONDS}s"
 
-# Lancer Flask avec Gunicorn
+# Lancer Flask avec Gunicorn (preload + fork, voir cars/gunicorn.conf.py) ;
+# disponibilité de l'API : GET /api/ready
 echo "Starting Flask API on port $PORT..."
-gunicorn --bind 0.0.0.0:$PORT --timeout 600 --workers=2 cars.app:app
+exec gunicorn --config cars/gunicorn.conf.py --chdir cars app:app
@@ -0,0 +1,183 @@
+# station_index.py
+"""
+Index en mémoire des bornes IRVE
+Bitmaps (entiers Python) par classe de puissance et par type de prise, listes
+de lignes par cellule géographique : une requête « borne ≥ 50 kW CCS la plus
+proche dans 20 km » parcourt les lignes des cellules voisines, filtrées par
+le ET des bitmaps d'attributs, puis calcule la distance des seuls candidats
+restants.
+
+Les bitmaps ont un bit par borne indexée : l'index est borné à max_stations
+bornes ; au-delà, les plus anciennes sont oubliées (l'index est reconstruit
+avec la moitié la plus récente).
+"""
+
+import re
+import threading
+from math import radians, sin, cos, sqrt, atan2, floor
+
+from charging_planner import parse_power_kw
+
+# Bornes inférieures des classes de puissance (kW)
+POWER_CLASSES = (0, 7, 22, 50, 150)
+
+# Types de prise normalisés et motifs reconnus dans le champ IRVE type_prise
+CONNECTOR_TYPES = {
+    'ccs': ('COMBO', 'CCS'),
+    'chademo': ('CHADEMO',),
+    'type2': ('T2', 'TYPE 2', 'TYPE2'),
+    'ef': ('EF', 'E/F', 'DOMESTIQUE'),
+    'type3': ('T3', 'TYPE 3'),
+}
+
+
+def parse_connectors(value):
+    """Types de prise normalisés à partir d'une valeur IRVE ('T2 - CHADEMO - COMBO', ...)"""
+    text = str(value or '').upper()
+    words = set(re.split(r'[\s,;\-]+', text))
+    return {
+        name for name, patterns in CONNECTOR_TYPES.items()
+        # Motifs courts (T2, EF, CCS) : mot entier ; motifs longs : sous-chaîne
+        if any(p in words or (len(p) > 3 and p in text) for p in patterns)
+    }
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+class StationIndex:
+    """Bornes indexées par puissance, type de prise et cellule géographique"""
+
+    def __init__(self, cell_deg=0.1, max_stations=100000):
+        """
+        Args:
+            cell_deg: Taille des cellules géographiques (degrés)
+            max_stations: Bornes conservées au plus (0 : illimité)
+        """
+        self.cell_deg = cell_deg
+        self.max_stations = max_stations
+        self.lock = threading.Lock()
+        self.evicted = 0
+        self._reset()
+
+    def _reset(self):
+        self.stations = []
+        self.powers = []
+        self.rows = {}
+        # at_least[k] : bornes de puissance >= POWER_CLASSES[k]
+        self.at_least = [0] * len(POWER_CLASSES)
+        self.connectors = {name: 0 for name in CONNECTOR_TYPES}
+        # Cellule -> lignes des bornes qu'elle contient
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.stations)
+
+    def _cell(self, lat, lon):
+        return floor(lat / self.cell_deg), floor(lon / self.cell_deg)
+
+    def add(self, station):
+        """Ajoute une borne (ignorée si son id est déjà indexé) ; renvoie sa ligne"""
+        with self.lock:
+            row = self.rows.get(station['id'])
+            if row is not None:
+                return row
+
+            if self.max_stations and len(self.stations) >= self.max_stations:
+                self._evict_oldest()
+            return self._add(station)
+
+    def _evict_oldest(self):
+        """Reconstruit l'index avec la moitié la plus récente des bornes"""
+        kept = self.stations[len(self.stations) // 2:]
+        self.evicted += len(self.stations) - len(kept)
+        self._reset()
+        for station in kept:
+            self._add(station)
+
+    def _add(self, station):
+        row = len(self.stations)
+        bit = 1 << row
+        power = parse_power_kw(station.get('power'))
+
+        self.stations.append(station)
+        self.powers.append(power)
+        self.rows[station['id']] = row
+
+        if power is not None:
+            for k, bound in enumerate(POWER_CLASSES):
+                if power >= bound:
+                    self.at_least[k] |= bit
+        for name in parse_connectors(station.get('connector_type')):
+            self.connectors[name] |= bit
+
+        self.cells.setdefault(self._cell(station['lat'], station['lon']), []).append(row)
+        return row
+
+    def _spatial_rows(self, lat, lon, radius_km):
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(cos(radians(lat)), 0.01))
+        lat_min, lon_min = self._cell(lat - dlat, lon - dlon)
+        lat_max, lon_max = self._cell(lat + dlat, lon + dlon)
+
+        for i in range(lat_min, lat_max + 1):
+            for j in range(lon_min, lon_max + 1):
+                yield from self.cells.get((i, j), ())
+
+    def _attribute_mask(self, min_power, connector):
+        """Bitmap des bornes compatibles ; -1 (tous les bits) si aucun filtre"""
+        mask = -1
+        if min_power:
+            # Classe la plus haute dont la borne inférieure reste <= min_power
+            k = max((i for i, bound in enumerate(POWER_CLASSES) if bound <= min_power), default=0)
+            mask &= self.at_least[k]
+        if connector:
+            mask &= self.connectors.get(connector, 0)
+        return mask
+
+    def query(self, lat, lon, radius_km=20, min_power=None, connector=None, limit=1):
+        """
+        Bornes compatibles les plus proches d'un point
+
+        Args:
+            radius_km: Rayon de recherche
+            min_power: Puissance minimale en kW (None : pas de filtre)
+            connector: Type de prise normalisé (clé de CONNECTOR_TYPES)
+            limit: Nombre maximum de bornes renvoyées
+
+        Returns:
+            Liste de tuples (distance_km, station) triée par distance
+        """
+        with self.lock:
+            mask = self._attribute_mask(min_power, connector)
+            matches = []
+            for row in self._spatial_rows(lat, lon, radius_km):
+                if mask != -1 and not (mask >> row) & 1:
+                    continue
+                # La classe de puissance n'est qu'une borne inférieure : vérification exacte
+                if min_power and self.powers[row] < min_power:
+                    continue
+                station = self.stations[row]
+                distance = _distance_km(lat, lon, station['lat'], station['lon'])
+                if distance <= radius_km:
+                    matches.append((distance, station))
+
+        matches.sort(key=lambda match: match[0])
+        return matches[:limit]
+
+    def nearest(self, lat, lon, radius_km=20, min_power=None, connector=None):
+        """Borne compatible la plus proche (copie) ou None"""
+        matches = self.query(lat, lon, radius_km, min_power, connector, limit=1)
+        return dict(matches[0][1]) if matches else None
+
+    @staticmethod
+    def matches(station, min_power=None, connector=None):
+        """Vérifie qu'une borne respecte les filtres de puissance et de prise"""
+        if min_power and (parse_power_kw(station.get('power')) or 0) < min_power:
+            return False
+        if connector and connector not in parse_connectors(station.get('connector_type')):
+            return False
+        return True
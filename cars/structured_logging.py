@@ -0,0 +1,208 @@
+# structured_logging.py
+"""
+Journalisation structurée (JSON), non bloquante et échantillonnée
+
+- Les threads qui journalisent ne font que déposer l'enregistrement dans une
+  file bornée (QueueHandler) : mise en forme JSON et écriture sur stderr se
+  font dans un thread dédié (QueueListener). File pleine : l'enregistrement
+  est abandonné et compté plutôt que de bloquer la requête.
+- Une ligne JSON par enregistrement (python-json-logger si installé) : heure,
+  niveau, logger, message, service, pid et les champs passés en extra.
+- Les journaux de succès par appel (extra=sampled(...)) ne sont conservés
+  qu'avec la probabilité sample_rate ; avertissements et erreurs toujours.
+
+Le thread d'écriture ne survit pas au fork (gunicorn avec preload, pool de
+processus de bulk_trips) : il est relancé dans chaque processus enfant.
+
+Variables : LOG_LEVEL, LOG_FORMAT (json | text), LOG_SAMPLE_RATE, LOG_QUEUE_SIZE.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    from pythonjsonlogger import jsonlogger
+except ImportError:
+    jsonlogger = None
+
+TEXT_FORMAT = '%(levelname)s:%(name)s:%(message)s'
+JSON_FIELDS = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+# Attributs non repris dans les lignes JSON : ceux d'un LogRecord standard (les
+# autres viennent de extra) et la marque d'échantillonnage
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sampled'}
+
+
+def sampled(**fields):
+    """extra d'un journal de succès par appel, soumis à l'échantillonnage"""
+    fields['sampled'] = True
+    return fields
+
+
+class SamplingFilter(logging.Filter):
+    """Garde un enregistrement marqué sampled avec la probabilité rate ; les autres toujours"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno >= logging.WARNING or not getattr(record, 'sampled', False):
+            return True
+        if random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class _JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement, sans python-json-logger"""
+
+    def __init__(self, static_fields=None):
+        super().__init__()
+        self.static_fields = static_fields or {}
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(self.static_fields)
+        entry.update({key: value for key, value in vars(record).items() if key not in RESERVED_ATTRS})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def json_formatter(static_fields):
+    if jsonlogger is None:
+        return _JsonFormatter(static_fields)
+    return jsonlogger.JsonFormatter(
+        JSON_FIELDS,
+        rename_fields={'asctime': 'time', 'levelname': 'level', 'name': 'logger'},
+        static_fields=static_fields,
+        reserved_attrs=tuple(RESERVED_ATTRS),
+        json_ensure_ascii=False
+    )
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler qui abandonne (et compte) l'enregistrement quand la file est pleine"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # File dans le processus : l'enregistrement est transmis tel quel, la mise
+        # en forme (message, exception) se fait dans le thread d'écriture
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingSetup:
+    """File, thread d'écriture et filtre installés sur le logger racine"""
+
+    def __init__(self, service, level='INFO', fmt='json', sample_rate=1.0, queue_size=10000, stream=None):
+        self.queue_size = queue_size
+        self.sampling = SamplingFilter(sample_rate)
+        self.handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        self.handler.addFilter(self.sampling)
+
+        self.output = logging.StreamHandler(stream or sys.stderr)
+        if fmt == 'json':
+            self.output.setFormatter(json_formatter({'service': service, 'pid': os.getpid()}))
+        else:
+            self.output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        self.fmt = fmt
+
+        root = logging.getLogger()
+        # Remplace les handlers installés par des basicConfig() à l'import des modules
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(level)
+
+        self.listener = None
+        self.start()
+
+    def start(self):
+        self.listener = QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    def after_fork(self):
+        """Processus enfant : nouvelle file (l'ancienne peut être verrouillée) et nouveau thread"""
+        self.handler.queue = queue.Queue(self.queue_size)
+        if self.fmt == 'json' and hasattr(self.output.formatter, 'static_fields'):
+            self.output.formatter.static_fields = dict(self.output.formatter.static_fields, pid=os.getpid())
+        self.start()
+
+    def stop(self):
+        """Vide la file puis arrête le thread d'écriture"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def stats(self):
+        return {
+            'format': self.fmt,
+            'sample_rate': self.sampling.rate,
+            'sampled_out': self.sampling.dropped,
+            'dropped_queue_full': self.handler.dropped,
+            'queued': self.handler.queue.qsize()
+        }
+
+
+_setup = None
+_setup_lock = threading.Lock()
+
+
+def _after_fork_in_child():
+    if _setup is not None:
+        _setup.after_fork()
+
+
+def configure_logging(service, level=None, fmt=None, sample_rate=None, queue_size=None, stream=None):
+    """
+    Installe la journalisation du processus (une seule fois ; appels suivants sans effet)
+
+    Args:
+        service: Nom du service ajouté à chaque ligne JSON ('api', 'soap'...)
+        level, fmt, sample_rate, queue_size: par défaut LOG_LEVEL, LOG_FORMAT,
+            LOG_SAMPLE_RATE, LOG_QUEUE_SIZE
+        stream: Flux de sortie (stderr par défaut)
+
+    Returns:
+        LoggingSetup (stats() pour les métriques)
+    """
+    global _setup
+    with _setup_lock:
+        if _setup is not None:
+            return _setup
+
+        _setup = LoggingSetup(
+            service,
+            level=(level or os.getenv('LOG_LEVEL', 'INFO')).upper(),
+            fmt=fmt or os.getenv('LOG_FORMAT', 'json'),
+            sample_rate=float(os.getenv('LOG_SAMPLE_RATE', 1.0) if sample_rate is None else sample_rate),
+            queue_size=int(os.getenv('LOG_QUEUE_SIZE', 10000) if queue_size is None else queue_size),
+            stream=stream
+        )
+        atexit.register(_setup.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_after_fork_in_child)
+        return _setup
@@ -0,0 +1,459 @@
+# stub_upstreams.py
+"""
+Serveurs HTTP locaux simulant les APIs externes (IRVE, OpenRouteService,
+Chargetrip GraphQL, geo.api.gouv.fr) pour les tests de charge reproductibles.
+Chaque serveur accepte une latence et un taux d'erreur configurables.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from math import pi, radians, sin, cos, sqrt, atan2
+from urllib.parse import urlparse, parse_qs
+
+from fallback_data import CITIES_COORDINATES, FALLBACK_VEHICLES
+from polyline import encode_polyline
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UPSTREAMS = ('irve', 'ors', 'chargetrip', 'geo')
+
+# Profils de bornes renvoyés par le faux IRVE (puissance kW, type de prise)
+STATION_PROFILES = [
+    (3.7, 'EF - T2'),
+    (7.4, 'T2'),
+    (22, 'T2'),
+    (50, 'T2 - CHADEMO - COMBO'),
+    (150, 'Combo CCS'),
+]
+
+# Bornes simulées dans le rayon d'une recherche geofilter.distance (lues par pages)
+IRVE_STATIONS_PER_SEARCH = 40
+
+
+@dataclass
+class StubConfig:
+    """Comportement injecté d'un serveur simulé"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+
+# ==================== GÉNÉRATION DES DONNÉES ====================
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    """Distance haversine en km"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def build_communes(extra_communes=2000, seed=42):
+    """Communes au format geo.api.gouv.fr : grandes villes + petites communes synthétiques"""
+    rng = random.Random(seed)
+    communes = [
+        {
+            'nom': data['name'],
+            'code': f'{idx:05d}',
+            'population': data['population'],
+            'centre': {'type': 'Point', 'coordinates': [data['lon'], data['lat']]}
+        }
+        for idx, data in enumerate(CITIES_COORDINATES.values(), 1)
+    ]
+
+    for idx in range(extra_communes):
+        communes.append({
+            'nom': f'Commune {idx}',
+            'code': f'9{idx:04d}',
+            'population': rng.randint(50, 20000),
+            'centre': {'type': 'Point', 'coordinates': [rng.uniform(-4.5, 7.5), rng.uniform(42.5, 51.0)]}
+        })
+
+    return communes
+
+
+def build_vehicle_list(size=30):
+    """Catalogue au format GraphQL Chargetrip, dérivé des véhicules de fallback"""
+    vehicles = []
+
+    for idx in range(size):
+        base = FALLBACK_VEHICLES[idx % len(FALLBACK_VEHICLES)]
+        variant = idx // len(FALLBACK_VEHICLES)
+        autonomy = base['autonomy'] + 15 * variant
+        vehicles.append({
+            'id': f'stub{idx:04d}',
+            'naming': {
+                'make': base['brand'],
+                'model': base['model'] if variant == 0 else f"{base['model']} v{variant + 1}",
+                'version': '',
+                'edition': None,
+                'chargetrip_version': f"{base['model']} {base['battery']} kWh"
+            },
+            'battery': {'usable_kwh': base['battery'], 'full_kwh': base['battery'] + 3},
+            'body': {'seats': base['seats']},
+            'range': {'chargetrip_range': {'best': int(autonomy * 1.1), 'worst': int(autonomy * 0.9)}},
+            'performance': {'acceleration': 7.5, 'top_speed': 160},
+            'charging': {'time': int(base['chargeTime'] * 60), 'ports': [{'standard': 'IEC_62196_T2_COMBO', 'max_electric_power': 100}]},
+            'media': {'image': {'thumbnail_url': 'https://example.invalid/thumb.png'}}
+        })
+
+    return vehicles
+
+
+def parse_selection(query, root='vehicleList'):
+    """Champs demandés sous root dans un document GraphQL : arbre {champ: sous-arbre ou None}"""
+    # Après l'accolade de l'opération (dont le nom peut être aussi root)
+    match = re.compile(root + r'\s*(\([^)]*\))?\s*\{').search(query, query.find('{') + 1)
+    if '{' not in query or not match:
+        return None
+    tree, stack, node, last = {}, [], None, None
+    node = tree
+    for token in re.findall(r'\w+|[{}]', query[match.end():]):
+        if token == '{':
+            stack.append(node)
+            node[last] = {}
+            node = node[last]
+        elif token == '}':
+            if not stack:
+                break
+            node = stack.pop()
+        else:
+            node[token] = None
+            last = token
+    return tree
+
+
+def project(value, tree):
+    """Ne garde d'une valeur JSON que les champs de l'arbre de sélection"""
+    if tree is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    return {name: project(value.get(name), sub) for name, sub in tree.items() if name in value}
+
+
+def build_chargetrip_response(vehicles, payload, persisted):
+    """
+    Réponse GraphQL simulée : requêtes persistées (APQ), recherche par marque ou
+    modèle (search), taille (size) et champs demandés uniquement
+    """
+    query = payload.get('query')
+    digest = ((payload.get('extensions') or {}).get('persistedQuery') or {}).get('sha256Hash')
+    if digest:
+        if query:
+            persisted[digest] = query
+        elif digest in persisted:
+            query = persisted[digest]
+        else:
+            return {'errors': [{'message': 'PersistedQueryNotFound', 'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'}}]}
+
+    variables = payload.get('variables') or {}
+    search = (variables.get('search') or '').lower()
+    if search:
+        vehicles = [
+            v for v in vehicles
+            if search in v['naming']['make'].lower() or search in v['naming']['model'].lower()
+        ]
+    if variables.get('size'):
+        page = variables.get('page') or 0
+        vehicles = vehicles[page * variables['size']:(page + 1) * variables['size']]
+
+    return {'data': {'vehicleList': project(vehicles, parse_selection(query or ''))}}
+
+
+def _irve_record(idx, s_lat, s_lon, profile, ref_lat, ref_lon):
+    power, connector = profile
+    return {
+        'recordid': f'stub-{s_lat:.5f}-{s_lon:.5f}',
+        'fields': {
+            'n_station': f'Station simulée {idx + 1}',
+            'ad_station': f'{idx + 1} route de test',
+            'n_amenageur': 'Aménageur simulé',
+            'puiss_max': power,
+            'type_prise': connector,
+            'coordonneesxy': [s_lat, s_lon],
+            'dist': str(int(_distance_km(ref_lat, ref_lon, s_lat, s_lon) * 1000))
+        }
+    }
+
+
+def build_irve_records(lat, lon, radius_m, rows, start=0):
+    """Bornes déterministes autour d'un point, triées par distance (page start / rows)"""
+    rng = random.Random(f'{lat:.3f},{lon:.3f}')
+    spread = min(radius_m, 20000) / 111000
+    records = []
+
+    for idx in range(IRVE_STATIONS_PER_SEARCH):
+        s_lat = lat + rng.uniform(-spread, spread) / 2
+        s_lon = lon + rng.uniform(-spread, spread) / 2
+        records.append(_irve_record(idx, s_lat, s_lon, rng.choice(STATION_PROFILES), lat, lon))
+
+    records.sort(key=lambda r: float(r['fields']['dist']))
+    return records[start:start + rows]
+
+
+def _inside_polygon(lat, lon, polygon):
+    """Test point dans polygone (lancer de rayon)"""
+    inside = False
+    for (lat1, lon1), (lat2, lon2) in zip(polygon, polygon[1:] + polygon[:1]):
+        if (lat1 > lat) != (lat2 > lat):
+            if lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1):
+                inside = not inside
+    return inside
+
+
+@lru_cache(maxsize=64)
+def _polygon_records(polygon, km2_per_station):
+    rng = random.Random(str(list(polygon)))
+    lats = [p[0] for p in polygon]
+    lons = [p[1] for p in polygon]
+    lat_min, lat_max, lon_min, lon_max = min(lats), max(lats), min(lons), max(lons)
+    area_km2 = (lat_max - lat_min) * 111 * (lon_max - lon_min) * 111 * cos(radians(sum(lats) / len(lats)))
+
+    records = []
+    for _ in range(int(area_km2 / km2_per_station) + 1):
+        s_lat, s_lon = rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)
+        if _inside_polygon(s_lat, s_lon, list(polygon)):
+            records.append(_irve_record(len(records), s_lat, s_lon, rng.choice(STATION_PROFILES), lats[0], lons[0]))
+    return records
+
+
+def build_irve_polygon_records(polygon, rows, start=0, km2_per_station=25):
+    """
+    Bornes déterministes réparties dans un polygone (geofilter.polygon), une
+    page de rows bornes à partir de start ; renvoie (page, nombre total)
+    """
+    records = _polygon_records(tuple(polygon), km2_per_station)
+    return records[start:start + rows], len(records)
+
+
+def build_ors_route(coordinates, points_per_100km=150):
+    """Itinéraire simulé : polyligne sinueuse entre les points, détour de 25 %"""
+    points = []
+    segments = []
+
+    for (lon1, lat1), (lon2, lat2) in zip(coordinates, coordinates[1:]):
+        distance = _distance_km(lat1, lon1, lat2, lon2) * 1.25
+        segments.append({'distance': distance * 1000, 'duration': distance / 95 * 3600})
+        steps = max(2, int(distance / 100 * points_per_100km))
+        length = sqrt((lat2 - lat1) ** 2 + (lon2 - lon1) ** 2) or 1
+        for i in range(steps):
+            ratio = i / steps
+            # Sinuosités déterministes perpendiculaires au trajet, nulles aux extrémités
+            offset = 0.08 * sin(pi * 6 * ratio) + 0.01 * sin(pi * 47 * ratio)
+            points.append((
+                lat1 + (lat2 - lat1) * ratio + offset * (lon2 - lon1) / length,
+                lon1 + (lon2 - lon1) * ratio - offset * (lat2 - lat1) / length
+            ))
+
+    last_lon, last_lat = coordinates[-1]
+    points.append((last_lat, last_lon))
+
+    total_distance = sum(s['distance'] for s in segments)
+    total_duration = sum(s['duration'] for s in segments)
+
+    return {
+        'routes': [{
+            'summary': {'distance': total_distance, 'duration': total_duration},
+            'segments': segments,
+            'geometry': encode_polyline(points),
+            'way_points': [0, len(points) - 1]
+        }]
+    }
+
+
+def build_ors_matrix(locations, sources=None, destinations=None):
+    """Matrice de distances simulée (km), même détour de 25 % que build_ors_route"""
+    sources = range(len(locations)) if sources is None else sources
+    destinations = range(len(locations)) if destinations is None else destinations
+    return {
+        'distances': [
+            [
+                round(_distance_km(locations[i][1], locations[i][0], locations[j][1], locations[j][0]) * 1.25, 2)
+                for j in destinations
+            ]
+            for i in sources
+        ]
+    }
+
+
+# ==================== SERVEURS ====================
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Handler commun : injection de latence / erreurs puis dispatch par service"""
+
+    protocol_version = 'HTTP/1.1'
+    upstream = None
+    config = None
+    stats = None
+    lock = None
+    data = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, etag=False):
+        body = json.dumps(payload).encode('utf-8')
+        if etag:
+            tag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            if self.headers.get('If-None-Match') == tag:
+                self.send_response(304)
+                self.send_header('ETag', tag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', tag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _inject(self):
+        """Applique latence et erreurs ; renvoie True si une erreur a été servie"""
+        with self.lock:
+            self.stats['requests'] += 1
+        delay = self.config.latency_ms + random.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            with self.lock:
+                self.stats['errors'] += 1
+            self._send_json(503, {'error': f'{self.upstream} indisponible (erreur injectée)'})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._inject():
+            return
+        query = parse_qs(urlparse(self.path).query)
+
+        if self.upstream == 'geo':
+            self._send_json(200, self.data['communes'])
+        elif self.upstream == 'irve':
+            rows = int(query.get('rows', ['10'])[0])
+            if 'geofilter.polygon' in query:
+                polygon = [
+                    tuple(float(v) for v in vertex.strip('()').split(','))
+                    for vertex in query['geofilter.polygon'][0].split('),(')
+                ]
+                start = int(query.get('start', ['0'])[0])
+                records, nhits = build_irve_polygon_records(polygon, rows, start)
+            else:
+                lat, lon, radius = query.get('geofilter.distance', ['46.8,2.5,20000'])[0].split(',')
+                start = int(query.get('start', ['0'])[0])
+                records = build_irve_records(float(lat), float(lon), float(radius), rows, start)
+                nhits = IRVE_STATIONS_PER_SEARCH
+            self._send_json(200, {'nhits': nhits, 'records': records})
+        else:
+            self._send_json(404, {'error': 'GET non supporté'})
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self._inject():
+            return
+
+        if self.upstream == 'ors' and '/matrix/' in self.path:
+            self._send_json(200, build_ors_matrix(
+                payload.get('locations', []), payload.get('sources'), payload.get('destinations')
+            ))
+        elif self.upstream == 'ors':
+            self._send_json(200, build_ors_route(payload.get('coordinates', [])))
+        elif self.upstream == 'chargetrip':
+            with self.lock:
+                response = build_chargetrip_response(self.data['vehicles'], payload, self.data['persisted'])
+            self._send_json(200, response, etag=self.data['etag'])
+        else:
+            self._send_json(404, {'error': 'POST non supporté'})
+
+
+class StubUpstreams:
+    """Démarre et arrête les quatre faux services sur des ports locaux libres"""
+
+    def __init__(self, configs=None, host='127.0.0.1', extra_communes=2000, vehicles=30, chargetrip_etag=False):
+        self.host = host
+        self.configs = {name: (configs or {}).get(name, StubConfig()) for name in UPSTREAMS}
+        self.data = {
+            'communes': build_communes(extra_communes),
+            'vehicles': build_vehicle_list(vehicles),
+            # Requêtes persistées enregistrées (empreinte -> document) ; ETag sur les réponses GraphQL
+            'persisted': {},
+            'etag': chargetrip_etag
+        }
+        self.stats = {name: {'requests': 0, 'errors': 0} for name in UPSTREAMS}
+        self.servers = {}
+        self.threads = []
+
+    def start(self):
+        for name in UPSTREAMS:
+            handler = type(f'{name.title()}StubHandler', (_StubHandler,), {
+                'upstream': name,
+                'config': self.configs[name],
+                'stats': self.stats[name],
+                'lock': threading.Lock(),
+                'data': self.data
+            })
+            server = ThreadingHTTPServer((self.host, 0), handler)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, name=f'stub-{name}', daemon=True)
+            thread.start()
+            self.servers[name] = server
+            self.threads.append(thread)
+            logger.info(f"Stub {name} démarré sur le port {server.server_port}")
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def url(self, name):
+        return f'http://{self.host}:{self.servers[name].server_port}'
+
+    def env(self):
+        """Variables d'environnement pointant app.py vers les faux services"""
+        return {
+            'IRVE_API_URL': f"{self.url('irve')}/api/records/1.0/search/",
+            'OPENROUTE_API_URL': f"{self.url('ors')}/v2/directions/driving-car",
+            'CHARGETRIP_API_URL': f"{self.url('chargetrip')}/graphql",
+            'GEO_API_URL': f"{self.url('geo')}/communes",
+            'OPENROUTE_API_KEY': 'stub',
+            'CHARGETRIP_API_KEY': 'stub',
+            'CHARGETRIP_CLIENT_ID': 'stub'
+        }
+
+
+if __name__ == '__main__':
+    stubs = StubUpstreams().start()
+
+    print("=" * 70)
+    print("🧪 FAUX SERVICES EXTERNES - EV TRIP PLANNER")
+    print("=" * 70)
+    for key, value in stubs.env().items():
+        print(f"{key}={value}")
+    print("=" * 70)
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stubs.stop()
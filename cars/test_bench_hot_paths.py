@@ -0,0 +1,32 @@
+# test_bench_hot_paths.py
+"""Suite de microbenchmarks (bench_hot_paths.py) : chaque benchmark s'exécute, référence et régressions"""
+
+import json
+
+import pytest
+
+import bench_hot_paths
+
+
+@pytest.mark.parametrize('name', sorted(bench_hot_paths.BENCHMARKS))
+def test_benchmark_factories_run(name):
+    func = bench_hot_paths.BENCHMARKS[name]()
+    func()
+
+
+def test_measure_returns_nanoseconds_per_call():
+    assert bench_hot_paths.measure(lambda: None, repeat=1) > 0
+
+
+def test_save_then_detect_regression(tmp_path, capsys):
+    baseline = tmp_path / 'baseline.json'
+    args = ['--only', 'haversine', '--repeat', '1', '--baseline', str(baseline)]
+    assert bench_hot_paths.main(args + ['--save']) == 0
+    saved = json.loads(baseline.read_text(encoding='utf-8'))
+    assert set(saved['results']) == {'haversine'}
+
+    # Référence 1000 fois plus rapide : régression signalée
+    saved['results']['haversine'] /= 1000
+    baseline.write_text(json.dumps(saved), encoding='utf-8')
+    assert bench_hot_paths.main(args + ['--max-regression', '0.5']) == 1
+    assert 'Régressions : haversine' in capsys.readouterr().out
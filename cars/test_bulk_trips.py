@@ -0,0 +1,120 @@
+# test_bulk_trips.py
+"""Planification de trajets en masse (bulk_trips.py) : lots, pool de processus, reprise"""
+
+import csv
+import json
+import logging
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import bulk_trips
+
+TRIPS = [
+    {'id': str(n), 'vehicle_id': '1', 'departure': departure, 'destination': destination}
+    for n, (departure, destination) in enumerate([
+        ('paris', 'lyon'), ('lyon', 'marseille'), ('paris', 'atlantide'), ('nantes', 'bordeaux'),
+        ('48.85,2.35', 'lille'), ('toulouse', 'montpellier'), ('strasbourg', 'dijon')
+    ])
+]
+
+
+@pytest.fixture
+def bulk(api, monkeypatch, tmp_path):
+    """bulk_trips sur l'application des tests (faux services), environnement restauré ensuite"""
+    saved = dict(os.environ)
+    # init_worker baisse le niveau du logger app (sans --verbose)
+    monkeypatch.setattr(logging.getLogger('app'), 'level', logging.getLogger('app').level)
+    os.environ['SINGLE_FLIGHT_DIR'] = str(tmp_path / 'single_flight')
+    monkeypatch.setattr(bulk_trips, 'app', api)
+    monkeypatch.setattr(bulk_trips, 'with_stations', True)
+    yield bulk_trips
+    os.environ.clear()
+    os.environ.update(saved)
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_plan_trip_row(bulk):
+    result = bulk.plan_trip_row(TRIPS[0])
+    assert result['error'] is None
+    assert result['distance_km'] > 300 and result['num_stops'] >= 0
+    assert result['total_h'] == pytest.approx(result['driving_h'] + result['charging_h'], abs=0.02)
+    assert isinstance(json.loads(result['stations']), list)
+
+    assert bulk.plan_trip_row(TRIPS[2])['error'] == 'Ville non trouvée'
+
+
+def test_csv_run_keeps_input_order(bulk, tmp_path):
+    source, output = tmp_path / 'trips.csv', tmp_path / 'results.csv'
+    write_csv(source, TRIPS)
+    args = ['--workers', '2', '--batch-size', '3', '--chunksize', '1', '--no-stations']
+    assert bulk.main([str(source), str(output)] + args) == 0
+
+    rows = read_csv(output)
+    assert [row['id'] for row in rows] == [trip['id'] for trip in TRIPS]
+    assert [bool(row['error']) for row in rows] == [trip['destination'] == 'atlantide' for trip in TRIPS]
+    checkpoint = json.loads((tmp_path / 'results.csv.checkpoint.json').read_text(encoding='utf-8'))
+    assert checkpoint['rows'] == len(TRIPS)
+
+
+def test_resume_discards_rows_after_checkpoint(bulk, tmp_path):
+    source, output = tmp_path / 'trips.jsonl', tmp_path / 'results.csv'
+    source.write_text(''.join(json.dumps(trip) + '\n' for trip in TRIPS), encoding='utf-8')
+    args = ['--workers', '1', '--batch-size', '3', '--no-stations']
+    assert bulk.main([str(source), str(output)] + args) == 0
+    expected = output.read_bytes()
+
+    # Interruption après le premier lot, lignes du lot suivant partiellement écrites
+    first_batch = b''.join(expected.splitlines(keepends=True)[:4])
+    output.write_bytes(first_batch + b'3,1,nantes,bord')
+    bulk.save_checkpoint(str(output), {
+        'input': str(source.resolve()), 'rows': 3, 'sink': {'output_bytes': len(first_batch)}
+    })
+
+    assert bulk.main([str(source), str(output), '--resume'] + args) == 0
+    assert output.read_bytes() == expected
+
+
+def test_checkpoint_of_another_input_is_ignored(bulk, tmp_path):
+    output = str(tmp_path / 'results.csv')
+    bulk.save_checkpoint(output, {'input': '/ailleurs/trips.csv', 'rows': 3, 'sink': {}})
+    assert bulk.load_checkpoint(output, str(tmp_path / 'trips.csv')) is None
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('trips.csv', 'csv'), ('trips.JSONL', 'jsonl'), ('trips.ndjson', 'jsonl'), ('out.parquet', 'parquet')
+])
+def test_detect_format(path, expected):
+    assert bulk_trips.detect_format(path) == expected
+
+
+def test_parquet_output_requires_pyarrow(bulk, tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_trips, 'pyarrow', None)
+    source = tmp_path / 'trips.csv'
+    write_csv(source, TRIPS)
+    assert bulk.main([str(source), str(tmp_path / 'results.parquet'), '--workers', '1']) == 1
+
+
+def test_parquet_resume_removes_only_later_parts(tmp_path, monkeypatch):
+    # Schéma seulement : pyarrow n'est pas nécessaire pour nettoyer le répertoire
+    fake_pyarrow = SimpleNamespace(schema=list, string=str, float64=float, int32=int)
+    monkeypatch.setattr(bulk_trips, 'pyarrow', fake_pyarrow)
+    names = ['part-00000.parquet', 'part-00001.parquet', 'part-00002.parquet',
+             'part-00003.parquet.tmp', 'part-old.parquet', '_SUCCESS']
+    for name in names:
+        (tmp_path / name).write_bytes(b'')
+
+    bulk_trips.ParquetSink(str(tmp_path), state={'parts': 1})
+    assert sorted(os.listdir(tmp_path)) == sorted(set(names) - {'part-00001.parquet', 'part-00002.parquet'})
@@ -0,0 +1,89 @@
+# test_charging_planner.py
+"""Planificateur d'arrêts de recharge (charging_planner.py) et /api/plan-trip?optimize"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from charging_planner import MIN_SOC, charging_power_kw, parse_power_kw, plan_charging_stops
+
+VEHICLE = {'id': 'test', 'autonomy': 300, 'battery': 60, 'chargeTime': 0.5}
+
+
+def station(name, km, power):
+    return {'name': name, 'distance_from_start': km, 'power': power}
+
+
+@pytest.mark.parametrize('value, expected', [
+    (22, 22.0), ('22', 22.0), ('7,4', 7.4), ('50 kW', 50.0), ('150000', 150.0), ('N/A', None), (None, None), (0, None)
+])
+def test_parse_power_kw(value, expected):
+    assert parse_power_kw(value) == expected
+
+
+def test_charging_slows_down_above_80_percent():
+    assert charging_power_kw(150, 120, 0.5) == 120
+    assert charging_power_kw(150, 120, 0.85) < 120
+
+
+def test_short_trip_needs_no_stop():
+    plan = plan_charging_stops(VEHICLE, 200, [station('a', 100, 50)])
+    assert plan['stops'] == [] and plan['charging_time'] == 0
+    assert plan['total_time'] == pytest.approx(200 / 90, abs=0.01)
+
+
+def test_unreachable_destination_returns_none():
+    # Trou de 350 km entre les deux seules bornes
+    assert plan_charging_stops(VEHICLE, 600, [station('a', 100, 50), station('b', 450, 50)]) is None
+    assert plan_charging_stops(dict(VEHICLE, battery=0), 100, []) is None
+
+
+def test_prefers_fast_charger_over_first_station():
+    candidates = [station('lente', 150, 7), station('rapide', 200, 150)]
+    plan = plan_charging_stops(VEHICLE, 450, candidates)
+    assert [stop['name'] for stop in plan['stops']] == ['rapide']
+
+
+def test_state_of_charge_stays_above_reserve():
+    candidates = [station(f's{km}', km, 50) for km in range(60, 900, 60)]
+    plan = plan_charging_stops(VEHICLE, 900, candidates)
+    assert plan and len(plan['stops']) >= 3
+
+    position, soc = 0.0, 1.0
+    for stop in plan['stops']:
+        arrival = soc - (stop['distance_from_start'] - position) / VEHICLE['autonomy']
+        assert arrival >= MIN_SOC - 0.05
+        assert stop['arrival_soc'] < stop['departure_soc'] <= 1.0
+        position, soc = stop['distance_from_start'], stop['departure_soc']
+    assert soc - (900 - position) / VEHICLE['autonomy'] >= MIN_SOC - 0.05
+    assert [stop['stop_number'] for stop in plan['stops']] == list(range(1, len(plan['stops']) + 1))
+
+
+def test_total_time_adds_driving_and_charging():
+    plan = plan_charging_stops(VEHICLE, 500, [station('a', 250, 100)])
+    assert plan['total_time'] == pytest.approx(plan['driving_time'] + plan['charging_time'], abs=0.02)
+
+
+def test_plan_trip_optimize_returns_plan(client):
+    response = client.post('/api/plan-trip', json={
+        'departure': 'paris', 'destination': 'marseille', 'vehicle_id': 4, 'optimize': True
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['trip']['planner'] == 'optimal'
+    assert body['sources']['calculations'] == 'Planificateur A*'
+    assert body['trip']['numberOfStops'] == len(body['trip']['chargingStations']) > 0
+
+
+def test_app_imports_as_gunicorn_loads_it():
+    """startup.sh : gunicorn --chdir cars app:app (modules voisins importés depuis cars/)"""
+    cars_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(cars_dir, 'startup.sh'), encoding='utf-8') as f:
+        assert '--chdir cars app:app' in f.read()
+
+    # --chdir : répertoire courant ajouté en tête de sys.path, comme ici
+    code = "import os, sys; os.chdir('cars'); sys.path.insert(0, os.getcwd()); import app"
+    env = dict(os.environ, PYTHONPATH='')
+    subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(cars_dir), env=env, check=True, timeout=60)
@@ -0,0 +1,113 @@
+# test_city_store.py
+"""Catalogue des communes en colonnes (city_store.py) et filtres par population"""
+
+import numpy as np
+import pytest
+
+from city_store import CityStore, normalize_city_key
+from packing import pack_strings, unpack_string
+from stub_upstreams import build_communes
+
+
+def test_packed_strings_round_trip():
+    strings = ['Saint-Étienne', '', "L'Haÿ-les-Roses", 'Paris']
+    blob, offsets = pack_strings(strings)
+    assert blob.dtype == np.uint8 and offsets[-1] == len(blob)
+    assert [unpack_string(blob, offsets, i) for i in range(len(strings))] == strings
+
+
+@pytest.fixture(scope='module')
+def store():
+    return CityStore.from_communes(build_communes(3000))
+
+
+def test_dictionary_interface(store):
+    paris = store['paris']
+    assert paris['name'] == 'Paris' and paris['population'] > 2_000_000
+    assert 'paris' in store and 'atlantide' not in store
+    assert len(list(store)) == len(store)
+    with pytest.raises(KeyError):
+        store['atlantide']
+
+
+def test_homonyms_keep_distinct_keys():
+    communes = [
+        {'nom': 'Saint-Denis', 'code': '93066', 'population': 110000, 'centre': {'coordinates': [2.36, 48.94]}},
+        {'nom': 'Saint-Denis', 'code': '97411', 'population': 150000, 'centre': {'coordinates': [55.45, -20.88]}},
+        {'nom': 'Sans centre', 'code': '00000', 'population': 1000, 'centre': None}
+    ]
+    store = CityStore.from_communes(communes)
+    assert len(store) == 2
+    # La plus peuplée garde la clé courte
+    assert store['saintdenis']['code'] == '97411'
+    assert store['saintdenis_93066']['code'] == '93066'
+
+
+def test_normalize_city_key():
+    assert normalize_city_key("Villeneuve-d'Ascq") == 'villeneuvedascq'
+
+
+def test_nearest_matches_brute_force(store):
+    rng = np.random.default_rng(5)
+    for lat, lon in zip(rng.uniform(42, 51, 30), rng.uniform(-4, 8, 30)):
+        expected = np.argsort(store.distances_km(lat, lon), kind='stable')[:3]
+        assert [row for _, row in store.nearest(lat, lon, k=3)] == [int(row) for row in expected]
+    assert all(distance <= 5 for distance, _ in store.nearest(48.85, 2.35, k=10, max_km=5))
+
+
+def test_filter_keeps_population_order(store):
+    big = store.filter(100000)
+    assert all(city['population'] >= 100000 for city in big.values())
+    assert list(big.population) == sorted(big.population, reverse=True)
+    assert store.filter(0) is store
+
+
+def test_empty_store_behaves(store):
+    empty = store.filter(10 ** 9)
+    assert len(empty) == 0 and list(empty.items()) == []
+    assert empty.nearest(48.85, 2.35) == [] and 'paris' not in empty
+
+
+def test_threshold_without_match_returns_empty_store(api):
+    assert len(api.fetch_cities_from_api(5_000_000)) == 0
+
+
+def test_thresholds_are_bucketed_in_cache(api):
+    api.cities_at_threshold.cache_clear()
+    api.cities_at_population.cache_clear()
+    for value in (100000, 123456, 150000, 199999):
+        cities = api.fetch_cities_from_api(value)
+        assert all(city['population'] >= value for city in cities.values())
+    # Un seul exemplaire en cache : le seuil 100 000 de la série
+    assert api.cities_at_threshold.cache_info().currsize == 1
+    assert api.fetch_cities_from_api(100000) is api.fetch_cities_from_api(100000)
+
+
+@pytest.mark.parametrize('value', [50, 123456])
+def test_threshold_outside_the_series_is_cached(api, value):
+    cities = api.fetch_cities_from_api(value)
+    assert all(city['population'] >= value for city in cities.values())
+    # Filtré une seule fois, y compris sous le premier seuil de la série
+    assert api.fetch_cities_from_api(value) is cities
+
+
+@pytest.mark.parametrize('value', [-1, 10 ** 12])
+def test_invalid_threshold_is_rejected(client, value):
+    assert client.get(f'/api/cities?min_population={value}').status_code == 400
+    assert client.get(f'/api/reachable?from=lyon&vehicle_id=1&min_population={value}').status_code == 400
+
+
+def test_fallback_cities_only_when_geo_api_fails(api, stubs):
+    api.fetch_city_store.cache_clear()
+    api.cities_at_threshold.cache_clear()
+    api.cities_at_population.cache_clear()
+    stubs.configs['geo'].error_rate = 1.0
+    try:
+        cities = api.fetch_cities_from_api()
+        assert set(cities) == set(api.CITIES_COORDINATES)
+    finally:
+        stubs.configs['geo'].error_rate = 0.0
+        api.fetch_city_store.cache_clear()
+        api.cities_at_threshold.cache_clear()
+        api.cities_at_population.cache_clear()
+    assert len(api.fetch_cities_from_api(0)) > len(api.CITIES_COORDINATES)
@@ -0,0 +1,145 @@
+# test_graphql_client.py
+"""Client GraphQL Chargetrip (graphql_client.py) : requêtes persistées, champs, synchronisation"""
+
+import json
+
+import pytest
+import requests
+
+from graphql_client import FIELD_SETS, MAX_PERSISTED_FAILURES, ChargeTripClient, query_hash, vehicle_list_query
+from stub_upstreams import StubUpstreams
+
+
+@pytest.fixture(scope='module', params=[False, True], ids=['sans-etag', 'etag'])
+def chargetrip(request):
+    with StubUpstreams(extra_communes=0, chargetrip_etag=request.param) as stubs:
+        yield stubs
+
+
+class RecordingTransport:
+    """Transport requests qui garde corps envoyés et réponses reçues"""
+
+    def __init__(self):
+        self.sent = []
+        self.responses = []
+
+    def __call__(self, url, json=None, headers=None, timeout=None):
+        response = requests.post(url, json=json, headers=headers, timeout=timeout)
+        self.sent.append(json)
+        self.responses.append(response)
+        return response
+
+
+def make_client(chargetrip, **kwargs):
+    transport = RecordingTransport()
+    client = ChargeTripClient('stub', 'stub', url=f"{chargetrip.url('chargetrip')}/graphql",
+                              transport=transport, **kwargs)
+    return client, transport
+
+
+def test_persisted_query_is_registered_once(chargetrip):
+    chargetrip.data['persisted'].clear()
+    client, transport = make_client(chargetrip)
+
+    # Première utilisation : document envoyé avec son empreinte, sans aller-retour NotFound
+    assert len(client.get_vehicles(size=5)) == 5
+    assert len(transport.sent) == 1 and 'query' in transport.sent[0]
+    assert client.stats()['registrations'] == 1
+
+    assert len(client.get_vehicles(size=5)) == 5
+    assert 'query' not in transport.sent[1] and client.stats()['persisted'] == 1
+
+    # Empreinte connue d'avance (liste blanche) : envoyée seule dès le premier appel
+    digest = query_hash(vehicle_list_query())
+    other, other_transport = make_client(chargetrip, registered_hashes=[digest])
+    assert len(other.get_vehicles(size=5)) == 5
+    assert len(other_transport.sent) == 1 and 'query' not in other_transport.sent[0]
+    assert other_transport.sent[0]['extensions']['persistedQuery']['sha256Hash'] == digest
+
+
+class Response:
+    headers = {}
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def test_server_without_persisted_queries():
+    sent = []
+
+    def transport(url, json=None, headers=None, timeout=None):
+        body = json
+        sent.append(body)
+        if 'query' not in body:
+            return Response(b'{"errors": [{"message": "PersistedQueryNotSupported"}]}')
+        return Response(b'{"data": {"vehicleList": []}}')
+
+    client = ChargeTripClient('stub', transport=transport)
+    for _ in range(3):
+        assert client.get_vehicles() == []
+    # Mode désactivé après le premier refus de l'empreinte seule : document complet ensuite
+    assert ['query' in body for body in sent] == [True, False, True, True]
+    assert client.stats()['persisted_queries'] is False
+
+
+@pytest.mark.parametrize('refusal', [
+    Response(b'Bad Gateway', 502),
+    Response(b'{"errors": [{"message": "Internal server error"}]}'),
+    Response(b'{"errors": [{"message": "PersistedQueryNotFound"}]}'),
+])
+def test_refused_hash_is_retried_with_document(refusal):
+    sent = []
+
+    def transport(url, json=None, headers=None, timeout=None):
+        sent.append(json)
+        if 'query' not in json:
+            return refusal
+        return Response(b'{"data": {"vehicleList": []}}')
+
+    client = ChargeTripClient('stub', transport=transport, registered_hashes=[query_hash(vehicle_list_query())])
+    for _ in range(4):
+        assert client.get_vehicles() == []
+    # Chaque refus repris une fois avec le document ; mode désactivé après MAX_PERSISTED_FAILURES refus
+    assert ['query' in body for body in sent] == [False, True] * MAX_PERSISTED_FAILURES + [True]
+    stats = client.stats()
+    assert stats['persisted'] == 0 and stats['fallbacks'] == MAX_PERSISTED_FAILURES
+    assert stats['persisted_queries'] is False
+
+
+def test_only_requested_fields_are_returned(chargetrip):
+    client, transport = make_client(chargetrip, persisted_queries=False)
+    client.get_vehicles(size=3, fields='summary')
+    vehicle = transport.responses[-1].json()['data']['vehicleList'][0]
+    assert set(vehicle) == {'id', 'naming', 'battery', 'range', 'charging'}
+    assert 'media' not in FIELD_SETS['summary']
+
+
+def test_brand_is_filtered_server_side(chargetrip):
+    client, transport = make_client(chargetrip, persisted_queries=False)
+    vehicles = client.get_vehicles(size=50, brand='Tesla')
+    assert vehicles and all(v['brand'] == 'Tesla' for v in vehicles)
+    assert transport.sent[-1]['variables']['search'] == 'Tesla'
+    assert len(transport.responses[-1].json()['data']['vehicleList']) == len(vehicles)
+
+
+def test_unchanged_catalog_is_not_parsed_again(chargetrip):
+    client, transport = make_client(chargetrip)
+    vehicles, changed = client.sync_vehicles(size=10)
+    assert changed and len(vehicles) == 10
+
+    again, changed = client.sync_vehicles(size=10)
+    assert again is vehicles and not changed
+    stats = client.stats()
+    assert stats['parsed'] == 1 and stats['unchanged'] == 1
+    # Avec ETag : 304 sans corps ; sinon même empreinte du contenu
+    expected_status = 304 if chargetrip.data['etag'] else 200
+    assert transport.responses[-1].status_code == expected_status
+
+
+def test_sync_failure_returns_none(chargetrip):
+    client = ChargeTripClient('stub', url=f"{chargetrip.url('geo')}/graphql", persisted_queries=False)
+    assert client.sync_vehicles() == (None, False)
@@ -0,0 +1,128 @@
+# test_job_queue.py
+"""File de tâches asynchrones (job_queue.py) et routes /api/jobs"""
+
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from job_queue import JobFailed, JobQueue, MemoryJobStore, QueueFull, SqliteJobStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryJobStore()
+    return SqliteJobStore(str(tmp_path / 'jobs.sqlite3'))
+
+
+def make_queue(store, **kwargs):
+    queue = JobQueue(store, workers=1, poll_s=0.05, **kwargs)
+    queue.register('square', lambda payload, progress: {'value': payload['n'] ** 2})
+    return queue
+
+
+def test_job_runs_and_result_is_kept(store):
+    queue = make_queue(store)
+    job = queue.submit('square', {'n': 7})
+    assert job['status'] == 'queued'
+
+    done = queue.get(job['id'], wait=5)
+    assert done['status'] == 'done' and done['result'] == {'value': 49}
+    assert 'payload' not in done and done['run_s'] >= 0
+
+
+def test_job_failed_keeps_http_status(store):
+    queue = make_queue(store)
+
+    def fail(payload, progress):
+        raise JobFailed('ville inconnue', status=404)
+
+    queue.register('fail', fail)
+    job = queue.get(queue.submit('fail', {})['id'], wait=5)
+    assert job['status'] == 'failed' and job['error'] == {'error': 'ville inconnue', 'status': 404}
+
+
+def test_queue_full_rejects_submission():
+    queue = JobQueue(MemoryJobStore(), workers=1, max_pending=2)
+    queue.register('square', lambda payload, progress: None)
+    # Pas de thread de calcul : les tâches restent en attente
+    queue.start = lambda: None
+    queue.submit('square', {})
+    queue.submit('square', {})
+    with pytest.raises(QueueFull):
+        queue.submit('square', {})
+    assert queue.stats()['rejected'] == 1
+
+
+def test_expired_results_are_dropped(store):
+    now = [1000.0]
+    queue = make_queue(store, result_ttl=10, clock=lambda: now[0])
+    job_id = queue.submit('square', {'n': 2})['id']
+    assert queue.get(job_id, wait=5)['status'] == 'done'
+
+    now[0] += 11
+    assert queue.get(job_id) is None
+
+
+def test_sqlite_recovers_jobs_of_dead_worker(tmp_path):
+    store = SqliteJobStore(str(tmp_path / 'jobs.sqlite3'))
+    queue = make_queue(store)
+    queue.start = lambda: None
+    job_id = queue.submit('square', {'n': 3})['id']
+    # Tâche réservée par un processus qui n'existe plus
+    assert store.claim(f'{socket.gethostname()}:999999999', 0) is not None
+    assert store.get(job_id)['status'] == 'running'
+
+    assert store.recover(queue.owner) == 1
+    assert store.get(job_id)['status'] == 'queued'
+
+
+def test_worker_survives_store_error_on_finish():
+    store = MemoryJobStore()
+    real_finish, calls = store.finish, []
+
+    def finish(*args):
+        calls.append(args[0])
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        real_finish(*args)
+
+    store.finish = finish
+    queue = make_queue(store)
+    first = queue.submit('square', {'n': 1})['id']
+    second = queue.submit('square', {'n': 2})['id']
+
+    # La première tâche reste 'running' (résultat perdu), la suivante est calculée
+    assert queue.get(second, wait=5)['result'] == {'value': 4}
+    assert store.get(first)['status'] == 'running'
+    assert queue.stats()['store_errors'] == 1
+    assert all(thread.is_alive() for thread in queue.threads)
+
+
+def test_importing_app_does_not_start_job_workers(tmp_path):
+    # Processus neuf sans préchargement : les scripts qui importent app ne prennent pas les tâches partagées
+    code = "import threading, app; print(sorted(t.name for t in threading.enumerate()))"
+    env = dict(os.environ, APP_PRELOAD='0', JOB_STORE='sqlite', JOB_DB_PATH=str(tmp_path / 'jobs.sqlite3'))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+    assert 'job-worker' not in output
+
+
+@pytest.mark.parametrize('wait', ['nan', 'inf', '-inf', 'abc'])
+def test_get_job_rejects_invalid_wait(client, wait):
+    response = client.get(f'/api/jobs/unknown?wait={wait}')
+    assert response.status_code == 400
+
+
+def test_submit_and_poll_plan_trip(client):
+    response = client.post('/api/jobs', json={
+        'type': 'plan-trip',
+        'payload': {'departure': 'paris', 'destination': 'lyon', 'vehicle_id': '1'}
+    })
+    assert response.status_code == 202
+    job = client.get(response.headers['Location'] + '?wait=10').get_json()
+    assert job['status'] in ('done', 'failed')
@@ -0,0 +1,92 @@
+# test_load_harness.py
+"""Faux services externes (stub_upstreams.py) et calculs du test de charge (load_test.py)"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+import requests
+
+import load_test
+from load_test import compare_with_baseline, percentile
+from stub_upstreams import StubConfig, StubUpstreams, build_communes, build_ors_route
+
+
+def test_communes_are_deterministic():
+    assert build_communes(50) == build_communes(50)
+    assert len(build_communes(50)) > 50
+
+
+def test_ors_route_detours_between_points():
+    route = build_ors_route([[2.35, 48.85], [5.37, 43.30]])['routes'][0]
+    assert route['geometry']
+    # Détour simulé : plus long que la distance à vol d'oiseau (~660 km)
+    assert route['summary']['distance'] > 660000
+
+
+def test_stub_serves_every_upstream(stubs):
+    env = stubs.env()
+    assert requests.get(env['GEO_API_URL'], timeout=5).status_code == 200
+    records = requests.get(env['IRVE_API_URL'], params={'rows': 3}, timeout=5).json()['records']
+    assert len(records) == 3
+    route = requests.post(env['OPENROUTE_API_URL'], json={'coordinates': [[2.35, 48.85], [4.83, 45.76]]}, timeout=5)
+    assert route.status_code == 200 and route.json()['routes']
+
+
+def test_injected_errors_are_served_and_counted():
+    with StubUpstreams({'geo': StubConfig(error_rate=1.0)}, extra_communes=0) as stubs:
+        assert requests.get(stubs.env()['GEO_API_URL'], timeout=5).status_code == 503
+        assert stubs.stats['geo'] == {'requests': 1, 'errors': 1}
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_with_baseline_flags_regressions():
+    baseline = {'endpoints': {'plan-trip': {'throughput_rps': 100, 'p95_ms': 50, 'p99_ms': 80}}}
+    ok = {'endpoints': {'plan-trip': {'throughput_rps': 95, 'p95_ms': 55, 'p99_ms': 85}}}
+    slow = {'endpoints': {'plan-trip': {'throughput_rps': 70, 'p95_ms': 90, 'p99_ms': 80}}}
+    assert compare_with_baseline(ok, baseline, 0.15) == []
+    assert len(compare_with_baseline(slow, baseline, 0.15)) == 2
+
+
+@pytest.mark.parametrize('quota', [False, True])
+def test_api_quotas_disabled_unless_requested(monkeypatch, quota):
+    started = {}
+
+    def popen(command, cwd=None, env=None, **kwargs):
+        started['env'] = env
+
+    monkeypatch.setattr(load_test.subprocess, 'Popen', popen)
+    monkeypatch.setattr(load_test, '_wait_until_ready', lambda url: None)
+    monkeypatch.delenv('ORS_RATE_PER_MINUTE', raising=False)
+    load_test.start_api(5000, {}, quota=quota)
+    assert (started['env'].get('ORS_RATE_PER_MINUTE') == '0') is not quota
+
+
+def test_route_fallbacks_are_counted_by_cause(api, client, monkeypatch):
+    def quota_exceeded(*args, **kwargs):
+        raise api.QuotaExceeded('Quota ors épuisé (interactive)')
+
+    monkeypatch.setattr(api, 'upstream_json', quota_exceeded)
+    before = client.get('/api/metrics').get_json()['route_fallbacks']
+    coords = [{'lat': 48.85, 'lon': 2.35}, {'lat': 45.76, 'lon': 4.84}]
+    assert api.request_route(['paris', 'lyon'], coords) == api.waypoints_distance_haversine(coords)
+
+    after = client.get('/api/metrics').get_json()['route_fallbacks']
+    assert after['quota'] == before['quota'] + 1 and after['error'] == before['error']
+
+
+def test_harness_does_not_import_app():
+    """app.py à l'import : journalisation remplacée, base des tâches ouverte, variables lues"""
+    code = "import sys, load_test, stub_upstreams; print('app' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True, timeout=60
+    )
+    assert output.stdout.strip() == 'False'
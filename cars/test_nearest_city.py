@@ -0,0 +1,70 @@
+# test_nearest_city.py
+"""Commune la plus proche (/api/nearest-city) et départ / destination en coordonnées GPS"""
+
+import pytest
+
+PARIS = (48.8566, 2.3522)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('48.85,2.35', (48.85, 2.35)),
+    (' -20.88 , 55.45 ', (-20.88, 55.45)),
+    ({'lat': 45.76, 'lon': 4.84}, (45.76, 4.84)),
+    ([43.3, 5.37], (43.3, 5.37)),
+    ('paris', None),
+    ('Saint-Denis, Réunion', None),
+    (None, None),
+])
+def test_parse_coordinates(api, value, expected):
+    assert api.parse_coordinates(value) == expected
+
+
+@pytest.mark.parametrize('value', ['95,2.35', {'lat': 'nord', 'lon': 2}, [48.8, 200]])
+def test_invalid_coordinates_are_rejected(api, value):
+    with pytest.raises(ValueError):
+        api.parse_coordinates(value)
+
+
+def test_nearest_city_endpoint(client):
+    response = client.get('/api/nearest-city', query_string={'lat': PARIS[0], 'lon': PARIS[1], 'k': 3})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 3 and body['cities'][0]['key'] == 'paris'
+    distances = [city['distance_km'] for city in body['cities']]
+    assert distances == sorted(distances) and distances[0] < 5
+
+
+@pytest.mark.parametrize('query', [
+    {'lat': 48.85}, {'lat': 'nord', 'lon': 2.35}, {'lat': 48.85, 'lon': 2.35, 'k': 0}, {'lat': 48.85, 'lon': 2.35, 'k': 51}
+])
+def test_nearest_city_rejects_invalid_parameters(client, query):
+    assert client.get('/api/nearest-city', query_string=query).status_code == 400
+
+
+def test_plan_trip_from_gps_coordinates(client):
+    response = client.post('/api/plan-trip', json={
+        'departure': f'{PARIS[0]},{PARIS[1]}', 'destination': {'lat': 45.76, 'lon': 4.84}, 'vehicle_id': 1
+    })
+    assert response.status_code == 200
+    trip = response.get_json()['trip']
+    assert trip['departure']['city'] == 'Paris'
+    assert trip['departure']['snappedFrom']['lat'] == PARIS[0]
+    assert trip['destination']['city'] == 'Lyon'
+    assert trip['destination']['snappedFrom']['distance_km'] < 5
+
+    by_name = client.post('/api/plan-trip', json={'departure': 'paris', 'destination': 'lyon', 'vehicle_id': 1})
+    assert 'snappedFrom' not in by_name.get_json()['trip']['departure']
+
+
+def test_point_far_from_any_city_is_rejected(client):
+    # Atlantique, à plus de CITY_SNAP_MAX_KM de toute commune
+    response = client.post('/api/plan-trip', json={'departure': '45.0,-15.0', 'destination': 'lyon', 'vehicle_id': 1})
+    assert response.status_code == 400
+    assert 'Aucune commune' in response.get_json()['error']
+
+
+def test_reachable_from_gps_coordinates(client):
+    response = client.get('/api/reachable', query_string={'from': f'{PARIS[0]},{PARIS[1]}', 'vehicle_id': 1, 'limit': 3})
+    assert response.status_code == 200
+    departure = response.get_json()['from']
+    assert departure['city'] == 'Paris' and departure['snappedFrom']['lon'] == PARIS[1]
@@ -0,0 +1,51 @@
+# test_plan_trip_stream.py
+"""Planification progressive en Server-Sent Events (/api/plan-trip/stream)"""
+
+import json
+
+TRIP = {'departure': 'paris', 'destination': 'marseille', 'vehicle_id': 1}
+
+
+def parse_events(body):
+    """Liste de (événement, données JSON) d'un flux SSE"""
+    events = []
+    for message in body.decode('utf-8').split('\n\n'):
+        if message:
+            lines = dict(line.split(': ', 1) for line in message.split('\n'))
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_stream_emits_events_in_order(client):
+    response = client.post('/api/plan-trip/stream', json=TRIP)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    assert 'Content-Encoding' not in response.headers
+
+    events = parse_events(response.data)
+    names = [name for name, _ in events]
+    assert names[:2] == ['route', 'stops'] and names[-1] == 'done'
+    assert set(names[2:-1]) <= {'station'}
+
+    stops = events[1][1]
+    done = events[-1][1]
+    assert len(names) - 3 == stops['numberOfStops'] == done['trip']['numberOfStops']
+    # Bornes envoyées au fil de l'eau : les mêmes que dans la réponse finale
+    stations = sorted((data for name, data in events if name == 'station'), key=lambda s: s['stop_number'])
+    assert stations == done['trip']['chargingStations']
+
+
+def test_stream_matches_plan_trip(client):
+    streamed = parse_events(client.get('/api/plan-trip/stream', query_string=TRIP).data)[-1][1]
+    direct = client.post('/api/plan-trip', json=TRIP).get_json()
+    assert streamed['trip']['distance'] == direct['trip']['distance']
+    assert streamed['trip']['numberOfStops'] == direct['trip']['numberOfStops']
+
+
+def test_stream_reports_errors_as_events(client):
+    response = client.post('/api/plan-trip/stream', json={'departure': 'paris'})
+    assert response.status_code == 200
+    [(name, data)] = parse_events(response.data)
+    assert name == 'error' and data['status'] == 400
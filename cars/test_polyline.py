@@ -0,0 +1,90 @@
+# test_polyline.py
+"""Polylignes encodées, simplification de Douglas-Peucker et niveaux de zoom (polyline.py)"""
+
+from math import cos, radians, sin
+
+import pytest
+
+from polyline import (
+    MAX_ZOOM, decode_polyline, encode_polyline, fit_zoom, simplify_douglas_peucker, zoom_tolerance_km
+)
+
+TRIP = {'departure': 'paris', 'destination': 'marseille', 'vehicle_id': 1}
+
+
+def wiggly_line(count=2000):
+    """Paris → Marseille avec une ondulation de quelques centaines de mètres"""
+    return [
+        (48.85 - 5.55 * t + 0.003 * sin(t * 400), 2.35 + 3.02 * t + 0.003 * cos(t * 400))
+        for t in (i / (count - 1) for i in range(count))
+    ]
+
+
+def distance_to_line_km(point, line):
+    """Distance (km, projection équirectangulaire) d'un point à une polyligne"""
+    scale = cos(radians(point[0]))
+
+    def xy(p):
+        return (p[1] - point[1]) * 111.32 * scale, (p[0] - point[0]) * 110.57
+
+    best = float('inf')
+    for a, b in zip(line, line[1:]):
+        (ax, ay), (bx, by) = xy(a), xy(b)
+        dx, dy = bx - ax, by - ay
+        t = min(1.0, max(0.0, -(ax * dx + ay * dy) / (dx * dx + dy * dy or 1)))
+        best = min(best, ((ax + t * dx) ** 2 + (ay + t * dy) ** 2) ** 0.5)
+    return best
+
+
+def test_encode_matches_reference():
+    # Exemple de la documentation du format
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    assert decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@') == points
+
+
+def test_round_trip_keeps_five_decimals():
+    points = wiggly_line(50)
+    decoded = decode_polyline(encode_polyline(points))
+    assert len(decoded) == len(points)
+    assert all(abs(a - b) <= 0.5e-5 for p, q in zip(points, decoded) for a, b in zip(p, q))
+
+
+def test_simplify_keeps_ends_and_stays_within_tolerance():
+    points = wiggly_line()
+    simplified = simplify_douglas_peucker(points, 1.0)
+    assert simplified[0] == points[0] and simplified[-1] == points[-1]
+    assert len(simplified) < len(points) / 10
+    # Tout point supprimé reste à moins d'une tolérance du tracé simplifié (à
+    # l'écart près entre projection locale ici et à la latitude moyenne là-bas)
+    assert max(distance_to_line_km(point, simplified) for point in points[::10]) <= 1.1
+
+    assert simplify_douglas_peucker(points, 0) == points
+    assert len(simplify_douglas_peucker(points, 0.01)) > len(simplified)
+
+
+def test_simplify_short_lines_unchanged():
+    assert simplify_douglas_peucker([(45.0, 5.0), (46.0, 6.0)], 10) == [(45.0, 5.0), (46.0, 6.0)]
+    # Boucle fermée : extrémités confondues
+    loop = [(45.0, 5.0), (45.1, 5.0), (45.1, 5.1), (45.0, 5.0)]
+    assert simplify_douglas_peucker(loop, 0.1) == loop
+
+
+def test_zoom_tolerance_halves_per_level():
+    assert zoom_tolerance_km(10, 0) == pytest.approx(0.1529, abs=1e-3)
+    assert zoom_tolerance_km(11, 45) == pytest.approx(zoom_tolerance_km(10, 45) / 2)
+    assert zoom_tolerance_km(10, 60) == pytest.approx(zoom_tolerance_km(10, 0) * cos(radians(60)))
+
+
+def test_fit_zoom():
+    assert 4 <= fit_zoom(wiggly_line()) <= 7
+    assert fit_zoom([(45.0, 5.0), (45.0, 5.0)]) == MAX_ZOOM
+
+
+def test_plan_trip_route_is_simplified_for_zoom(client):
+    coarse = client.post('/api/plan-trip', json=dict(TRIP, zoom=5)).get_json()
+    fine = client.post('/api/plan-trip', json=dict(TRIP, zoom=12)).get_json()
+    assert coarse['trip']['routeZoom'] == 5 and fine['trip']['routeZoom'] == 12
+    assert len(decode_polyline(coarse['trip']['route'])) < len(decode_polyline(fine['trip']['route']))
+
+    assert client.post('/api/plan-trip', json=dict(TRIP, zoom='loin')).status_code == 400
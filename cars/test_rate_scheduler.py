@@ -0,0 +1,137 @@
+# test_rate_scheduler.py
+"""Ordonnanceur des appels sous quotas (rate_scheduler.py) et son usage par upstream_json"""
+
+import threading
+import time
+
+import pytest
+
+from rate_scheduler import QuotaExceeded, RateScheduler, UpstreamQuota
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_unlimited_quota_never_waits():
+    quota = UpstreamQuota('ors', clock=FakeClock())
+    assert all(quota.acquire() == 0 for _ in range(100))
+    assert RateScheduler().acquire('inconnue') == 0.0
+
+
+def test_minute_bucket_refills_continuously():
+    clock = FakeClock()
+    quota = UpstreamQuota('ors', per_minute=2, reserve=0, clock=clock)
+    quota.acquire()
+    quota.acquire()
+    with pytest.raises(QuotaExceeded):
+        quota.acquire(max_wait=0)
+
+    clock.now += 30  # un jeton rechargé
+    assert quota.acquire(max_wait=0) == 0
+    assert quota.stats()['rejected']['interactive'] == 1
+
+
+def test_background_priorities_leave_the_reserve():
+    clock = FakeClock()
+    quota = UpstreamQuota('ors', per_minute=10, reserve=0.2, clock=clock)
+    for _ in range(8):
+        quota.acquire('batch', max_wait=0)
+    with pytest.raises(QuotaExceeded):
+        quota.acquire('warmup', max_wait=0)
+    # Réserve de 2 jetons pour l'interactif
+    quota.acquire('interactive', max_wait=0)
+    quota.acquire('interactive', max_wait=0)
+    assert quota.stats()['granted'] == {'interactive': 2, 'batch': 8, 'warmup': 0}
+
+
+def test_daily_quota_resets_at_utc_midnight():
+    clock = FakeClock(86400 * 100 + 3600)
+    quota = UpstreamQuota('ors', per_day=1, reserve=0, clock=clock)
+    quota.acquire()
+    with pytest.raises(QuotaExceeded):
+        quota.acquire(max_wait=10)
+
+    clock.now = 86400 * 101
+    assert quota.acquire(max_wait=0) == 0
+
+
+def test_exhaust_empties_the_bucket():
+    quota = UpstreamQuota('ors', per_minute=60, reserve=0)
+    quota.exhaust()
+    with pytest.raises(QuotaExceeded):
+        quota.acquire(max_wait=0.1)
+
+
+def test_interactive_call_is_served_before_waiting_batch():
+    quota = UpstreamQuota('ors', per_minute=60, reserve=0)
+    quota.tokens = 0.0
+    order = []
+
+    def call(priority):
+        quota.acquire(priority, max_wait=5)
+        order.append(priority)
+
+    batch = threading.Thread(target=call, args=('batch',))
+    batch.start()
+    time.sleep(0.1)
+    interactive = threading.Thread(target=call, args=('interactive',))
+    interactive.start()
+    batch.join()
+    interactive.join()
+    assert order == ['interactive', 'batch']
+
+
+def test_interactive_call_does_not_join_background_flight(api, monkeypatch):
+    """Même URL : l'appel interactif n'attend pas l'appel de fond bloqué par le quota"""
+    release, calls = threading.Event(), []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {'ok': True}
+
+    def request(method, url, **kwargs):
+        calls.append(threading.current_thread().name)
+        if threading.current_thread().name == 'warmup':
+            release.wait(5)
+        return Response()
+
+    monkeypatch.setattr(api.requests, 'request', request)
+    url = 'http://upstream.invalid/route'
+    warmup = threading.Thread(
+        target=api.upstream_json, args=('ors', 'GET', url), kwargs={'priority': 'warmup'}, name='warmup'
+    )
+    warmup.start()
+    while not calls:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    assert api.upstream_json('ors', 'GET', url) == (200, {'ok': True})
+    assert time.monotonic() - started < 1
+    assert len(calls) == 2
+
+    release.set()
+    warmup.join()
+
+
+def test_chargetrip_calls_carry_caller_priority(api, client, monkeypatch):
+    priorities = []
+
+    def acquire(upstream, priority='interactive', max_wait=None):
+        priorities.append((upstream, priority))
+        return 0.0
+
+    monkeypatch.setattr(api.rate_scheduler, 'acquire', acquire)
+    monkeypatch.setattr(api, 'vehicles_cache', {})
+    api.warm_up()
+    assert priorities == [('chargetrip', 'warmup')]
+
+    api.vehicles_cache.clear()
+    assert client.get('/api/vehicles').status_code == 200
+    assert priorities[1:] == [('chargetrip', 'interactive')]
@@ -0,0 +1,47 @@
+# test_reachable.py
+"""Villes atteignables (compute_reachable, /api/reachable)"""
+
+import numpy as np
+
+from ttl_cache import MISS
+
+VEHICLE = {'id': 'test', 'autonomy': 340, 'battery': 50, 'chargeTime': 0.8}
+
+
+def test_cities_are_reachable_and_sorted(api):
+    result = api.compute_reachable('paris', VEHICLE)
+    distances = [city['road_distance_km'] for city in result['cities']]
+    assert distances and distances == sorted(distances)
+    assert max(distances) <= result['reach_km']
+    assert 'paris' not in [city['key'] for city in result['cities']]
+
+
+def test_unreachable_boundary_cities_do_not_take_the_limit(api, monkeypatch):
+    """Les villes écartées par la distance routière ne réduisent pas le nombre de villes renvoyées"""
+    store = api.fetch_city_store()
+    start = store['paris']
+    reach_km = VEHICLE['autonomy'] * api.SAFETY_MARGIN
+    crow = store.distances_km(start['lat'], start['lon'])
+    sure = int(np.count_nonzero(crow * api.REACHABLE_DETOUR_MAX <= reach_km)) - 1  # sans Paris
+
+    monkeypatch.setattr(api, 'known_road_distance', lambda origin, destination: MISS)
+
+    def fetch_road_distances(origin, coords, destinations, priority='interactive'):
+        # Les trois villes vérifiées les plus proches : non routables ; les autres à portée
+        return {key: None if n < 3 else reach_km - 1 for n, (key, _) in enumerate(destinations)}
+
+    monkeypatch.setattr(api, 'fetch_road_distances', fetch_road_distances)
+    limit = sure + 3
+    result = api.compute_reachable('paris', VEHICLE, limit=limit)
+
+    assert len(result['cities']) == limit and result['truncated']
+    assert all(city['road_distance_km'] <= result['reach_km'] for city in result['cities'])
+
+
+def test_reachable_endpoint(client):
+    response = client.get('/api/reachable?from=lyon&vehicle_id=1&limit=5')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['cities']) <= 5
+
+    assert client.get('/api/reachable?from=lyon&vehicle_id=1&limit=0').status_code == 400
@@ -0,0 +1,78 @@
+# test_response_encoding.py
+"""Encodage des réponses (response_encoding.py) : JSON orjson, compression gzip / brotli"""
+
+import gzip
+import json
+
+import brotli
+import numpy as np
+import pytest
+from flask import Flask, Response, jsonify
+
+from response_encoding import init_response_encoding
+
+BIG = {'cities': [{'name': 'Saint-Étienne', 'lat': 45.43, 'lon': 4.39}] * 100}
+
+
+@pytest.fixture(scope='module')
+def small_app():
+    app = Flask(__name__)
+    init_response_encoding(app, min_size=100)
+
+    @app.route('/big')
+    def big():
+        return jsonify(BIG)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/numbers')
+    def numbers():
+        return jsonify({'values': np.array([1.5, 2.25]), 'nan': float('nan'), 1: 'clé entière'})
+
+    @app.route('/binary')
+    def binary():
+        return Response(b'\0' * 1000, mimetype='application/octet-stream')
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('br', 'br'),
+    ('gzip', 'gzip'),
+    ('gzip;q=0.5, br;q=1', 'br'),
+    ('br;q=0.1, gzip', 'gzip'),
+])
+def test_compression_follows_accept_encoding(small_app, accept, encoding):
+    response = small_app.get('/big', headers={'Accept-Encoding': accept})
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    decompress = brotli.decompress if encoding == 'br' else gzip.decompress
+    assert json.loads(decompress(response.data)) == BIG
+
+
+def test_no_compression_without_accept_encoding(small_app):
+    response = small_app.get('/big', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.get_json() == BIG
+
+
+def test_small_and_binary_responses_are_not_compressed(small_app):
+    assert 'Content-Encoding' not in small_app.get('/small', headers={'Accept-Encoding': 'br'}).headers
+    assert 'Content-Encoding' not in small_app.get('/binary', headers={'Accept-Encoding': 'br'}).headers
+
+
+def test_orjson_provider(small_app):
+    body = small_app.get('/numbers').data
+    assert json.loads(body) == {'values': [1.5, 2.25], 'nan': None, '1': 'clé entière'}
+    # UTF-8 brut, sans échappement \uXXXX
+    assert 'Saint-Étienne'.encode() in small_app.get('/big', headers={'Accept-Encoding': 'identity'}).data
+
+
+def test_api_responses_are_compressed(client):
+    response = client.get('/api/cities', headers={'Accept-Encoding': 'br'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data))
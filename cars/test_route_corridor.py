@@ -0,0 +1,80 @@
+# test_route_corridor.py
+"""Corridor d'itinéraire (route_corridor.py) et requête IRVE paginée sur son polygone"""
+
+import numpy as np
+import pytest
+
+from fallback_data import CITIES_COORDINATES
+from polyline import decode_polyline
+from route_corridor import RouteCorridor
+from stub_upstreams import _inside_polygon, build_ors_route
+
+PAIRS = [('paris', 'marseille'), ('lille', 'lyon'), ('bordeaux', 'strasbourg'), ('nantes', 'nice')]
+
+
+def route_between(departure, destination):
+    a, b = CITIES_COORDINATES[departure], CITIES_COORDINATES[destination]
+    route = build_ors_route([[a['lon'], a['lat']], [b['lon'], b['lat']]])
+    return decode_polyline(route['routes'][0]['geometry'])
+
+
+@pytest.mark.parametrize('departure, destination', PAIRS)
+@pytest.mark.parametrize('buffer_km', [2, 5, 20])
+def test_polygon_contains_every_route_point(departure, destination, buffer_km):
+    points = route_between(departure, destination)
+    polygon = RouteCorridor(points, buffer_km).polygon()
+    outside = [i for i, (lat, lon) in enumerate(points) if not _inside_polygon(lat, lon, polygon)]
+    assert outside == []
+
+
+def test_polygon_covers_a_point_just_before_departure():
+    points = route_between('paris', 'marseille')
+    corridor = RouteCorridor(points, 5)
+    # 3 km en amont du départ, dans le prolongement du premier segment
+    (lat0, lon0), (lat1, lon1) = points[0], points[1]
+    step = 3 / (np.hypot((lat1 - lat0) * 110.57, (lon1 - lon0) * corridor.scale) or 1)
+    before = (lat0 - (lat1 - lat0) * step, lon0 - (lon1 - lon0) * step)
+    assert _inside_polygon(*before, corridor.polygon())
+
+
+def test_locate_matches_brute_force():
+    points = route_between('lille', 'lyon')
+    corridor = RouteCorridor(points, 5)
+    rng = np.random.default_rng(3)
+    lats = rng.uniform(45.5, 50.8, 300)
+    lons = rng.uniform(2.5, 5.0, 300)
+    distance, _ = corridor.locate(lats, lons)
+
+    x, y = corridor._project(lats, lons)
+    for k in np.flatnonzero(np.isfinite(distance)):
+        px, py = x[k] - corridor.ax, y[k] - corridor.ay
+        t = np.clip((px * corridor.dx + py * corridor.dy) / np.where(corridor.length_sq > 0, corridor.length_sq, 1), 0, 1)
+        expected = np.hypot(px - t * corridor.dx, py - t * corridor.dy).min()
+        if expected <= corridor.buffer_km:
+            assert distance[k] == pytest.approx(expected)
+    # Points hors de la grille : au-delà du tampon
+    assert np.all(np.isinf(distance) | (distance >= 0))
+
+
+def test_points_at_ends_of_route():
+    points = route_between('paris', 'marseille')
+    start, end = RouteCorridor(points, 5).points_at([0, 1])
+    assert start == pytest.approx(points[0], abs=1e-6)
+    assert end == pytest.approx(points[-1], abs=1e-6)
+
+
+def test_polygon_records_are_paginated(api):
+    points = route_between('paris', 'marseille')
+    polygon = RouteCorridor(points, 5).polygon()
+    everything, truncated = api.fetch_irve_polygon_records(polygon, rows=100, max_records=100000)
+    assert not truncated and len(everything) > 100
+    assert len({r['recordid'] for r in everything}) == len(everything)
+
+    partial, truncated = api.fetch_irve_polygon_records(polygon, rows=100, max_records=250)
+    assert truncated and len(partial) == 250
+
+
+def test_corridor_endpoint_reports_truncation(client):
+    response = client.get('/api/corridor-stations?departure=paris&destination=lyon&buffer_km=5')
+    assert response.status_code == 200
+    assert response.get_json()['truncated'] is False
@@ -0,0 +1,105 @@
+# test_single_flight.py
+"""Coalescence des appels identiques (single_flight.py), dans un processus et entre workers"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+CALLERS = 8
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def concurrent_calls(flight, fn, key='clé'):
+    """Lance CALLERS appels de la même clé ; fn ne rend la main qu'une fois tous en attente"""
+    def call(_):
+        try:
+            return flight.do(key, fn)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        return list(executor.map(call, range(CALLERS)))
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+
+    def fetch():
+        wait_until(lambda: flight.stats()['coalesced'] == CALLERS - 1)
+        return {'villes': 35000}
+
+    results = concurrent_calls(flight, fetch)
+    assert all(result is results[0] for result in results)
+    stats = flight.stats()
+    assert stats['executed'] == 1 and stats['saved'] == CALLERS - 1 and stats['in_flight'] == 0
+
+
+def test_error_is_shared_by_waiting_callers():
+    flight = SingleFlight()
+
+    def fail():
+        wait_until(lambda: flight.stats()['coalesced'] == CALLERS - 1)
+        raise TimeoutError('amont indisponible')
+
+    results = concurrent_calls(flight, fail)
+    assert all(isinstance(result, TimeoutError) for result in results)
+    assert flight.stats()['errors'] == 1
+
+    # L'erreur n'est pas mémorisée : l'appel suivant est réexécuté
+    assert flight.do('clé', lambda: 'ok') == 'ok'
+
+
+def test_sequential_and_distinct_keys_run_separately():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda: key) for key in ('a', 'b', 'a')] == ['a', 'b', 'a']
+    assert flight.stats()['executed'] == 3
+
+
+def test_result_is_shared_across_workers(tmp_path):
+    # Deux instances sur le même répertoire : deux workers gunicorn
+    first, second = SingleFlight(shared_dir=str(tmp_path)), SingleFlight(shared_dir=str(tmp_path))
+    key = ('irve', 'GET', 'https://example.org', (('lat', 45.0),), None, 'interactive')
+    assert first.do(key, lambda: [200, {'total_count': 3}]) == [200, {'total_count': 3}]
+    assert second.do(key, lambda: pytest.fail('appel déjà fait par l\'autre worker')) == [200, {'total_count': 3}]
+    assert second.stats()['shared_across_workers'] == 1
+
+    # Résultat trop ancien : réexécuté
+    for name in os.listdir(tmp_path):
+        old = time.time() - 60
+        os.utime(tmp_path / name, (old, old))
+    assert second.do(key, lambda: 'frais') == 'frais'
+
+
+def test_unserializable_result_stays_in_process(tmp_path):
+    first, second = SingleFlight(shared_dir=str(tmp_path)), SingleFlight(shared_dir=str(tmp_path))
+    assert first.do('clé', lambda: {1, 2}) == {1, 2}
+    assert second.do('clé', lambda: 'recalculé') == 'recalculé'
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_cross_worker_lock_serializes_calls(tmp_path):
+    flights = [SingleFlight(shared_dir=str(tmp_path)) for _ in range(4)]
+    executed = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            executed.append(1)
+        time.sleep(0.05)
+        return 'résultat'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda flight: flight.do('clé', fetch), flights))
+    assert results == ['résultat'] * 4
+    assert len(executed) == 1
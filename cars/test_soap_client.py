@@ -0,0 +1,51 @@
+# test_soap_client.py
+"""Client SOAP asynchrone (soap_client.py) : appels groupés et cache du WSDL"""
+
+import asyncio
+
+import pytest
+
+import soap_client
+from soap_client import AsyncTravelTimeClient
+from trip_table import compute_stops
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_gather_travel_times_matches_formula(soap_url):
+    trips = [(100.0, 300.0, 0.5), (650.0, 300.0, 0.5), (1000.0, 450.0, 0.75)]
+
+    async def run():
+        async with AsyncTravelTimeClient(f'{soap_url}/?wsdl') as client:
+            return await client.gather_travel_times(trips), await client.gather_number_of_stops(
+                [(distance, autonomy) for distance, autonomy, _ in trips]
+            )
+
+    times, stops = asyncio.run(run())
+    for (distance, autonomy, charge_time), total, count in zip(trips, times, stops):
+        expected_stops, expected_time = compute_stops(distance, [autonomy], [charge_time])
+        assert count == int(expected_stops[0])
+        assert total == pytest.approx(float(expected_time[0]), abs=0.01)
+
+
+def test_wsdl_document_honours_cache_timeout(soap_url, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(soap_client.time, 'monotonic', clock)
+    monkeypatch.setattr(AsyncTravelTimeClient, '_documents', {})
+    wsdl_url = f'{soap_url}/?wsdl'
+
+    async def document(timeout):
+        async with AsyncTravelTimeClient(wsdl_url, wsdl_cache_timeout=timeout) as client:
+            return client.client.wsdl
+
+    first = asyncio.run(document(60))
+    assert asyncio.run(document(60)) is first
+
+    clock.now += 61
+    assert asyncio.run(document(60)) is not first
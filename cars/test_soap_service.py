@@ -0,0 +1,78 @@
+# test_soap_service.py
+"""Service SOAP (soap_service.py) : serveurs concurrents avec keep-alive, endpoint JSON /json"""
+
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from bench_soap_server import ENVELOPE, start_server
+from load_test import _free_port
+
+VEHICLE = {'autonomy': 395, 'chargeTime': 0.75}
+SOAP_HEADERS = {'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': 'calculate_travel_time'}
+
+
+@pytest.mark.parametrize('server', ['threaded', 'gunicorn'])
+def test_server_handles_concurrent_keep_alive_calls(server):
+    port = _free_port()
+    process = start_server(server, port, workers=2, threads=4)
+    try:
+        url = f'http://127.0.0.1:{port}/'
+
+        def calls(_):
+            # Une session par thread : connexion réutilisée entre les appels
+            with requests.Session() as session:
+                return [session.post(url, data=ENVELOPE, headers=SOAP_HEADERS, timeout=10) for _ in range(10)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = [r for batch in executor.map(calls, range(8)) for r in batch]
+
+        assert all(r.status_code == 200 for r in responses)
+        # 775 km, 395 km d'autonomie, 0,75 h par arrêt : 2 arrêts
+        assert all('calculate_travel_timeResult>10.11' in r.text for r in responses)
+        assert responses[-1].headers.get('Connection', '').lower() != 'close'
+    finally:
+        process.send_signal(signal.SIGTERM)
+        # Arrêt gracieux sur SIGTERM
+        assert process.wait(timeout=30) == 0
+
+
+@pytest.mark.parametrize('method, params', [
+    ('calculate_travel_time', {'distance': 775, 'autonomy': 395, 'charge_time': 0.75}),
+    ('calculate_number_of_stops', {'distance': 775, 'autonomy': 395}),
+    ('calculate_driving_time', {'distance': 180, 'average_speed': 90}),
+    ('calculate_charge_time', {'distance': 775, 'autonomy': 395, 'charge_time_per_stop': 0.75}),
+])
+def test_json_endpoint_matches_soap(soap_url, method, params):
+    from zeep import Client
+
+    response = requests.get(f'{soap_url}/json/{method}', params=params, timeout=10)
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('application/json')
+    expected = getattr(Client(f'{soap_url}/?wsdl').service, method)(**params)
+    assert response.json() == pytest.approx(expected)
+
+
+def test_json_endpoint_rejects_invalid_parameters(soap_url):
+    response = requests.get(f'{soap_url}/json/calculate_travel_time?distance=abc&autonomy=395&charge_time=0.75',
+                            timeout=10)
+    assert response.status_code == 400
+    assert response.json()['faultcode'] == 'Client.ValidationError'
+
+
+def test_app_calls_json_endpoint(api, soap_url, monkeypatch):
+    monkeypatch.setattr(api, 'SOAP_PROTOCOL', 'json')
+    monkeypatch.setattr(api, 'SOAP_JSON_URL', f'{soap_url}/json')
+    total_time = api.call_travel_service('calculate_travel_time', distance=775, autonomy=395, charge_time=0.75)
+    assert total_time == pytest.approx(10.11, abs=0.01)
+
+    num_stops, total_time = api.calculate_stops_and_time(775, VEHICLE)
+    assert (num_stops, total_time) == pytest.approx(api.local_stops_and_time(775, VEHICLE))
+
+
+def test_app_falls_back_to_local_formula(api, monkeypatch):
+    monkeypatch.setattr(api, 'SOAP_PROTOCOL', 'json')
+    monkeypatch.setattr(api, 'SOAP_JSON_URL', f'http://127.0.0.1:{_free_port()}/json')
+    assert api.calculate_stops_and_time(775, VEHICLE) == api.local_stops_and_time(775, VEHICLE)
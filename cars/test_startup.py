@@ -0,0 +1,61 @@
+# test_startup.py
+"""Démarrage de l'API : sonde /api/ready, préchargement gunicorn, import différé de zeep"""
+
+import os
+import runpy
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from load_test import _free_port
+
+CARS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_ready_when_catalogs_loaded_and_travel_service_up(client, api, soap_url, monkeypatch):
+    monkeypatch.setattr(api, 'SOAP_SERVICE_URL', f'{soap_url}/?wsdl')
+    # Sans préchargement : catalogues chargés à la première sonde
+    monkeypatch.setattr(api, 'warmed_up', threading.Event())
+
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['ready'] and body['checks'] == {'catalogs': True, 'travel_service': True}
+    assert api.warmed_up.is_set()
+
+
+def test_not_ready_without_travel_service(client, api, monkeypatch):
+    monkeypatch.setattr(api, 'SOAP_SERVICE_URL', f'http://127.0.0.1:{_free_port()}/?wsdl')
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.get_json()['checks']['travel_service'] is False
+
+
+@pytest.mark.parametrize('preload, expected', [('1', True), ('0', False)])
+def test_gunicorn_preload_setting(monkeypatch, preload, expected):
+    monkeypatch.setenv('GUNICORN_PRELOAD', preload)
+    monkeypatch.setenv('APP_PRELOAD', '0')
+    monkeypatch.delenv('RATE_LIMIT_WORKERS', raising=False)
+    config = runpy.run_path(os.path.join(CARS_DIR, 'gunicorn.conf.py'))
+    assert config['preload_app'] is expected
+    # En preload, app.py ne lance pas de thread de fond dans le maître
+    assert (os.environ['APP_PRELOAD'] == '1') is expected
+
+
+def test_gunicorn_workers_share_api_quotas(monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    monkeypatch.delenv('RATE_LIMIT_WORKERS', raising=False)
+    config = runpy.run_path(os.path.join(CARS_DIR, 'gunicorn.conf.py'))
+    # app.py divise les quotas par le nombre de workers réellement lancés
+    assert os.environ['RATE_LIMIT_WORKERS'] == str(config['workers']) == '3'
+
+
+def test_zeep_is_imported_only_for_soap_protocol():
+    code = "import sys, app; print('zeep' in sys.modules)"
+    env = dict(os.environ, SOAP_PROTOCOL='json', APP_PRELOAD='1', JOB_STORE='memory', TRIP_TABLE_MODE='off')
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=CARS_DIR, env=env, capture_output=True, text=True, check=True, timeout=60
+    ).stdout
+    assert output.strip().splitlines()[-1] == 'False'
@@ -0,0 +1,159 @@
+# test_station_index.py
+"""Index des bornes (station_index.py) et filtres de bornes des routes"""
+
+import random
+from math import nan
+
+import pytest
+
+from charging_planner import parse_power_kw
+from station_index import StationIndex, _distance_km, parse_connectors
+
+
+def make_station(n, lat, lon, power, connector='T2'):
+    return {'id': f'st-{n}', 'name': f'Borne {n}', 'lat': lat, 'lon': lon, 'power': power, 'connector_type': connector}
+
+
+@pytest.fixture(scope='module')
+def stations():
+    rng = random.Random(7)
+    return [
+        make_station(
+            n, rng.uniform(43, 50), rng.uniform(-1, 7), rng.choice([3.7, 7.4, 22, 50, 100, 150, 350, 'N/A']),
+            rng.choice(['T2', 'T2 - COMBO', 'CHADEMO - COMBO CCS', 'EF - T2', 'Type 3'])
+        )
+        for n in range(3000)
+    ]
+
+
+def brute_force(stations, lat, lon, radius_km, min_power, connector):
+    matches = []
+    for station in stations:
+        power = parse_power_kw(station['power'])
+        if min_power and (power is None or power < min_power):
+            continue
+        if connector and connector not in parse_connectors(station['connector_type']):
+            continue
+        distance = _distance_km(lat, lon, station['lat'], station['lon'])
+        if distance <= radius_km:
+            matches.append((distance, station['id']))
+    return sorted(matches)
+
+
+@pytest.mark.parametrize('min_power, connector', [(None, None), (50, None), (60, 'ccs'), (None, 'chademo'), (22, 'type2')])
+def test_query_matches_brute_force(stations, min_power, connector):
+    index = StationIndex()
+    for station in stations:
+        index.add(station)
+
+    for lat, lon in [(48.85, 2.35), (45.76, 4.83), (43.6, 1.44), (47.2, -0.5)]:
+        found = [(round(d, 9), s['id']) for d, s in index.query(lat, lon, 40, min_power, connector, limit=1000)]
+        expected = [(round(d, 9), i) for d, i in brute_force(stations, lat, lon, 40, min_power, connector)]
+        assert found == expected
+
+
+def test_parse_connectors():
+    assert parse_connectors('T2 - CHADEMO - COMBO') == {'type2', 'chademo', 'ccs'}
+    assert parse_connectors('Domestique E/F') == {'ef'}
+    assert parse_connectors(None) == set()
+
+
+def test_duplicate_ids_are_indexed_once():
+    index = StationIndex()
+    row = index.add(make_station(1, 48.8, 2.3, 22))
+    assert index.add(make_station(1, 45.0, 5.0, 50)) == row
+    assert len(index) == 1
+
+
+def test_cells_hold_row_lists():
+    index = StationIndex()
+    for n in range(50):
+        index.add(make_station(n, 48.85 + n * 0.001, 2.35, 22))
+    # Une seule cellule de 0,1° : une liste de lignes, pas un bitmap dimensionné par la ligne globale
+    assert list(index.cells.values()) == [list(range(50))]
+
+
+def test_index_is_capped_and_keeps_recent_stations():
+    index = StationIndex(max_stations=100)
+    for n in range(250):
+        index.add(make_station(n, 48.85, 2.35 + n * 0.0001, 50))
+
+    assert len(index) <= 100 and index.evicted >= 150
+    assert 'st-249' in index.rows and 'st-0' not in index.rows
+    assert all(bound.bit_length() <= 100 for bound in index.at_least)
+    assert index.nearest(48.85, 2.35 + 249 * 0.0001, 1, min_power=50)['id'] == 'st-249'
+
+
+@pytest.mark.parametrize('min_power', [-5, nan, 0])
+def test_degenerate_power_filter_does_not_raise(min_power):
+    index = StationIndex()
+    index.add(make_station(1, 48.85, 2.35, 22))
+    index.query(48.85, 2.35, 10, min_power=min_power)
+
+
+@pytest.mark.parametrize('value', ['nan', '-10', 'inf', 'abc'])
+def test_invalid_min_power_is_rejected(client, value):
+    response = client.get(f'/api/corridor-stations?departure=paris&destination=lyon&min_power={value}')
+    assert response.status_code == 400
+
+    response = client.post('/api/plan-trip', json={
+        'departure': 'paris', 'destination': 'lyon', 'vehicle_id': 1, 'min_power': value
+    })
+    assert response.status_code == 400
+
+
+def test_parse_station_filters(api):
+    assert api.parse_station_filters({'min_power': '50', 'connector': 'ccs'}) == (50.0, 'ccs')
+    assert api.parse_station_filters({}) == (None, None)
+    with pytest.raises(ValueError):
+        api.parse_station_filters({'connector': 'inconnu'})
+
+
+@pytest.fixture
+def irve_pages(api, monkeypatch):
+    """Faux IRVE par pages : total bornes 7,4 kW T2 au nord du point, la borne match en 150 kW CCS"""
+    monkeypatch.setattr(api, 'station_index', StationIndex())
+    monkeypatch.setattr(api, 'STATION_QUERY_ROWS', 20)
+    api.nearest_station_cache.clear()
+    api.negative_cache.clear()
+    starts = []
+
+    def setup(total, match=None):
+        def fetch_irve_records(lat, lon, radius_km=20, rows=5, start=0):
+            starts.append(start)
+            return [{
+                'recordid': f'irve-{n}',
+                'fields': {
+                    'puiss_max': 150 if n == match else 7.4,
+                    'type_prise': 'Combo CCS' if n == match else 'T2',
+                    'coordonneesxy': [lat + n * 0.001, lon]
+                }
+            } for n in range(start, min(start + rows, total))]
+
+        monkeypatch.setattr(api, 'fetch_irve_records', fetch_irve_records)
+        return starts
+
+    return setup
+
+
+def test_filtered_search_pages_until_a_match(api, irve_pages):
+    starts = irve_pages(total=100, match=30)
+    station = api.find_nearest_charging_station(1.5, 1.5, min_power=50, connector='ccs')
+    assert station['id'] == 'irve-30' and starts == [0, 20]
+
+
+def test_no_match_in_radius_is_cached_without_claiming_a_power(api, irve_pages):
+    starts = irve_pages(total=30)
+    station = api.find_nearest_charging_station(1.5, 1.5, min_power=50)
+    assert starts == [0, 20]
+    assert station['power'] == 'N/A' and 'CCS' not in station['connector_type']
+    assert api.negative_cache.known('station', api.nearest_cache_key(1.5, 1.5, 20, 50, None))
+    assert api.build_fallback_station(1.5, 1.5)['power'] == '50 kW'
+
+
+def test_search_stopped_by_the_page_limit_is_not_cached(api, irve_pages, monkeypatch):
+    monkeypatch.setattr(api, 'STATION_QUERY_MAX_RECORDS', 40)
+    starts = irve_pages(total=1000)
+    assert api.find_nearest_charging_station(1.5, 1.5, min_power=50)['id'].startswith('fallback_')
+    assert starts == [0, 20]
+    assert not api.negative_cache.known('station', api.nearest_cache_key(1.5, 1.5, 20, 50, None))
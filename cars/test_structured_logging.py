@@ -0,0 +1,117 @@
+# test_structured_logging.py
+"""Journalisation structurée (structured_logging.py) : JSON, échantillonnage, file non bloquante"""
+
+import io
+import json
+import logging
+import os
+import queue
+
+import pytest
+
+import structured_logging
+from structured_logging import LoggingSetup, NonBlockingQueueHandler, SamplingFilter, configure_logging, sampled
+
+LOGGER = 'test_structured_logging'
+
+
+@pytest.fixture
+def setup_logging():
+    """LoggingSetup vers un flux en mémoire ; handlers du logger racine restaurés ensuite"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    setups = []
+
+    def make(**kwargs):
+        stream = io.StringIO()
+        setup = LoggingSetup('test', stream=stream, **kwargs)
+        setups.append(setup)
+        return setup, stream
+
+    yield make
+    for setup in setups:
+        setup.stop()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def lines(setup, stream):
+    setup.stop()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def record(level=logging.INFO, **extra):
+    entry = logging.LogRecord(LOGGER, level, __file__, 1, 'message', (), None)
+    entry.__dict__.update(extra)
+    return entry
+
+
+def test_sampling_keeps_warnings_and_unsampled_records():
+    sampling = SamplingFilter(rate=0.0)
+    assert not sampling.filter(record(**sampled(event='route')))
+    assert sampling.filter(record())
+    assert sampling.filter(record(logging.WARNING, **sampled(event='route')))
+    assert sampling.dropped == 1
+    assert SamplingFilter(rate=1.0).filter(record(**sampled()))
+
+
+def test_json_lines_carry_extra_fields(setup_logging):
+    setup, stream = setup_logging()
+    logging.getLogger(LOGGER).info("✅ Distance %s: %.0f km", 'paris-lyon', 465.2,
+                                   extra=sampled(event='route', distance_km=465.2))
+    [entry] = lines(setup, stream)
+    assert entry['message'] == '✅ Distance paris-lyon: 465 km'
+    assert entry['level'] == 'INFO' and entry['logger'] == LOGGER
+    assert entry['service'] == 'test' and entry['pid'] == os.getpid()
+    assert entry['event'] == 'route' and entry['distance_km'] == 465.2
+    assert 'sampled' not in entry and 'time' in entry
+
+
+def test_builtin_json_formatter_with_exception(setup_logging, monkeypatch):
+    monkeypatch.setattr(structured_logging, 'jsonlogger', None)
+    setup, stream = setup_logging()
+    try:
+        raise ValueError('Coordonnées invalides')
+    except ValueError:
+        logging.getLogger(LOGGER).exception("Erreur plan_trip", extra={'trip': ('paris', 'lyon')})
+    [entry] = lines(setup, stream)
+    assert entry['level'] == 'ERROR' and entry['trip'] == ['paris', 'lyon']
+    assert 'ValueError: Coordonnées invalides' in entry['exc_info']
+
+
+def test_sampled_out_records_are_counted(setup_logging):
+    setup, stream = setup_logging(sample_rate=0.0)
+    logger = logging.getLogger(LOGGER)
+    for _ in range(5):
+        logger.info("succès", extra=sampled(event='trip'))
+    logger.warning("quota épuisé")
+    assert [entry['message'] for entry in lines(setup, stream)] == ['quota épuisé']
+    assert setup.stats()['sampled_out'] == 5
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    for _ in range(3):
+        handler.emit(record())
+    assert handler.dropped == 2 and handler.queue.qsize() == 1
+
+
+def test_text_format(setup_logging):
+    setup, stream = setup_logging(fmt='text')
+    logging.getLogger(LOGGER).warning("⚠️  OpenRoute: fallback Haversine")
+    setup.stop()
+    assert stream.getvalue() == f'WARNING:{LOGGER}:⚠️  OpenRoute: fallback Haversine\n'
+
+
+def test_after_fork_restarts_writer_with_new_queue(setup_logging):
+    setup, stream = setup_logging()
+    setup.stop()
+    old_queue = setup.handler.queue
+    setup.after_fork()
+    assert setup.handler.queue is not old_queue
+    logging.getLogger(LOGGER).info("après fork")
+    assert lines(setup, stream)[-1]['message'] == 'après fork'
+
+
+def test_configure_logging_only_once(api):
+    assert configure_logging('autre') is api.log_setup
@@ -0,0 +1,100 @@
+# test_trip_table.py
+"""Table précalculée des trajets (trip_table.py) et sa construction par app.build_trip_table"""
+
+import numpy as np
+import pytest
+
+from polyline import encode_polyline
+from trip_table import TripTable, catalog_version, compute_stops
+
+CITIES = {
+    'paris': {'lat': 48.8566, 'lon': 2.3522},
+    'lyon': {'lat': 45.7640, 'lon': 4.8357},
+    'lille': {'lat': 50.6292, 'lon': 3.0573}
+}
+VEHICLES = [
+    {'id': 'short', 'autonomy': 200, 'battery': 40, 'chargeTime': 0.5},
+    {'id': 'long', 'autonomy': 600, 'battery': 90, 'chargeTime': 0.4}
+]
+
+
+def straight_route(departure, destination):
+    a, b = CITIES[departure], CITIES[destination]
+    return {
+        'distance': 450.0,
+        'duration': 4.5,
+        'geometry': encode_polyline([(a['lat'], a['lon']), (b['lat'], b['lon'])])
+    }
+
+
+def no_stations(departure, destination, points, distance, stop_counts):
+    return {n: [{'name': f'{departure}-{destination}-{k}'} for k in range(n)] for n in stop_counts}
+
+
+def test_compute_stops_matches_soap_formula():
+    stops, total_time = compute_stops(450.0, [200, 600], [0.5, 0.4])
+    # Autonomie utile 170 km : 450 km -> 2 arrêts ; 510 km -> aucun
+    assert stops.tolist() == [2, 0]
+    assert total_time == pytest.approx([5.0 + 1.0, 5.0])
+
+
+def test_build_lookup_both_directions():
+    table = TripTable.build(CITIES, VEHICLES, straight_route, no_stations, workers=2)
+    assert len(table) == 3 * 2 * 2
+
+    entry = table.lookup('paris', 'lyon', 'short')
+    assert entry['num_stops'] == 2 and len(entry['stations']) == 2
+    back = table.lookup('lyon', 'paris', 'short')
+    assert back['num_stops'] == 2
+    assert table.route('lyon', 'paris')['distance'] == 450.0
+    assert table.lookup('paris', 'paris', 'short') is None
+    assert table.lookup('paris', 'lyon', 'inconnu') is None
+
+
+def test_pairs_without_route_stay_misses():
+    def route_fn(departure, destination):
+        return None if {departure, destination} == {'lille', 'lyon'} else straight_route(departure, destination)
+
+    table = TripTable.build(CITIES, VEHICLES, route_fn, no_stations, workers=2)
+    assert table.lookup('lille', 'lyon', 'long') is None
+    assert table.lookup('lyon', 'lille', 'long') is None
+    assert table.route('lille', 'lyon') is None
+    assert table.lookup('paris', 'lille', 'long') is not None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    table = TripTable.build(CITIES, VEHICLES, straight_route, no_stations, workers=1)
+    path = str(tmp_path / 'table.npz')
+    table.save(path)
+
+    loaded = TripTable.load(path)
+    assert loaded.version == table.version
+    assert np.array_equal(loaded.num_stops, table.num_stops)
+    assert loaded.lookup('paris', 'lille', 'short') == table.lookup('paris', 'lille', 'short')
+    assert TripTable.load(str(tmp_path / 'absent.npz')) is None
+
+
+def test_catalog_version_follows_catalog():
+    version = catalog_version(CITIES, VEHICLES)
+    assert version == catalog_version(dict(CITIES), list(VEHICLES))
+    assert version != catalog_version(CITIES, VEHICLES[:1])
+
+
+def test_build_trip_table_skips_estimated_routes(api, monkeypatch, tmp_path):
+    """Itinéraire estimé à vol d'oiseau (échec ORS, quota) : pas d'entrée dans la table"""
+    cities = {key: dict(value, name=key, population=500000) for key, value in CITIES.items()}
+    monkeypatch.setattr(api, 'fetch_cities_from_api', lambda *args, **kwargs: cities)
+    monkeypatch.setattr(api, 'fetch_vehicles_from_chargetrip', lambda priority='interactive': VEHICLES)
+    monkeypatch.setattr(api, 'table_pair_stations', no_stations)
+
+    def request_route(keys, coords, priority='interactive'):
+        if set(keys) == {'lille', 'lyon'}:
+            return api.waypoints_distance_haversine(coords)
+        return straight_route(*keys)
+
+    monkeypatch.setattr(api, 'request_route', request_route)
+    monkeypatch.setattr(api, 'trip_table', None)
+    table = api.build_trip_table(str(tmp_path / 'table.npz'))
+
+    assert table.lookup('lille', 'lyon', 'short') is None
+    assert table.lookup('paris', 'lyon', 'short') is not None
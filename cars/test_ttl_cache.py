@@ -0,0 +1,133 @@
+# test_ttl_cache.py
+"""Cache TTL et cache négatif (ttl_cache.py), cache des bornes les plus proches"""
+
+import pytest
+
+from ttl_cache import MISS, NegativeCache, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', None, ttl=5)
+    assert cache.get('b') is None  # None est une valeur cacheable
+
+    clock.now = 10
+    assert cache.get('b') is MISS and cache.get('a') == 1
+    clock.now = 60
+    assert cache.get('a') is MISS
+    assert cache.stats()['expirations'] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60, clock=FakeClock())
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is MISS and cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_hit_rate():
+    cache = TTLCache(clock=FakeClock())
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('absent')
+    assert cache.stats()['hit_rate'] == 0.5
+
+
+def test_negative_entries_expire_per_kind():
+    clock = FakeClock()
+    cache = NegativeCache({'city': 600, 'route': 86400}, clock=clock)
+    cache.add('city', 'atlantide')
+    cache.add('route', (45.0, 5.0, 42.0, 9.0))
+    assert cache.known('city', 'atlantide') and not cache.known('route', 'atlantide')
+
+    clock.now = 601
+    assert not cache.known('city', 'atlantide')
+    assert cache.known('route', (45.0, 5.0, 42.0, 9.0))
+    kinds = cache.stats()['kinds']
+    assert kinds['city'] == {'hits': 1, 'stores': 1, 'ttl': 600}
+    assert kinds['route'] == {'hits': 1, 'stores': 1, 'ttl': 86400}
+
+
+def test_unknown_city_is_remembered(client, api):
+    api.negative_cache.clear()
+    trip = {'departure': 'atlantide', 'destination': 'lyon', 'vehicle_id': 1}
+    assert client.post('/api/plan-trip', json=trip).status_code == 400
+    assert api.negative_cache.known('city', 'atlantide')
+
+    hits = api.negative_cache.stats()['kinds']['city']['hits']
+    assert client.get('/api/reachable?from=atlantide&vehicle_id=1').status_code == 400
+    assert api.negative_cache.stats()['kinds']['city']['hits'] == hits + 1
+
+
+def test_refused_route_skips_ors(api, monkeypatch):
+    api.negative_cache.clear()
+    calls = []
+
+    def upstream_json(upstream, method, url, **kwargs):
+        calls.append(url)
+        return 404, {'error': {'code': 2010, 'message': 'Point non routable'}}
+
+    monkeypatch.setattr(api, 'upstream_json', upstream_json)
+    coords = [{'lat': 48.85, 'lon': 2.35}, {'lat': 42.7, 'lon': 9.45}]
+    first = api.request_route(['paris', 'bastia'], coords)
+    second = api.request_route(['paris', 'bastia'], coords)
+    assert len(calls) == 1
+    assert first == second == api.waypoints_distance_haversine(coords)
+
+
+def test_cell_without_matching_station_skips_irve(api, stubs):
+    api.nearest_station_cache.clear()
+    api.negative_cache.clear()
+    # Aucune borne de 10 MW : borne générique, puis plus d'appel IRVE pour cette cellule
+    first = api.find_nearest_charging_station(44.84, -0.58, min_power=10000)
+    requests_before = stubs.stats['irve']['requests']
+    second = api.find_nearest_charging_station(44.84, -0.58, min_power=10000)
+    assert stubs.stats['irve']['requests'] == requests_before
+    assert first == second == api.build_fallback_station(44.84, -0.58, min_power=10000)
+
+
+def test_nearest_station_is_cached_by_cell(api):
+    api.nearest_station_cache.clear()
+    first = api.find_nearest_charging_station(45.188, 5.724)
+    assert first is not None
+    key = api.nearest_cache_key(45.188, 5.724, 20, None, None)
+    assert api.nearest_station_cache.get(key) is not MISS
+
+    # Point voisin de la même cellule : servi depuis le cache
+    hits = api.nearest_station_cache.hits
+    assert api.find_nearest_charging_station(45.1881, 5.7241)['id'] == first['id']
+    assert api.nearest_station_cache.hits == hits + 1
+
+
+def test_irve_error_is_not_cached(api, stubs):
+    """Réponse IRVE en erreur : ni borne en cache, ni résultat négatif"""
+    lat, lon = 47.322, 5.041
+    key = api.nearest_cache_key(lat, lon, 20, None, None)
+    api.nearest_station_cache.clear()
+    api.negative_cache.clear()
+
+    stubs.configs['irve'].error_rate = 1.0
+    try:
+        with pytest.raises(api.requests.HTTPError):
+            api.fetch_irve_records(lat, lon)
+        assert api.find_nearest_charging_station(lat, lon) is None
+    finally:
+        stubs.configs['irve'].error_rate = 0.0
+
+    assert api.nearest_station_cache.get(key) is MISS
+    assert not api.negative_cache.known('station', key)
+    # IRVE rétabli : la borne est trouvée aussitôt
+    assert api.find_nearest_charging_station(lat, lon) is not None
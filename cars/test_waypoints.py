@@ -0,0 +1,63 @@
+# test_waypoints.py
+"""Trajets à étapes (waypoints) : un itinéraire, tronçons, arrêts et charge reportée"""
+
+import pytest
+
+WAYPOINTS = ['paris', 'dijon', 'lyon', 'marseille']
+
+
+def test_trip_waypoints(api):
+    assert api.trip_waypoints({'departure': 'paris', 'destination': 'lyon'}) == ['paris', 'lyon']
+    assert api.trip_waypoints({'waypoints': 'paris|dijon|lyon'}) == ['paris', 'dijon', 'lyon']
+    assert api.trip_waypoints({'waypoints': WAYPOINTS, 'departure': 'nantes'}) == WAYPOINTS
+
+
+@pytest.mark.parametrize('waypoints', [['paris'], ['paris'] * 26, {'from': 'paris'}])
+def test_invalid_waypoints(api, client, waypoints):
+    with pytest.raises(ValueError):
+        api.trip_waypoints({'waypoints': waypoints})
+    assert client.post('/api/plan-trip', json={'waypoints': waypoints, 'vehicle_id': 1}).status_code == 400
+
+
+def test_route_legs_from_segments_or_prorated(api):
+    coords = [{'lat': 48.85, 'lon': 2.35}, {'lat': 47.32, 'lon': 5.04}, {'lat': 45.76, 'lon': 4.84}]
+    route = {'distance': 500.0, 'duration': 5.0, 'segments': [
+        {'distance': 310.0, 'duration': 3.1}, {'distance': 190.0, 'duration': 1.9}
+    ]}
+    assert api.route_legs(route, coords) == [
+        {'distance': 310.0, 'duration': 3.1, 'start_km': 0.0},
+        {'distance': 190.0, 'duration': 1.9, 'start_km': 310.0}
+    ]
+
+    # Sans segments (estimation, table) : totaux répartis au prorata du vol d'oiseau
+    legs = api.route_legs({'distance': 500.0, 'duration': 5.0}, coords)
+    assert sum(leg['distance'] for leg in legs) == pytest.approx(500.0, abs=0.1)
+    assert legs[1]['start_km'] == legs[0]['distance'] > legs[1]['distance']
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_multi_leg_trip(client, optimize):
+    response = client.post('/api/plan-trip', json={'waypoints': WAYPOINTS, 'vehicle_id': 1, 'optimize': optimize})
+    assert response.status_code == 200
+    trip = response.get_json()['trip']
+
+    assert [w['city'] for w in trip['waypoints']] == [city.title() for city in WAYPOINTS]
+    assert trip['departure']['city'] == 'Paris' and trip['destination']['city'] == 'Marseille'
+
+    legs = trip['legs']
+    assert [(leg['from'], leg['to']) for leg in legs] == [
+        ('Paris', 'Dijon'), ('Dijon', 'Lyon'), ('Lyon', 'Marseille')
+    ]
+    assert sum(leg['distance'] for leg in legs) == pytest.approx(trip['distance'], abs=0.5)
+    assert sum(leg['numberOfStops'] for leg in legs) == trip['numberOfStops'] > 0
+    assert all(0 <= leg['arrivalSoc'] <= 1 for leg in legs)
+
+    stations = trip['chargingStations']
+    assert len(stations) == trip['numberOfStops']
+    assert all(0 <= station['leg'] < len(legs) for station in stations)
+
+
+def test_waypoints_in_query_string(client):
+    response = client.get('/api/plan-trip/stream', query_string={'waypoints': 'paris|dijon|lyon', 'vehicle_id': 1})
+    body = response.data.decode('utf-8')
+    assert 'event: done' in body and '"from":"Dijon"' in body
@@ -0,0 +1,311 @@
+# trip_table.py
+"""
+Table précalculée des trajets : pour chaque couple de grandes villes et chaque
+véhicule du catalogue, distance, nombre d'arrêts, temps et bornes retenues.
+
+Stockage compact en tableaux NumPy (fichier .npz) :
+- distance / duration : float32 [villes x villes]
+- num_stops / total_time / plan_ids : [villes x villes x véhicules]
+- tracés (polylignes encodées simplifiées) et plans de bornes (JSON) en blobs
+  d'octets indexés par des offsets
+
+La recherche est en O(1) (dictionnaires clé -> ligne). La table porte la
+version du catalogue (villes + véhicules) avec laquelle elle a été construite :
+une version différente impose une reconstruction.
+
+Exemple :
+    python trip_table.py --build              # construit et enregistre la table
+    python trip_table.py --info               # résumé de la table enregistrée
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from packing import pack_strings, unpack_string
+from polyline import decode_polyline, encode_polyline, simplify_douglas_peucker, zoom_tolerance_km
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+AVERAGE_SPEED = 90  # km/h, identique au service SOAP
+SAFETY_MARGIN = 0.85  # identique au service SOAP
+ROUTE_ZOOM = 12  # niveau de détail des tracés conservés dans la table
+
+
+def catalog_version(cities, vehicles):
+    """Empreinte du catalogue : clés et positions des villes, caractéristiques des véhicules"""
+    payload = {
+        'format': FORMAT_VERSION,
+        'cities': sorted((key, round(c['lat'], 5), round(c['lon'], 5)) for key, c in cities.items()),
+        'vehicles': sorted(
+            (str(v['id']), v['autonomy'], v['battery'], v['chargeTime']) for v in vehicles
+        )
+    }
+    return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()[:16]
+
+
+def compute_stops(distance, autonomy, charge_time):
+    """
+    Nombre d'arrêts et temps total, vectorisés sur les véhicules
+    (mêmes formules que TravelTimeService.calculate_travel_time)
+    """
+    effective_range = np.asarray(autonomy, dtype=np.float64) * SAFETY_MARGIN
+    stops = np.where(
+        distance <= effective_range, 0, np.floor((distance - effective_range) / effective_range) + 1
+    ).astype(np.int16)
+    total_time = distance / AVERAGE_SPEED + stops * np.asarray(charge_time, dtype=np.float64)
+    return stops, total_time
+
+
+class TripTable:
+    """Table des trajets (départ, destination, véhicule) chargée en mémoire"""
+
+    def __init__(self, arrays):
+        self.version = str(arrays['version'])
+        self.built_at = float(arrays['built_at'])
+        self.city_keys = [str(k) for k in arrays['city_keys']]
+        self.vehicle_ids = [str(v) for v in arrays['vehicle_ids']]
+        self.distance = arrays['distance']
+        self.duration = arrays['duration']
+        self.num_stops = arrays['num_stops']
+        self.total_time = arrays['total_time']
+        self.plan_ids = arrays['plan_ids']
+        self.route_blob = arrays['route_blob']
+        self.route_offsets = arrays['route_offsets']
+        self.plan_blob = arrays['plan_blob']
+        self.plan_offsets = arrays['plan_offsets']
+
+        self.city_index = {key: row for row, key in enumerate(self.city_keys)}
+        self.vehicle_index = {vehicle_id: col for col, vehicle_id in enumerate(self.vehicle_ids)}
+
+    def __len__(self):
+        """Nombre de combinaisons (départ, destination, véhicule) renseignées"""
+        return int((self.num_stops >= 0).sum())
+
+    # ==================== RECHERCHE ====================
+
+    def _pair(self, departure, destination):
+        i = self.city_index.get(departure)
+        j = self.city_index.get(destination)
+        if i is None or j is None or np.isnan(self.distance[i, j]):
+            return None
+        return i, j
+
+    def route(self, departure, destination):
+        """Itinéraire (distance, durée, tracé encodé) ou None si absent de la table"""
+        pair = self._pair(departure, destination)
+        if pair is None:
+            return None
+        i, j = pair
+        return {
+            'distance': round(float(self.distance[i, j]), 1),
+            'duration': round(float(self.duration[i, j]), 2),
+            'geometry': unpack_string(self.route_blob, self.route_offsets, i * len(self.city_keys) + j) or None,
+            'coordinates': []
+        }
+
+    def lookup(self, departure, destination, vehicle_id):
+        """
+        Trajet précalculé ou None
+
+        Returns:
+            dict {num_stops, total_time, stations} ; les stations sont des copies
+        """
+        pair = self._pair(departure, destination)
+        col = self.vehicle_index.get(str(vehicle_id))
+        if pair is None or col is None:
+            return None
+
+        i, j = pair
+        num_stops = int(self.num_stops[i, j, col])
+        if num_stops < 0:
+            return None
+
+        stations = json.loads(unpack_string(self.plan_blob, self.plan_offsets, int(self.plan_ids[i, j, col])))
+        return {
+            'num_stops': num_stops,
+            'total_time': float(self.total_time[i, j, col]),
+            'stations': stations
+        }
+
+    # ==================== CONSTRUCTION ====================
+
+    @classmethod
+    def build(cls, cities, vehicles, route_fn, stations_fn, workers=8):
+        """
+        Calcule toutes les combinaisons (départ, destination, véhicule)
+
+        Args:
+            cities: {clé: {lat, lon, ...}}
+            vehicles: Catalogue (id, autonomy, chargeTime)
+            route_fn: (départ, destination) -> itinéraire {distance, duration, geometry}
+                ou None ; appelé une fois par paire non ordonnée, le sens retour
+                réutilise le tracé inversé
+            stations_fn: (départ, destination, points, distance, nombres d'arrêts)
+                -> {nombre d'arrêts: [stations]}
+            workers: Paires calculées en parallèle
+        """
+        started = time.time()
+        city_keys = sorted(cities)
+        n, v = len(city_keys), len(vehicles)
+        autonomy = [float(vehicle['autonomy']) for vehicle in vehicles]
+        charge_time = [float(vehicle['chargeTime']) for vehicle in vehicles]
+
+        distance = np.full((n, n), np.nan, dtype=np.float32)
+        duration = np.full((n, n), np.nan, dtype=np.float32)
+        num_stops = np.full((n, n, v), -1, dtype=np.int16)
+        total_time = np.full((n, n, v), np.nan, dtype=np.float32)
+        plan_ids = np.full((n, n, v), -1, dtype=np.int32)
+        routes = [''] * (n * n)
+        plans = []
+
+        def compute_pair(pair):
+            i, j = pair
+            route = route_fn(city_keys[i], city_keys[j])
+            if not route:
+                return pair, None
+
+            points = decode_polyline(route['geometry']) if route.get('geometry') else [
+                (cities[city_keys[i]]['lat'], cities[city_keys[i]]['lon']),
+                (cities[city_keys[j]]['lat'], cities[city_keys[j]]['lon'])
+            ]
+            tolerance = zoom_tolerance_km(ROUTE_ZOOM, points[0][0])
+            points = simplify_douglas_peucker(points, tolerance)
+
+            results = {}
+            for a, b, path in ((i, j, points), (j, i, points[::-1])):
+                stops, times = compute_stops(route['distance'], autonomy, charge_time)
+                plan = stations_fn(city_keys[a], city_keys[b], path, route['distance'], sorted(set(stops.tolist())))
+                results[(a, b)] = (path, stops, times, plan)
+            return pair, (route, results)
+
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for done, ((i, j), computed) in enumerate(executor.map(compute_pair, pairs), 1):
+                if computed is None:
+                    logger.warning(f"⚠️  Table : itinéraire {city_keys[i]}-{city_keys[j]} indisponible")
+                    continue
+
+                route, results = computed
+                for (a, b), (path, stops, times, plan) in results.items():
+                    distance[a, b] = route['distance']
+                    duration[a, b] = route['duration']
+                    routes[a * n + b] = encode_polyline(path)
+                    num_stops[a, b] = stops
+                    total_time[a, b] = times
+
+                    plan_index = {}
+                    for k, stations in plan.items():
+                        plan_index[k] = len(plans)
+                        plans.append(json.dumps(stations, ensure_ascii=False))
+                    plan_ids[a, b] = [plan_index[int(k)] for k in stops]
+
+                if done % 50 == 0:
+                    logger.info(f"🔄 Table : {done}/{len(pairs)} paires")
+
+        route_blob, route_offsets = pack_strings(routes)
+        plan_blob, plan_offsets = pack_strings(plans)
+
+        table = cls({
+            'version': catalog_version(cities, vehicles),
+            'built_at': time.time(),
+            'city_keys': np.array(city_keys),
+            'vehicle_ids': np.array([str(vehicle['id']) for vehicle in vehicles]),
+            'distance': distance,
+            'duration': duration,
+            'num_stops': num_stops,
+            'total_time': total_time,
+            'plan_ids': plan_ids,
+            'route_blob': route_blob,
+            'route_offsets': route_offsets,
+            'plan_blob': plan_blob,
+            'plan_offsets': plan_offsets
+        })
+        logger.info(f"✅ Table : {len(table)} trajets en {time.time() - started:.0f} s")
+        return table
+
+    # ==================== FICHIER ====================
+
+    def save(self, path):
+        """Enregistre la table (écriture atomique : fichier temporaire puis renommage)"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                version=np.array(self.version),
+                built_at=np.array(self.built_at),
+                city_keys=np.array(self.city_keys),
+                vehicle_ids=np.array(self.vehicle_ids),
+                distance=self.distance,
+                duration=self.duration,
+                num_stops=self.num_stops,
+                total_time=self.total_time,
+                plan_ids=self.plan_ids,
+                route_blob=self.route_blob,
+                route_offsets=self.route_offsets,
+                plan_blob=self.plan_blob,
+                plan_offsets=self.plan_offsets
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Charge une table enregistrée, ou None si le fichier est absent ou illisible"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls({name: data[name] for name in data.files})
+        except Exception as e:
+            logger.error(f"❌ Table illisible ({path}): {e}")
+            return None
+
+    def info(self):
+        return {
+            'version': self.version,
+            'built_at': self.built_at,
+            'cities': len(self.city_keys),
+            'vehicles': len(self.vehicle_ids),
+            'trips': len(self),
+            'plans': len(self.plan_offsets) - 1,
+            'bytes': int(sum(a.nbytes for a in (
+                self.distance, self.duration, self.num_stops, self.total_time, self.plan_ids,
+                self.route_blob, self.route_offsets, self.plan_blob, self.plan_offsets
+            )))
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Table précalculée des trajets")
+    parser.add_argument('--build', action='store_true', help="Construit et enregistre la table")
+    parser.add_argument('--info', action='store_true', help="Affiche le résumé de la table enregistrée")
+    parser.add_argument('--path', default=None)
+    args = parser.parse_args(argv)
+
+    import app
+
+    path = args.path or app.TRIP_TABLE_PATH
+    if args.build:
+        table = app.build_trip_table(path)
+    else:
+        table = TripTable.load(path)
+
+    if table is None:
+        print(f"❌ Aucune table dans {path}")
+        return 1
+
+    print(json.dumps(dict(table.info(), path=path), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# ttl_cache.py
+"""
+Cache mémoire LRU à durée de vie (TTL) par entrée, partagé entre threads.
+Utilisé pour les résultats IRVE indexés par cellule géographique, les
+itinéraires et les résultats négatifs.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Valeur renvoyée par get() en cas d'absence (None est une valeur cacheable)
+MISS = object()
+
+
+class TTLCache:
+    """Dictionnaire borné : éviction LRU au-delà de maxsize, expiration par entrée"""
+
+    def __init__(self, maxsize=4096, ttl=3600, clock=time.monotonic):
+        """
+        Args:
+            maxsize: Nombre maximum d'entrées
+            ttl: Durée de vie par défaut en secondes
+            clock: Horloge monotone (injectable pour les tests)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Valeur associée à key, ou MISS si absente ou expirée"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISS
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Enregistre value pour ttl secondes (durée par défaut du cache si None)"""
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Compteurs d'utilisation (taille, succès, échecs, évictions, expirations)"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class NegativeCache:
+    """
+    Résultats négatifs (ville inconnue, aucune borne, itinéraire impossible...)
+
+    Chaque type a sa durée de vie et ses compteurs ; les clés sont préfixées
+    par le type dans un TTLCache commun.
+    """
+
+    def __init__(self, ttls, maxsize=8192, clock=time.monotonic):
+        """
+        Args:
+            ttls: {type: durée de vie en secondes}
+            maxsize: Nombre maximum d'entrées, tous types confondus
+        """
+        self.ttls = dict(ttls)
+        self.cache = TTLCache(maxsize=maxsize, ttl=max(self.ttls.values()), clock=clock)
+        self.lock = threading.Lock()
+        self.counters = {kind: {'hits': 0, 'stores': 0} for kind in self.ttls}
+
+    def __len__(self):
+        return len(self.cache)
+
+    def known(self, kind, key):
+        """True si key est un échec connu et encore valide pour ce type"""
+        if self.cache.get((kind, key)) is MISS:
+            return False
+        with self.lock:
+            self.counters[kind]['hits'] += 1
+        return True
+
+    def add(self, kind, key):
+        self.cache.set((kind, key), True, ttl=self.ttls[kind])
+        with self.lock:
+            self.counters[kind]['stores'] += 1
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        """Compteurs par type (TTL, échecs servis depuis le cache, échecs enregistrés)"""
+        with self.lock:
+            kinds = {kind: dict(counters, ttl=self.ttls[kind]) for kind, counters in self.counters.items()}
+        return dict(self.cache.stats(), kinds=kinds)